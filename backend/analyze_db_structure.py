@@ -1,11 +1,12 @@
-import sqlite3
 import os
+from database import connect
+from config import DB_PATH
 
 def analyze_database():
     """Анализ структуры базы данных"""
     
     # Путь к базе данных
-    db_path = os.path.join(os.path.dirname(__file__), 'sushi_express.db')
+    db_path = DB_PATH
     
     if not os.path.exists(db_path):
         print("❌ База данных не найдена!")
@@ -15,7 +16,7 @@ def analyze_database():
     print("=" * 60)
     
     # Подключение к базе данных
-    conn = sqlite3.connect(db_path)
+    conn = connect()
     cursor = conn.cursor()
     
     # Получаем список всех таблиц
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from flask_cors import CORS
@@ -10,33 +10,99 @@ from datetime import datetime, timedelta
 # Создаем Flask приложение
 app = Flask(__name__)
 
-# Конфигурация для SQLite
+# Конфигурация для SQLite (путь к БД и пул - общие с миграциями и скриптами, см. config.py)
+from config import DB_PATH, DATABASE_URL, DATABASE_REPLICA_URL, METRICS_TOKEN
+from database import ENGINE_OPTIONS, REPLICA_ENGINE_OPTIONS, verify_schema, find_stray_databases
+from db_routing import REPLICA_BIND_KEY, read_only
+from serializers import FastJSONProvider, FieldSelectionError, request_fields, serialize
 app.config['SECRET_KEY'] = 'your-super-secret-key-change-this-in-production'
-db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sushi_express.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = ENGINE_OPTIONS
+if DATABASE_REPLICA_URL:
+    # Пул только для чтения для эндпоинтов с @read_only (см. db_routing.py)
+    app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND_KEY: {'url': DATABASE_REPLICA_URL, **REPLICA_ENGINE_OPTIONS}}
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = 'jwt-secret-string'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=30)
 
 # Инициализация расширений
-from models import db, User, Ingredient, Roll, RollIngredient, Set, SetRoll, Order, OrderItem, OtherItem, LoyaltyCard, LoyaltyRoll, LoyaltyCardUsage, ReferralUsage
+from models import db, User, Ingredient, Roll, RollIngredient, Set, SetRoll, Order, OrderItem, OtherItem, LoyaltyCard, LoyaltyCardUsage
+from menu_cache import get_menu_section, get_menu_version
+from menu_import import MenuImportError
+from menu_reload import reload_menu, MenuReloadInProgress
+from wallet import debit_points, get_points_history, InsufficientPointsError, BONUS_POINT_VALUE
+from migrations import get_pending_migrations
+from background import init_background_tasks
+from referrals import find_referrer, apply_referral_code, assign_referral_code, get_referred_by_info, get_referrals_made, ReferralCodeUnavailable
+from query_stats import init_query_stats, get_recent_requests, summarize_by_endpoint
+from metrics import init_metrics, render_all, ORDERS, CART_SIZE, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from profiler import init_profiler
+from health import liveness, readiness
+from request_log import init_request_log
+from slow_queries import install_slow_query_log, get_slow_queries
+from compression import init_compression
 db.init_app(app)
 
+# Сжатие ответов gzip/zstd по Accept-Encoding (см. compression.py). Первым: выполняется после всех after_request
+init_compression(app)
+
+# Число SQL-запросов и время БД на каждый запрос: заголовок Server-Timing, /api/admin/debug/queries
+init_query_stats(app)
+
+# Метрики Prometheus: GET /metrics (см. metrics.py)
+init_metrics(app, db)
+
+# Сэмплирующий профилировщик выбранных запросов (PROFILE_ROUTES / PROFILE_SAMPLE_RATE, см. profiler.py)
+init_profiler(app)
+
+# Журнал запросов в JSON с X-Request-ID, пользователем, статусом и числом SQL-запросов (см. request_log.py)
+init_request_log(app)
+
+# Медленные SQL-запросы (дольше SLOW_QUERY_MS) с планом выполнения, см. slow_queries.py
+install_slow_query_log()
+
+# Слежение за файлами меню и снимки БД по расписанию - в одном процессе узла (см. background.py)
+init_background_tasks(app)
+
 jwt = JWTManager()
 jwt.init_app(app)
 
 CORS(app)
 
+# Ответы кодируются orjson (если установлен), даты - ISO 8601
+app.json = FastJSONProvider(app)
+
 # Маршруты API
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    # Для сборщика Prometheus; снаружи закрывается прокси или токеном METRICS_TOKEN
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return jsonify({'error': 'Доступ запрещен'}), 403
+    return Response(render_all(), content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'OK', 
         'message': 'Sushi Express API is running!',
-        'database': 'SQLite',
+        'database': db.engine.dialect.name,  # sqlite или postgresql, см. DATABASE_URL
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    # Процесс жив и отвечает; БД не проверяется (это делает /api/health/ready)
+    return jsonify(liveness())
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    # 503 - балансировщик снимает трафик с узла (БД недоступна, миграции, перезагрузка меню)
+    try:
+        ready, report = readiness(db)
+        return jsonify(report), 200 if ready else 503
+    except Exception as e:
+        return jsonify({'status': 'not_ready', 'error': f'Ошибка проверки готовности: {str(e)}'}), 503
+
 @app.route('/api/register', methods=['POST'])
 def register():
     try:
@@ -47,6 +113,14 @@ def register():
         if existing_user:
             return jsonify({'error': 'Пользователь с таким email уже существует'}), 400
         
+        # Проверяем реферальный код, если он указан
+        referral_code = data.get('referral_code')
+        referrer = None
+        if referral_code:
+            referrer = find_referrer(referral_code)
+            if not referrer:
+                return jsonify({'error': 'Неверный реферальный код'}), 400
+        
         # Создаем нового пользователя
         hashed_password = generate_password_hash(data['password'])
         new_user = User(
@@ -58,6 +132,12 @@ def register():
         )
         
         db.session.add(new_user)
+        db.session.flush()
+        
+        # Начисляем бонус пригласившему в той же транзакции
+        if referrer:
+            apply_referral_code(new_user, referrer, referral_code)
+        
         db.session.commit()
         
         # Создаем токен доступа
@@ -76,6 +156,7 @@ def register():
         }), 201
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'Ошибка регистрации: {str(e)}'}), 500
 
 @app.route('/api/login', methods=['POST'])
@@ -109,23 +190,11 @@ def login():
         return jsonify({'error': f'Ошибка входа: {str(e)}'}), 500
 
 @app.route('/api/rolls', methods=['GET'])
+@read_only
 def get_rolls():
     try:
-        rolls = Roll.query.all()
-        rolls_data = []
-        
-        for roll in rolls:
-            roll_data = {
-                'id': roll.id,
-                'name': roll.name,
-                'description': roll.description,
-                'price': roll.sale_price,  # Добавляем поле price
-                'sale_price': roll.sale_price,
-                'image_url': roll.image_url,
-                'category': 'roll',
-                'is_available': True
-            }
-            rolls_data.append(roll_data)
+        # Роллы берем из общего снимка меню
+        rolls_data = get_menu_section('rolls')
         
         return jsonify({
             'rolls': rolls_data,
@@ -136,22 +205,11 @@ def get_rolls():
         return jsonify({'error': f'Ошибка получения роллов: {str(e)}'}), 500
 
 @app.route('/api/sets', methods=['GET'])
+@read_only
 def get_sets():
     try:
-        sets = Set.query.all()
-        sets_data = []
-        
-        for set_item in sets:
-            set_data = {
-                'id': set_item.id,
-                'name': set_item.name,
-                'description': set_item.description,
-                'price': set_item.set_price,  # Добавляем поле price
-                'set_price': set_item.set_price,
-                'image_url': set_item.image_url,
-                'is_available': True
-            }
-            sets_data.append(set_data)
+        # Сеты берем из общего снимка меню
+        sets_data = get_menu_section('sets')
         
         return jsonify({
             'sets': sets_data,
@@ -161,6 +219,13 @@ def get_sets():
     except Exception as e:
         return jsonify({'error': f'Ошибка получения сетов: {str(e)}'}), 500
 
+def _bonus_points_of(item):
+    """Количество бонусных баллов в позиции корзины типа bonus_points"""
+    if item.get('points') is not None:
+        return max(int(item['points']), 0)
+    # Старые клиенты присылают баллы как отрицательную цену позиции
+    return int(round(abs(item.get('price', 0) * item.get('quantity', 1)) / BONUS_POINT_VALUE))
+
 @app.route('/api/orders', methods=['POST'])
 @jwt_required()
 def create_order():
@@ -193,6 +258,7 @@ def create_order():
         # Вычисляем общую стоимость
         total_price = 0
         has_paid_items = False
+        bonus_points_to_redeem = 0
         
         # Если есть данные в запросе, используем их для расчета
         if data.get('items'):
@@ -201,6 +267,10 @@ def create_order():
                 quantity = item.get('quantity', 1)
                 unit_price = item.get('price', 0)
                 
+                if item_type == 'bonus_points':
+                    bonus_points_to_redeem += _bonus_points_of(item)
+                    continue
+                
                 if unit_price > 0:
                     has_paid_items = True
                 total_price += unit_price * quantity
@@ -225,7 +295,8 @@ def create_order():
                 elif item_type == 'loyalty_roll':
                     unit_price = 0.0
                 elif item_type == 'bonus_points':
-                    unit_price = cart_item.get('price', 0)
+                    bonus_points_to_redeem += _bonus_points_of(cart_item)
+                    continue
                 
                 total_price += unit_price * quantity
         
@@ -233,11 +304,17 @@ def create_order():
         if not has_paid_items:
             return jsonify({'error': 'В заказе нет платных товаров'}), 400
         
-        # Используем переданную сумму если она больше 0
-        if data.get('total_amount', 0) > 0:
-            total_price = data.get('total_amount', 0)
-        elif data.get('total_price', 0) > 0:
-            total_price = data.get('total_price', 0)
+        # Скидка бонусными баллами (не больше суммы заказа)
+        bonus_points_to_redeem = min(bonus_points_to_redeem, int(total_price / BONUS_POINT_VALUE))
+        total_price -= bonus_points_to_redeem * BONUS_POINT_VALUE
+        
+        # Используем переданную сумму если она больше 0 - только без списания баллов:
+        # иначе сумма клиента без скидки заменила бы скидку, а баллы все равно списались бы
+        if bonus_points_to_redeem == 0:
+            if data.get('total_amount', 0) > 0:
+                total_price = data.get('total_amount', 0)
+            elif data.get('total_price', 0) > 0:
+                total_price = data.get('total_price', 0)
         
         # Валидация отрицательных сумм
         if total_price < 0:
@@ -264,6 +341,10 @@ def create_order():
         
         for item in items_to_process:
             item_type = item['item_type']
+            if item_type == 'bonus_points':
+                # Списание баллов фиксируется в журнале баллов, а не позицией заказа
+                continue
+            
             item_id = item['item_id']
             quantity = item['quantity']
             
@@ -281,8 +362,6 @@ def create_order():
                         unit_price = set_item.set_price
                 elif item_type == 'loyalty_roll':
                     unit_price = 0.0
-                elif item_type == 'bonus_points':
-                    continue
             
             total_item_price = unit_price * quantity
             
@@ -296,15 +375,27 @@ def create_order():
             )
             db.session.add(order_item)
         
+        # Списываем бонусные баллы атомарно вместе с заказом
+        if bonus_points_to_redeem > 0:
+            try:
+                debit_points(user_id, bonus_points_to_redeem, 'order', order_id=order.id)
+            except InsufficientPointsError:
+                db.session.rollback()
+                return jsonify({'error': 'Недостаточно бонусных баллов'}), 400
+        
         # Очищаем корзину после создания заказа
         user.cart = '[]'
         
         db.session.commit()
         
+        ORDERS.inc(order.status)
+        CART_SIZE.observe(sum(1 for item in items_to_process if item['item_type'] != 'bonus_points'))
+        
         return jsonify({
             'success': True,
             'message': 'Заказ успешно создан',
-            'order': order.to_dict()
+            'order': order.to_dict(),
+            'bonus_points_used': bonus_points_to_redeem
         }), 201
         
     except Exception as e:
@@ -316,19 +407,64 @@ def create_order():
 def get_user_orders():
     try:
         user_id = get_jwt_identity()
-        orders = Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
+        
+        # Краткий список для экрана истории: один агрегирующий запрос без позиций заказа,
+        # полные данные заказа берутся через GET /api/orders/<id>
+        if request.args.get('view') == 'summary':
+            rows = db.session.query(
+                Order.id, Order.created_at, Order.status, Order.total_price,
+                db.func.count(OrderItem.id).label('items_count'),
+                db.func.coalesce(db.func.sum(OrderItem.quantity), 0).label('total_quantity')
+            ).outerjoin(OrderItem, OrderItem.order_id == Order.id).filter(
+                Order.user_id == user_id
+            ).group_by(Order.id).order_by(Order.created_at.desc())
+            
+            limit = request.args.get('limit', type=int)
+            offset = request.args.get('offset', 0, type=int)
+            if limit:
+                rows = rows.limit(limit)
+            if offset:
+                rows = rows.offset(offset)
+            
+            orders_data = [{
+                'id': row.id,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'status': row.status,
+                'total_price': row.total_price,
+                'items_count': row.items_count,
+                'total_quantity': row.total_quantity
+            } for row in rows.all()]
+            
+            # total - все заказы пользователя, а не размер страницы
+            total = len(orders_data)
+            if limit or offset:
+                total = db.session.query(db.func.count(Order.id)).filter(Order.user_id == user_id).scalar()
+            
+            return jsonify({
+                'success': True,
+                'orders': orders_data,
+                'total': total
+            }), 200
+        
+        selection, depth = request_fields()
+        orders = Order.query.options(db.selectinload(Order.items)).filter_by(
+            user_id=user_id
+        ).order_by(Order.created_at.desc()).all()
         
         return jsonify({
             'success': True,
-            'orders': [order.to_dict() for order in orders],
+            'orders': serialize(orders, selection, depth),
             'total': len(orders)
         }), 200
         
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Ошибка при получении заказов: {str(e)}'}), 500
 
 @app.route('/api/orders/all', methods=['GET'])
 @jwt_required()
+@read_only
 def get_all_orders():
     try:
         user_id = get_jwt_identity()
@@ -337,14 +473,17 @@ def get_all_orders():
         if not user or not user.is_admin:
             return jsonify({'error': 'Доступ запрещен'}), 403
         
-        orders = Order.query.order_by(Order.created_at.desc()).all()
+        selection, depth = request_fields()
+        orders = Order.query.options(db.selectinload(Order.items)).order_by(Order.created_at.desc()).all()
         
         return jsonify({
             'success': True,
-            'orders': [order.to_dict() for order in orders],
+            'orders': serialize(orders, selection, depth),
             'total': len(orders)
         }), 200
         
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Ошибка при получении всех заказов: {str(e)}'}), 500
 
@@ -364,6 +503,14 @@ def get_cart():
         
         cart = json.loads(user.cart) if user.cart else []
         
+        # Роллы (с составом) и сеты корзины - одним запросом на тип, а не по запросу на товар
+        roll_ids = {item.get('item_id') for item in cart if item.get('item_type') == 'roll'}
+        set_ids = {item.get('item_id') for item in cart if item.get('item_type') == 'set'}
+        rolls = {roll.id: roll for roll in Roll.query.options(
+            db.selectinload(Roll.ingredients).selectinload(RollIngredient.ingredient)
+        ).filter(Roll.id.in_(roll_ids))} if roll_ids else {}
+        sets = {set_item.id: set_item for set_item in Set.query.filter(Set.id.in_(set_ids))} if set_ids else {}
+        
         # Добавляем цены к товарам в корзине
         cart_with_prices = []
         for item in cart:
@@ -377,7 +524,7 @@ def get_cart():
             image_url = ''
             
             if item_type == 'roll':
-                roll = Roll.query.get(item_id)
+                roll = rolls.get(item_id)
                 if roll:
                     price = roll.sale_price
                     name = roll.name
@@ -386,7 +533,7 @@ def get_cart():
                     # Если ролл не найден, пропускаем этот товар
                     continue
             elif item_type == 'set':
-                set_item = Set.query.get(item_id)
+                set_item = sets.get(item_id)
                 if set_item:
                     price = set_item.set_price
                     name = set_item.name
@@ -394,6 +541,21 @@ def get_cart():
                 else:
                     # Если сет не найден, пропускаем этот товар
                     continue
+            elif item_type == 'bonus_points':
+                # Скидка бонусными баллами показывается отрицательной ценой
+                points = _bonus_points_of(item)
+                cart_with_prices.append({
+                    'id': 0,
+                    'item_type': item_type,
+                    'item_id': 0,
+                    'name': f'Бонусные баллы ({points})',
+                    'price': -points * BONUS_POINT_VALUE,
+                    'quantity': 1,
+                    'total_price': -points * BONUS_POINT_VALUE,
+                    'image_url': '',
+                    'points': points
+                })
+                continue
             else:
                 # Для других типов товаров пропускаем
                 continue
@@ -401,7 +563,7 @@ def get_cart():
             # Создаем объект товара для поля item
             item_data = {}
             if item_type == 'roll':
-                roll = Roll.query.get(item_id)
+                roll = rolls.get(item_id)
                 if roll:
                     item_data = {
                         'id': roll.id,
@@ -414,7 +576,7 @@ def get_cart():
                         'ingredients': [ri.to_dict() for ri in roll.ingredients]
                     }
             elif item_type == 'set':
-                set_item = Set.query.get(item_id)
+                set_item = sets.get(item_id)
                 if set_item:
                     item_data = {
                         'id': set_item.id,
@@ -537,6 +699,72 @@ def clear_cart():
     except Exception as e:
         return jsonify({'error': f'Ошибка очистки корзины: {str(e)}'}), 500
 
+@app.route('/api/cart/use-bonus', methods=['POST'])
+@jwt_required()
+def use_bonus_points():
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user:
+            return jsonify({'error': 'Пользователь не найден'}), 404
+        
+        data = request.get_json()
+        points = int(data.get('bonus_points', 0))
+        
+        if points <= 0:
+            return jsonify({'error': 'Количество баллов должно быть положительным'}), 400
+        
+        # Баланс читается из кэшированного поля, списание произойдет при оформлении заказа
+        balance = user.bonus_points or 0
+        if points > balance:
+            return jsonify({'error': 'Недостаточно бонусных баллов'}), 400
+        
+        # В корзине может быть только одна позиция с баллами - заменяем ее
+        cart = json.loads(user.cart) if user.cart else []
+        cart = [item for item in cart if item.get('item_type') != 'bonus_points']
+        cart.append({
+            'item_type': 'bonus_points',
+            'item_id': 0,
+            'quantity': 1,
+            'points': points
+        })
+        
+        user.cart = json.dumps(cart)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': f'Применено {points} бонусных баллов',
+            'bonus_points_used': points,
+            'remaining_bonus_points': balance - points,
+            'discount_applied': points * BONUS_POINT_VALUE
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Ошибка использования бонусных баллов: {str(e)}'}), 500
+
+@app.route('/api/wallet', methods=['GET'])
+@jwt_required()
+def get_wallet():
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user:
+            return jsonify({'error': 'Пользователь не найден'}), 404
+        
+        return jsonify({
+            'success': True,
+            'bonus_points': user.bonus_points or 0,
+            'loyalty_points': user.loyalty_points or 0,
+            'transactions': get_points_history(user_id)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Ошибка получения баллов: {str(e)}'}), 500
+
 # ===== ENDPOINTS ДЛЯ ИЗБРАННОГО =====
 
 @app.route('/api/favorites', methods=['GET'])
@@ -669,6 +897,7 @@ def update_order_status(order_id):
         order.status = new_status
         order.updated_at = datetime.utcnow()
         db.session.commit()
+        ORDERS.inc(new_status)
         
         return jsonify({
             'success': True,
@@ -699,9 +928,11 @@ def get_order(order_id):
         
         return jsonify({
             'success': True,
-            'order': order.to_dict()
+            'order': serialize(order, *request_fields())
         }), 200
         
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Ошибка при получении заказа: {str(e)}'}), 500
 
@@ -709,6 +940,7 @@ def get_order(order_id):
 # ===== ДОПОЛНИТЕЛЬНЫЕ ЭНДПОИНТЫ =====
 
 @app.route('/api/rolls/<int:roll_id>', methods=['GET'])
+@read_only
 def get_roll_details(roll_id):
     try:
         roll = Roll.query.get(roll_id)
@@ -724,7 +956,7 @@ def get_roll_details(roll_id):
             'image_url': roll.image_url,
             'category': 'roll',
             'is_available': True,
-            'ingredients': [ing.to_dict() for ing in roll.ingredients]
+            'ingredients': serialize(roll.ingredients, *request_fields())
         }
         
         return jsonify({
@@ -732,13 +964,20 @@ def get_roll_details(roll_id):
             'roll': roll_data
         }), 200
         
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Ошибка получения ролла: {str(e)}'}), 500
 
 @app.route('/api/sets/<int:set_id>', methods=['GET'])
+@read_only
 def get_set_details(set_id):
     try:
-        set_item = Set.query.get(set_id)
+        # Состав сета со всеми вложенными объектами - четыре запроса вместо запроса на каждый ролл и ингредиент
+        set_item = db.session.get(Set, set_id, options=[
+            db.selectinload(Set.rolls).selectinload(SetRoll.roll)
+            .selectinload(Roll.ingredients).selectinload(RollIngredient.ingredient)
+        ])
         if not set_item:
             return jsonify({'error': 'Сет не найден'}), 404
         
@@ -750,7 +989,7 @@ def get_set_details(set_id):
             'set_price': set_item.set_price,
             'image_url': set_item.image_url,
             'is_available': True,
-            'rolls': [sr.to_dict() for sr in set_item.rolls]
+            'rolls': serialize(set_item.rolls, *request_fields())
         }
         
         return jsonify({
@@ -758,6 +997,8 @@ def get_set_details(set_id):
             'set': set_data
         }), 200
         
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Ошибка получения сета: {str(e)}'}), 500
 
@@ -765,6 +1006,7 @@ def get_set_details(set_id):
 
 @app.route('/api/admin/ingredients', methods=['GET'])
 @jwt_required()
+@read_only
 def get_admin_ingredients():
     try:
         user_id = get_jwt_identity()
@@ -777,15 +1019,18 @@ def get_admin_ingredients():
         
         return jsonify({
             'success': True,
-            'ingredients': [ing.to_dict() for ing in ingredients],
+            'ingredients': serialize(ingredients, *request_fields()),
             'total': len(ingredients)
         }), 200
         
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Ошибка получения ингредиентов: {str(e)}'}), 500
 
 @app.route('/api/admin/users', methods=['GET'])
 @jwt_required()
+@read_only
 def get_admin_users():
     try:
         user_id = get_jwt_identity()
@@ -798,15 +1043,18 @@ def get_admin_users():
         
         return jsonify({
             'success': True,
-            'users': [user.to_dict() for user in users],
+            'users': serialize(users, *request_fields()),
             'total': len(users)
         }), 200
         
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Ошибка получения пользователей: {str(e)}'}), 500
 
 @app.route('/api/admin/stats', methods=['GET'])
 @jwt_required()
+@read_only
 def get_admin_stats():
     try:
         user_id = get_jwt_identity()
@@ -845,6 +1093,7 @@ def get_admin_stats():
 
 @app.route('/api/admin/rolls/<int:roll_id>/recipe', methods=['GET'])
 @jwt_required()
+@read_only
 def get_roll_recipe(roll_id):
     try:
         user_id = get_jwt_identity()
@@ -860,7 +1109,7 @@ def get_roll_recipe(roll_id):
         recipe_data = {
             'roll_id': roll.id,
             'roll_name': roll.name,
-            'ingredients': [ing.to_dict() for ing in roll.ingredients]
+            'ingredients': serialize(roll.ingredients, *request_fields())
         }
         
         return jsonify({
@@ -868,20 +1117,105 @@ def get_roll_recipe(roll_id):
             'recipe': recipe_data
         }), 200
         
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Ошибка получения рецептуры: {str(e)}'}), 500
 
+@app.route('/api/admin/menu/reload', methods=['POST'])
+@jwt_required()
+def reload_menu_endpoint():
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or not user.is_admin:
+            return jsonify({'error': 'Доступ запрещен'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        
+        # Меню из assets/data применяется одной транзакцией, снимок меню обновляется сразу
+        report = reload_menu(
+            prune=bool(data.get('prune', False)),
+            dry_run=bool(data.get('dry_run', False))
+        )
+        
+        return jsonify({
+            'success': True,
+            'dry_run': bool(data.get('dry_run', False)),
+            'menu_version': get_menu_version(),
+            'changes': report['tables'],
+            'warnings': report['warnings'],
+            'errors': report['errors']
+        }), 200
+        
+    except MenuReloadInProgress as e:
+        return jsonify({'error': str(e)}), 409
+    except MenuImportError as e:
+        return jsonify({'error': f'Ошибки в файлах меню: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Ошибка перезагрузки меню: {str(e)}'}), 500
+
+@app.route('/api/admin/debug/queries', methods=['GET'])
+@jwt_required()
+def get_query_stats():
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or not user.is_admin:
+            return jsonify({'error': 'Доступ запрещен'}), 403
+        
+        # Последние запросы этого процесса с числом SQL-запросов и временем БД
+        limit = request.args.get('limit', 50, type=int)
+        requests_log = get_recent_requests(endpoint=request.args.get('endpoint'))
+        
+        return jsonify({
+            'success': True,
+            'endpoints': summarize_by_endpoint(requests_log),
+            'requests': requests_log[:limit],
+            'total': len(requests_log)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Ошибка получения статистики запросов: {str(e)}'}), 500
+
+@app.route('/api/admin/debug/slow-queries', methods=['GET'])
+@jwt_required()
+def get_slow_query_stats():
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or not user.is_admin:
+            return jsonify({'error': 'Доступ запрещен'}), 403
+        
+        # Медленные запросы этого процесса по отпечаткам, с планом и признаком полного прохода таблицы
+        queries = get_slow_queries(limit=request.args.get('limit', 50, type=int))
+        
+        return jsonify({
+            'success': True,
+            'queries': queries,
+            'total': len(queries)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Ошибка получения медленных запросов: {str(e)}'}), 500
+
 @app.route('/api/other-items', methods=['GET'])
+@read_only
 def get_other_items():
     try:
         other_items = OtherItem.query.all()
         
         return jsonify({
             'success': True,
-            'other_items': [item.to_dict() for item in other_items],
+            'other_items': serialize(other_items, *request_fields()),
             'total': len(other_items)
         }), 200
         
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Ошибка получения дополнительных товаров: {str(e)}'}), 500
 
@@ -933,20 +1267,8 @@ def get_loyalty_available_rolls():
         if not user:
             return jsonify({'error': 'Пользователь не найден'}), 404
         
-        # Получаем доступные роллы для накопительных карт
-        loyalty_rolls = LoyaltyRoll.query.filter_by(is_available=True).all()
-        
-        rolls_data = []
-        for loyalty_roll in loyalty_rolls:
-            roll_data = {
-                'id': loyalty_roll.id,
-                'roll_id': getattr(loyalty_roll, 'roll_id', 0),
-                'required_stamps': getattr(loyalty_roll, 'required_stamps', 10),
-                'is_available': getattr(loyalty_roll, 'is_available', True),
-                'roll_name': getattr(loyalty_roll, 'roll_name', 'Бесплатный ролл'),
-                'roll_description': getattr(loyalty_roll, 'roll_description', 'Описание ролла')
-            }
-            rolls_data.append(roll_data)
+        # Доступные роллы накопительной системы с реальными названиями и ценами (из снимка меню)
+        rolls_data = get_menu_section('loyalty_rolls')
         
         return jsonify({
             'success': True,
@@ -1002,22 +1324,42 @@ def get_my_referral_code():
         if not user:
             return jsonify({'error': 'Пользователь не найден'}), 404
         
-        # Генерируем реферальный код если его нет
+        # Выдаем реферальный код из заранее сгенерированного пула, если его нет
         if not user.referral_code:
-            import random
-            import string
-            user.referral_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            db.session.commit()
+            assign_referral_code(user)
         
         return jsonify({
             'success': True,
             'referral_code': user.referral_code,
-            'referrals_count': 0  # Можно добавить подсчет рефералов
+            'bonus_points': user.bonus_points or 0,
+            'referrals_count': user.referrals_count or 0
         }), 200
         
+    except ReferralCodeUnavailable as e:
+        # Все попытки столкнулись с кодами других пользователей - клиент может повторить запрос
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': f'Ошибка получения реферального кода: {str(e)}'}), 500
 
+@app.route('/api/referral/check-code', methods=['POST'])
+def check_referral_code():
+    try:
+        data = request.get_json()
+        
+        referrer = find_referrer(data.get('referral_code'))
+        if not referrer:
+            return jsonify({'error': 'Реферальный код не найден'}), 404
+        
+        return jsonify({
+            'success': True,
+            'valid': True,
+            'referrer_name': referrer.name,
+            'message': 'Реферальный код действителен'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Ошибка проверки реферального кода: {str(e)}'}), 500
+
 @app.route('/api/referral/history', methods=['GET'])
 @jwt_required()
 def get_referral_history():
@@ -1028,23 +1370,17 @@ def get_referral_history():
         if not user:
             return jsonify({'error': 'Пользователь не найден'}), 404
         
-        # Получаем историю рефералов
-        referral_history = ReferralUsage.query.filter_by(referrer_id=user_id).order_by(ReferralUsage.created_at.desc()).all()
-        
-        history_data = []
-        for referral in referral_history:
-            history_item = {
-                'id': referral.id,
-                'referred_user_id': referral.referred_user_id,
-                'created_at': referral.created_at.isoformat() if referral.created_at else None,
-                'bonus_points_earned': referral.bonus_points_earned
-            }
-            history_data.append(history_item)
+        # Итоги берем из счетчиков пользователя, список - последние приглашения
+        referrals_made = get_referrals_made(user_id)
         
         return jsonify({
             'success': True,
-            'referral_history': history_data,
-            'total': len(history_data)
+            'referred_by': get_referred_by_info(user),
+            'referrals_made': referrals_made,
+            'total_referrals_made': user.referrals_count or 0,
+            'total_bonus_points_earned': user.referral_bonus_earned or 0,
+            'referral_history': referrals_made,
+            'total': user.referrals_count or 0
         }), 200
         
     except Exception as e:
@@ -1053,7 +1389,7 @@ def get_referral_history():
 if __name__ == '__main__':
     with app.app_context():
         print('✅ База данных SQLite подключена!')
-        print(f'📁 Файл: sushi_express.db')
+        print(f'📁 Файл: {DB_PATH}')
         print('📊 Доступные таблицы:')
         print('   - users')
         print('   - ingredients')
@@ -1067,6 +1403,18 @@ if __name__ == '__main__':
         print('   - loyalty_rolls')
         print('   - loyalty_card_usage')
         print('✅ Система накопительных карт активна')
+        pending = get_pending_migrations(db.engine)
+        if pending:
+            print(f'⚠️ Не применены миграции схемы: {", ".join(name for _, name in pending)}')
+            print('   Запустите: python migrations.py')
+        schema = verify_schema(db.engine)
+        if schema['checked']:
+            if schema['ok']:
+                print(f"✅ Схема БД совпадает с моделями (отпечаток {schema['fingerprint']})")
+            else:
+                print(f"⚠️ Схема БД не совпадает с моделями, нет: {', '.join(schema['missing'][:10])}")
+        for stray_path in find_stray_databases():
+            print(f'⚠️ Найден другой файл БД, он НЕ используется: {stray_path}')
         print('🚀 Запуск Sushi Express API с SQLite базой данных...')
         print('🌐 API будет доступен по адресу: http://localhost:5000')
         print('📊 База данных: SQLite (sushi_express.db)')
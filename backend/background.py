@@ -0,0 +1,69 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировку не берем, сервер там один процесс
+    fcntl = None
+
+from config import (MENU_AUTO_RELOAD, MENU_WATCH_INTERVAL, BACKUP_INTERVAL_MINUTES, BACKUP_KEEP,
+                    BACKGROUND_LOCK_PATH, DB_PATH, IS_SQLITE)
+from backup import start_backup_scheduler
+from menu_reload import start_menu_watcher
+
+# Фоновые задачи узла: слежение за файлами меню (MENU_AUTO_RELOAD) и снимки БД
+# по расписанию (BACKUP_INTERVAL_MINUTES). Одинаково для app_sqlite.py и gunicorn (app.py).
+# Задачи запускаются при первом запросе, а не при импорте: мастер gunicorn (--preload)
+# и родительский процесс перезагрузчика Werkzeug (debug=True) запросов не обслуживают
+# и потоков не запускают. Из воркеров узла задачи запускает один - тот, кто взял
+# блокировку файла BACKGROUND_LOCK_PATH; она держится до завершения процесса, и после
+# перезапуска воркера задачи подхватывает следующий обслуживающий запрос процесс.
+
+_lock = threading.Lock()
+_state = {'pid': None, 'owner': False, 'lock_file': None}
+
+
+def _acquire_node_lock():
+    if fcntl is None:
+        return True
+    lock_file = open(BACKGROUND_LOCK_PATH, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False  # Задачи уже выполняет другой процесс узла
+    _state['lock_file'] = lock_file
+    return True
+
+
+def start_background_tasks(app):
+    """Запускает фоновые задачи, если на узле их еще никто не выполняет. True - выполняются в этом процессе"""
+    with _lock:
+        if _state['pid'] == os.getpid():
+            return _state['owner']
+        _state.update(pid=os.getpid(), owner=False)
+        if not (MENU_AUTO_RELOAD or BACKUP_INTERVAL_MINUTES) or not _acquire_node_lock():
+            return False
+        _state['owner'] = True
+
+    if MENU_AUTO_RELOAD:
+        start_menu_watcher(app, interval=MENU_WATCH_INTERVAL)
+        print(f'🔄 Слежение за файлами меню включено (процесс {os.getpid()})')
+    if BACKUP_INTERVAL_MINUTES:
+        if IS_SQLITE:
+            start_backup_scheduler(DB_PATH, interval_minutes=BACKUP_INTERVAL_MINUTES, keep=BACKUP_KEEP)
+            print(f'💾 Резервное копирование по расписанию включено (процесс {os.getpid()})')
+        else:
+            print('⚠️ BACKUP_INTERVAL_MINUTES работает только для SQLite, PostgreSQL копируется pg_dump')
+    return True
+
+
+def init_background_tasks(app):
+    """Запуск фоновых задач при первом запросе процесса"""
+    if not (MENU_AUTO_RELOAD or BACKUP_INTERVAL_MINUTES):
+        return
+
+    @app.before_request
+    def _start_background_tasks():
+        if _state['pid'] != os.getpid():
+            start_background_tasks(app)
@@ -0,0 +1,181 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from config import DB_PATH as DEFAULT_DB_PATH
+
+# Горячее резервное копирование SQLite без остановки сервера.
+# Вместо копирования файла (небезопасно во время записи) используется backup API SQLite.
+# - В режиме WAL читатель не мешает писателям, поэтому БД копируется одним шагом:
+#   получается согласованный снимок на момент начала, сервер все это время пишет.
+# - В обычном режиме (rollback journal) чтение блокирует commit писателей, поэтому
+#   страницы копируются небольшими порциями, между порциями блокировка снимается.
+#   Если за время копирования БД изменилась, SQLite начинает заново - после
+#   нескольких таких перезапусков остаток копируется за один шаг.
+# Перевести БД в WAL можно один раз: python backup.py --enable-wal
+# Копия пишется во временный файл, проверяется и только потом переименовывается,
+# поэтому в каталоге снимков никогда не бывает недописанного файла.
+
+BACKUP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backups')
+
+BACKUP_PAGES_PER_STEP = 256  # 1 МБ при странице 4 КБ
+BACKUP_STEP_PAUSE = 0.005  # Пауза между порциями (секунды) - окно для писателей
+BACKUP_MAX_RESTARTS = 5  # Сколько раз позволяем копированию начаться заново из-за записи
+BACKUP_KEEP = 7  # Сколько снимков хранить
+
+SNAPSHOT_PREFIX = 'sushi_express-'
+SNAPSHOT_TIME_FORMAT = '%Y%m%d-%H%M%S'
+
+_snapshot_lock = threading.Lock()
+
+
+class BackupError(Exception):
+    """Резервная копия не создана или не прошла проверку"""
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def backup_database(source_path, target_path, pages=BACKUP_PAGES_PER_STEP, pause=BACKUP_STEP_PAUSE,
+                    max_restarts=BACKUP_MAX_RESTARTS):
+    """Копирует работающую БД в target_path. Возвращает статистику копирования"""
+    if not os.path.exists(source_path):
+        raise BackupError(f'Файл БД не найден: {source_path}')
+
+    partial_path = target_path + '.partial'
+    stats = {'pages': 0, 'steps': 0, 'restarts': 0, 'seconds': 0.0}
+    started = time.perf_counter()
+    last_remaining = [None]
+
+    source = sqlite3.connect(source_path, timeout=30)
+    target = sqlite3.connect(partial_path)
+    try:
+        stats['journal_mode'] = source.execute('PRAGMA journal_mode').fetchone()[0]
+        if stats['journal_mode'] == 'wal':
+            pages = -1  # Снимок одним шагом, писатели не блокируются
+
+        def progress(status, remaining, total):
+            stats['steps'] += 1
+            stats['pages'] = total
+            # remaining вырос - источник изменился и копирование началось сначала
+            if last_remaining[0] is not None and remaining > last_remaining[0]:
+                stats['restarts'] += 1
+                if stats['restarts'] > max_restarts:
+                    raise _TooManyRestarts()
+            last_remaining[0] = remaining
+
+        try:
+            source.backup(target, pages=pages, progress=progress, sleep=pause)
+        except _TooManyRestarts:
+            # БД пишут быстрее, чем мы успеваем копировать: остаток копируем одним шагом
+            # (одна блокировка чтения на время копирования вместо бесконечной гонки с писателями)
+            source.backup(target, pages=-1)
+            stats['steps'] += 1
+
+        result = target.execute('PRAGMA quick_check').fetchone()[0]
+        if result != 'ok':
+            raise BackupError(f'Копия повреждена: {result}')
+    except sqlite3.Error as e:
+        raise BackupError(f'Ошибка резервного копирования: {e}')
+    finally:
+        target.close()
+        source.close()
+
+    try:
+        os.replace(partial_path, target_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    stats['size'] = os.path.getsize(target_path)
+    return stats
+
+
+def enable_wal(db_path=DEFAULT_DB_PATH):
+    """Переводит БД в режим WAL (настройка хранится в самом файле БД)"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        return conn.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def list_snapshots(backup_dir=BACKUP_DIR):
+    """Снимки в каталоге, от старых к новым"""
+    if not os.path.isdir(backup_dir):
+        return []
+    names = sorted(
+        name for name in os.listdir(backup_dir)
+        if name.startswith(SNAPSHOT_PREFIX) and name.endswith('.db')
+    )
+    return [os.path.join(backup_dir, name) for name in names]
+
+
+def prune_snapshots(backup_dir=BACKUP_DIR, keep=BACKUP_KEEP):
+    """Удаляет старые снимки, оставляя keep последних. Возвращает удаленные пути"""
+    snapshots = list_snapshots(backup_dir)
+    removed = snapshots[:-keep] if keep > 0 else snapshots
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def create_snapshot(db_path=DEFAULT_DB_PATH, backup_dir=BACKUP_DIR, keep=BACKUP_KEEP, **options):
+    """Создает снимок с отметкой времени в backup_dir и применяет политику хранения"""
+    with _snapshot_lock:
+        os.makedirs(backup_dir, exist_ok=True)
+        name = f'{SNAPSHOT_PREFIX}{datetime.now().strftime(SNAPSHOT_TIME_FORMAT)}.db'
+        path = os.path.join(backup_dir, name)
+        stats = backup_database(db_path, path, **options)
+        stats['path'] = path
+        stats['removed'] = prune_snapshots(backup_dir, keep)
+        return stats
+
+
+def start_backup_scheduler(db_path=DEFAULT_DB_PATH, backup_dir=BACKUP_DIR, interval_minutes=60, keep=BACKUP_KEEP):
+    """Снимки по расписанию в фоновом потоке"""
+    def run():
+        while True:
+            time.sleep(interval_minutes * 60)
+            try:
+                stats = create_snapshot(db_path, backup_dir, keep)
+                print(f"💾 Снимок БД: {os.path.basename(stats['path'])} "
+                      f"({stats['size'] // 1024} КБ, {stats['seconds']} с)")
+            except Exception as e:
+                print(f"❌ Ошибка резервного копирования: {e}")
+
+    thread = threading.Thread(target=run, name='db-backup', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Горячая резервная копия SQLite')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Путь к файлу SQLite')
+    parser.add_argument('--out', help='Скопировать в этот файл (иначе - снимок в --dir)')
+    parser.add_argument('--dir', default=BACKUP_DIR, help='Каталог снимков')
+    parser.add_argument('--keep', type=int, default=BACKUP_KEEP, help='Сколько снимков хранить')
+    parser.add_argument('--pages', type=int, default=BACKUP_PAGES_PER_STEP, help='Страниц за один шаг')
+    parser.add_argument('--every', type=int, help='Делать снимок каждые N минут (не завершаться)')
+    parser.add_argument('--enable-wal', action='store_true', help='Перевести БД в режим WAL и выйти')
+    args = parser.parse_args()
+
+    if args.enable_wal:
+        print(f"✅ Режим журнала: {enable_wal(args.db)}")
+    elif args.out:
+        result = backup_database(args.db, args.out, pages=args.pages)
+        print(f"✅ Копия {args.out}: {result['size'] // 1024} КБ за {result['seconds']} с, "
+              f"режим {result['journal_mode']}, шагов {result['steps']}, перезапусков {result['restarts']}")
+    else:
+        while True:
+            result = create_snapshot(args.db, args.dir, args.keep, pages=args.pages)
+            print(f"✅ Снимок {result['path']}: {result['size'] // 1024} КБ за {result['seconds']} с, "
+                  f"удалено старых: {len(result['removed'])}")
+            if not args.every:
+                break
+            time.sleep(args.every * 60)
@@ -0,0 +1,154 @@
+import argparse
+import json
+import math
+import os
+import tempfile
+import time
+import zlib
+
+# Бенчмарк сжатия ответов (compression.py) на реальных ответах API по синтетическим
+# данным generate_scale_data.py: все заказы, пользователи с корзинами и избранным,
+# сет с роллами, меню, история заказов покупателя.
+# Для каждого ответа и сжатия (gzip 1/6/9, zstd - если установлен zstandard):
+# размер, время сжатия на сервере и полное время доставки мобильному клиенту
+# (сжатие + передача по сети + распаковка на телефоне). Отдельно - выигрыш на
+# маленьких ответах (порог COMPRESS_MIN_SIZE) и накладные расходы на запрос целиком.
+#
+#   python bench_compression.py [--users 300] [--repeat 5]
+
+# Пропускная способность мобильных сетей, бит/с (задержка RTT не зависит от сжатия и не учитывается)
+NETWORKS = (('EDGE', 200_000), ('3G', 1_600_000), ('4G', 12_000_000), ('Wi-Fi', 50_000_000))
+MOBILE_CPU_SLOWDOWN = 4  # Во сколько раз распаковка на телефоне среднего класса медленнее, чем на сервере
+TCP_PAYLOAD = 1460  # Байт данных в одном TCP-пакете
+THRESHOLD_SIZES = (200, 500, 1000, 1500, 3000, 10000)
+
+
+def cpu_ms(func, repeat):
+    """Процессорное время на один вызов, мс (лучший из трех прогонов)"""
+    best = None
+    for _ in range(3):
+        started = time.process_time()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.process_time() - started) / repeat * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def codecs():
+    from compression import compress, zstandard
+
+    variants = [(f'gzip-{level}', 'gzip', level) for level in (1, 6, 9)]
+    if zstandard is not None:
+        variants += [(f'zstd-{level}', 'zstd', level) for level in (1, 3, 10)]
+    for title, encoding, level in variants:
+        if encoding == 'gzip':
+            decompress = lambda data: zlib.decompress(data, 31)  # noqa: E731
+        else:
+            decompress = zstandard.ZstdDecompressor().decompress
+        yield title, (lambda data, encoding=encoding, level=level: compress(data, encoding, level)), decompress
+
+
+def seed_carts(app):
+    """Корзины и избранное части пользователей - admin/users отдает их строками JSON"""
+    from models import db, User
+
+    with app.app_context():
+        for user in User.query.filter(User.id % 3 == 0):
+            user.cart = json.dumps([{'item_type': 'roll', 'item_id': user.id % 300 + 1, 'quantity': 2,
+                                     'name': f'Ролл {user.id % 300 + 1}', 'price': 350}] * 3, ensure_ascii=False)
+            user.favorites = json.dumps([{'item_type': 'roll', 'item_id': i} for i in range(1, 6)])
+        db.session.commit()
+
+
+def report_endpoints(bodies, repeat):
+    print(f"\n{'ответ':<22} {'сжатие':<8} {'КБ':>8} {'в раз':>6} {'сжатие мс':>10}  "
+          + '  '.join(f'{name + " мс":>9}' for name, _ in NETWORKS))
+    for title, body in bodies.items():
+        rows = [('нет', len(body), 0.0, 0.0)]
+        for name, compress, decompress in codecs():
+            compressed = compress(body)
+            rows.append((name, len(compressed), cpu_ms(lambda: compress(body), repeat),
+                         cpu_ms(lambda: decompress(compressed), repeat) * MOBILE_CPU_SLOWDOWN))
+        for name, size, compress_ms, decompress_ms in rows:
+            # Доставка: сжатие на сервере + передача + распаковка на телефоне
+            delivery = [compress_ms + size * 8 / bandwidth * 1000 + decompress_ms for _, bandwidth in NETWORKS]
+            print(f"{title:<22} {name:<8} {size / 1024:>8.1f} {len(body) / size:>6.1f} {compress_ms:>10.2f}  "
+                  + '  '.join(f'{ms:>9.0f}' for ms in delivery))
+            title = ''
+
+
+def report_threshold(sample, repeat):
+    """Выигрыш сжатия на маленьких ответах: байты и TCP-пакеты против времени процессора"""
+    from compression import compress
+
+    print(f"\n{'байт':>6} {'gzip':>6} {'пакетов':>8} {'сжатие мкс':>11}")
+    for size in THRESHOLD_SIZES:
+        body = sample[:size]
+        compressed = compress(body, 'gzip')
+        packets = f'{math.ceil(size / TCP_PAYLOAD)} -> {math.ceil(len(compressed) / TCP_PAYLOAD)}'
+        print(f'{size:>6} {len(compressed):>6} {packets:>8} {cpu_ms(lambda: compress(body, "gzip"), repeat) * 1000:>11.0f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк сжатия ответов')
+    parser.add_argument('--users', type=int, default=300, help='Пользователей в синтетических данных')
+    parser.add_argument('--repeat', type=int, default=5, help='Повторов на замер')
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['SQLITE_DB_PATH'] = db_path
+    os.environ.setdefault('REQUEST_LOG', 'off')  # Журнал запросов тестового клиента не нужен
+
+    from app_sqlite import app
+    from models import db, User, Order
+    from migrations import migrate
+    from generate_scale_data import generate, SCALE_PASSWORD, USER_EMAIL
+
+    try:
+        with app.app_context():
+            migrate(db.engine)
+            generate(db.engine, args.users)
+            db.session.query(User).filter(User.id == 1).update({User.is_admin: True})
+            db.session.commit()
+            # История заказов - у самого активного покупателя
+            buyer_id = db.session.query(Order.user_id).group_by(Order.user_id).order_by(
+                db.func.count(Order.id).desc()).limit(1).scalar()
+        seed_carts(app)
+
+        client = app.test_client()
+
+        def auth(user_id):
+            login = client.post('/api/login', json={'email': USER_EMAIL.format(user_id), 'password': SCALE_PASSWORD})
+            return {'Authorization': f"Bearer {login.get_json()['access_token']}"}
+
+        headers, buyer_headers = auth(1), auth(buyer_id)
+        paths = {
+            'GET /api/orders/all': ('/api/orders/all', headers),
+            'GET /api/admin/users': ('/api/admin/users', headers),
+            'GET /api/orders': ('/api/orders', buyer_headers),
+            'GET /api/rolls': ('/api/rolls', {}),
+            'GET /api/sets/1': ('/api/sets/1', {}),
+        }
+        bodies = {title: client.get(path, headers=auth_headers).data for title, (path, auth_headers) in paths.items()}
+        print(f"📦 Пользователей: {args.users}, распаковка на телефоне: x{MOBILE_CPU_SLOWDOWN} от сервера")
+        report_endpoints(bodies, args.repeat)
+        report_threshold(bodies['GET /api/orders/all'], args.repeat * 100)
+
+        # Запрос целиком: сериализация + сжатие в after_request против ответа без сжатия
+        print()
+        for title in ('GET /api/orders/all', 'GET /api/admin/users'):
+            path = paths[title][0]
+            plain = cpu_ms(lambda: client.get(path, headers=headers), args.repeat)
+            gzipped = cpu_ms(lambda: client.get(path, headers={**headers, 'Accept-Encoding': 'gzip'}), args.repeat)
+            print(f'⏱️ {title}: без сжатия {plain:.1f} мс, gzip {gzipped:.1f} мс на запрос '
+                  f'(+{(gzipped - plain) / plain:.0%} процессора)')
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Микробенчмарки горячих путей API на синтетической БД заданного размера:
+# сериализация моделей, корзина с ценами, расчет и создание заказа, история заказов,
+# роллы накопительной системы и карточка ролла. Все вызовы - в процессе, через Flask test client.
+# Результаты сохраняются в JSON (с хешем коммита), их можно сравнить с прошлым прогоном:
+#
+#   python bench_hot_paths.py --rolls 5000 --order-items 2000000 --db /tmp/bench.db
+#   python bench_hot_paths.py --db /tmp/bench.db --compare bench_results/hot_paths-<commit>.json
+#
+# С --db синтетическая БД сохраняется и при следующем запуске используется повторно
+# (заполнение миллионов строк занимает время). Код выхода 1 - есть регрессии больше --threshold.
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'bench_results')
+
+BENCH_EMAIL = 'bench@hotpaths.local'
+BENCH_PASSWORD = 'bench-password'
+INSERT_BATCH = 10000
+BENCH_ORDER_SHARE = 100  # Каждый сотый заказ (начиная с первого) - покупателя бенчмарка, остальные - случайных
+
+
+def generate(engine, rolls_count, order_items_count, users_count=1000, seed=42):
+    """Синтетическое меню и история заказов (пачками через executemany)"""
+    from werkzeug.security import generate_password_hash
+    from models import User, Ingredient, Roll, RollIngredient, Set, SetRoll, Order, OrderItem, LoyaltyRoll
+
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    sets_count = max(rolls_count // 10, 1)
+    orders_count = max(order_items_count // 5, 1)
+
+    def insert(conn, table, rows):
+        for start in range(0, len(rows), INSERT_BATCH):
+            conn.execute(table.insert(), rows[start:start + INSERT_BATCH])
+
+    with engine.begin() as conn:
+        password_hash = generate_password_hash(BENCH_PASSWORD)
+        insert(conn, User.__table__, [{
+            'id': i, 'name': f'Покупатель {i}', 'email': BENCH_EMAIL if i == 1 else f'user{i}@hotpaths.local',
+            'phone': '0', 'password_hash': password_hash, 'cart': '[]', 'bonus_points': 0,
+            'loyalty_points': 0, 'is_active': True, 'is_admin': False, 'created_at': now,
+        } for i in range(1, users_count + 1)])
+        insert(conn, Ingredient.__table__, [{
+            'id': i, 'name': f'ингредиент {i}', 'cost_per_unit': 1, 'price_per_unit': 1.5, 'unit': 'г',
+            'stock_quantity': 10000, 'created_at': now, 'updated_at': now,
+        } for i in range(1, 501)])
+        insert(conn, Roll.__table__, [{
+            'id': i, 'name': f'ролл {i}', 'description': f'Описание ролла {i}', 'cost_price': 100,
+            'sale_price': rnd.randint(200, 600), 'image_url': f'/img/roll{i}.png', 'is_popular': False,
+            'is_new': False, 'created_at': now, 'updated_at': now,
+        } for i in range(1, rolls_count + 1)])
+        insert(conn, RollIngredient.__table__, [{
+            'roll_id': roll_id, 'ingredient_id': ingredient_id, 'amount_per_roll': 20,
+        } for roll_id in range(1, rolls_count + 1) for ingredient_id in rnd.sample(range(1, 501), 5)])
+        insert(conn, Set.__table__, [{
+            'id': i, 'name': f'сет {i}', 'cost_price': 500, 'set_price': rnd.randint(900, 3000),
+            'discount_percent': 0, 'is_popular': False, 'is_new': False, 'created_at': now, 'updated_at': now,
+        } for i in range(1, sets_count + 1)])
+        insert(conn, SetRoll.__table__, [{
+            'set_id': set_id, 'roll_id': roll_id, 'quantity': 1,
+        } for set_id in range(1, sets_count + 1) for roll_id in rnd.sample(range(1, rolls_count + 1), 6)])
+        insert(conn, LoyaltyRoll.__table__, [{
+            'roll_id': roll_id, 'is_available': True, 'created_at': now,
+        } for roll_id in range(1, min(rolls_count, 20) + 1)])
+
+        # Заказы генерируются и вставляются пачками, чтобы не держать миллионы строк в памяти
+        for start in range(1, orders_count + 1, INSERT_BATCH):
+            order_ids = range(start, min(start + INSERT_BATCH, orders_count + 1))
+            conn.execute(Order.__table__.insert(), [{
+                'id': order_id, 'phone': '0',
+                'user_id': 1 if order_id % BENCH_ORDER_SHARE == 1 else rnd.randint(1, users_count),
+                'delivery_address': 'ул. Тестовая, 1', 'payment_method': 'cash', 'status': 'Доставлен',
+                'total_price': 1500, 'created_at': now - timedelta(minutes=order_id), 'updated_at': now,
+            } for order_id in order_ids])
+            conn.execute(OrderItem.__table__.insert(), [{
+                'order_id': order_id, 'item_type': 'roll', 'item_id': rnd.randint(1, rolls_count),
+                'quantity': 1, 'unit_price': 300, 'total_price': 300,
+            } for order_id in order_ids for _ in range(5)])
+    return {'rolls': rolls_count, 'sets': sets_count, 'orders': orders_count, 'order_items': orders_count * 5}
+
+
+def measure(func, setup=None, rounds=200, warmup=10):
+    """Время одного вызова func (setup не замеряется). Возвращает статистику в миллисекундах"""
+    timings = []
+    for index in range(warmup + rounds):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        if index >= warmup:
+            timings.append(elapsed * 1000)
+    timings.sort()
+    return {
+        'rounds': rounds,
+        'min_ms': round(timings[0], 4),
+        'median_ms': round(statistics.median(timings), 4),
+        'mean_ms': round(statistics.fmean(timings), 4),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 4),
+        'stdev_ms': round(statistics.stdev(timings), 4) if len(timings) > 1 else 0.0,
+        'ops_per_sec': round(1000 / statistics.median(timings), 1),
+    }
+
+
+def run_benchmarks(app, rounds):
+    from models import db, User, Roll, RollIngredient, Order, OrderItem
+    from serializers import serialize
+
+    client = app.test_client()
+    token = client.post('/api/login', json={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD}).get_json()
+    headers = {'Authorization': f"Bearer {token['access_token']}"}
+
+    # Только роллы: сет в корзине сейчас ломает GET /api/cart (у Set нет атрибута composition)
+    cart = json.dumps([{'item_type': 'roll', 'item_id': roll_id, 'quantity': 2} for roll_id in range(1, 9)])
+
+    def fill_cart():
+        with app.app_context():
+            db.session.query(User).filter_by(email=BENCH_EMAIL).update({'cart': cart})
+            db.session.commit()
+
+    def expect(response, status):
+        assert response.status_code == status, f'{response.status_code}: {response.get_data(as_text=True)[:200]}'
+
+    results = {}
+    with app.app_context():
+        roll = db.session.get(Roll, 1, options=[db.selectinload(Roll.ingredients).selectinload(RollIngredient.ingredient)])
+        user_id = db.session.query(User.id).filter_by(email=BENCH_EMAIL).scalar()
+        orders = Order.query.options(db.selectinload(Order.items)).filter_by(
+            user_id=user_id
+        ).order_by(Order.id).limit(50).all()
+        order = orders[0]
+        last_order_id = db.session.query(db.func.max(Order.id)).scalar()
+
+        results['roll_to_dict'] = measure(roll.to_dict, rounds=rounds * 5)
+        results['order_to_dict'] = measure(order.to_dict, rounds=rounds * 5)
+        results['orders_serialize_50'] = measure(lambda: serialize(orders), rounds=rounds)
+
+    fill_cart()
+    results['get_cart'] = measure(lambda: expect(client.get('/api/cart', headers=headers), 200), rounds=rounds)
+    try:
+        results['create_order'] = measure(
+            lambda: expect(client.post('/api/orders', headers=headers, json={'delivery_address': 'ул. Тестовая, 1'}), 201),
+            setup=fill_cart, rounds=rounds
+        )
+    finally:
+        # Созданные заказы удаляем, чтобы повторный прогон на той же БД мерил то же самое
+        with app.app_context():
+            created = db.session.query(Order.id).filter(Order.id > last_order_id)
+            db.session.query(OrderItem).filter(OrderItem.order_id.in_(created.scalar_subquery())).delete(
+                synchronize_session=False)
+            db.session.query(Order).filter(Order.id > last_order_id).delete(synchronize_session=False)
+            db.session.commit()
+    results['orders_history_summary'] = measure(
+        lambda: expect(client.get('/api/orders?view=summary&limit=20', headers=headers), 200), rounds=rounds
+    )
+    results['loyalty_available_rolls'] = measure(
+        lambda: expect(client.get('/api/loyalty/available-rolls', headers=headers), 200), rounds=rounds
+    )
+    results['roll_details'] = measure(lambda: expect(client.get('/api/rolls/1'), 200), rounds=rounds)
+    results['set_details'] = measure(lambda: expect(client.get('/api/sets/1'), 200), rounds=rounds)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(baseline, current, threshold):
+    """Печатает изменения медиан относительно baseline. Возвращает число регрессий"""
+    print(f"\n📈 Сравнение с {baseline['commit']} ({baseline['created_at']}), порог {threshold:.0%}")
+    regressions = 0
+    for name, stats in current['results'].items():
+        old = baseline['results'].get(name)
+        if not old:
+            print(f'   🆕 {name}: {stats["median_ms"]} мс')
+            continue
+        change = stats['median_ms'] / old['median_ms'] - 1
+        marker = '❌' if change > threshold else '✅' if change < -threshold else '  '
+        regressions += change > threshold
+        print(f"   {marker} {name:<26} {old['median_ms']:>9.3f} -> {stats['median_ms']:>9.3f} мс ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Микробенчмарки горячих путей API')
+    parser.add_argument('--rolls', type=int, default=2000, help='Роллов в синтетическом меню')
+    parser.add_argument('--order-items', type=int, default=100000, help='Позиций заказов в истории')
+    parser.add_argument('--rounds', type=int, default=200, help='Замеров на бенчмарк')
+    parser.add_argument('--db', help='Файл синтетической БД: сохраняется и используется повторно')
+    parser.add_argument('--out', help='Файл результатов (по умолчанию bench_results/hot_paths-<commit>.json)')
+    parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Допустимое замедление медианы (0.10 = 10%%)')
+    args = parser.parse_args()
+
+    if args.db:
+        db_path, keep = os.path.abspath(args.db), True
+    else:
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.remove(db_path)
+        keep = False
+    reuse = os.path.exists(db_path)
+    os.environ['SQLITE_DB_PATH'] = db_path
+    os.environ.setdefault('REQUEST_LOG', 'off')  # Журнал запросов тестового клиента не нужен
+
+    from app_sqlite import app
+    from models import db
+    from migrations import migrate
+
+    try:
+        with app.app_context():
+            engine = db.engine
+        migrate(engine)
+        if reuse:
+            print(f'📂 Используется существующая БД {db_path}')
+            dataset = None
+        else:
+            started = time.perf_counter()
+            dataset = generate(engine, args.rolls, args.order_items)
+            print(f"📦 Синтетическая БД за {time.perf_counter() - started:.1f} с: {dataset}")
+
+        results = run_benchmarks(app, args.rounds)
+        report = {
+            'commit': git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'dataset': dataset or {'db': db_path},
+            'results': results,
+        }
+
+        print(f"\n{'Бенчмарк':<28} {'медиана':>10} {'p95':>10} {'мин':>10} {'оп/с':>10}")
+        for name, stats in results.items():
+            print(f"{name:<28} {stats['median_ms']:>8.3f}мс {stats['p95_ms']:>8.3f}мс "
+                  f"{stats['min_ms']:>8.3f}мс {stats['ops_per_sec']:>10}")
+
+        out = args.out or os.path.join(RESULTS_DIR, f"hot_paths-{report['commit']}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'💾 Результаты: {out}')
+
+        if args.compare:
+            with open(args.compare, encoding='utf-8') as f:
+                baseline = json.load(f)
+            return 1 if compare(baseline, report, args.threshold) else 0
+        return 0
+    finally:
+        if not keep:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import argparse
+import csv
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from models import db
+from menu_import import import_menu
+
+# Бенчмарк импорта меню на синтетических данных: первичная загрузка,
+# повторный импорт без изменений и импорт с изменением 10% цен.
+# Для сравнения - построчная вставка, как в старом load_real_data_fixed.py.
+
+
+def generate_menu(data_dir, rolls_count, ingredients_count=500, sets_count=1000, seed=42):
+    """Создает синтетические ingredients/rolls/sets/set_composition.csv"""
+    rnd = random.Random(seed)
+
+    with open(os.path.join(data_dir, 'ingredients.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['id', 'name', 'quantity', 'unit', 'price_per_unit'])
+        for i in range(1, ingredients_count + 1):
+            writer.writerow([i, f'ингредиент {i}', 10000, 'г', round(rnd.uniform(0.01, 3), 2)])
+
+    with open(os.path.join(data_dir, 'rolls.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['id', 'name', 'sale_price', 'cost', 'description', 'category', 'ingredients',
+                         'image_url', 'is_popular', 'is_new'])
+        for i in range(1, rolls_count + 1):
+            recipe = ', '.join(f'ингредиент {rnd.randint(1, ingredients_count)} {rnd.randint(5, 120)}г'
+                               for _ in range(5))
+            writer.writerow([i, f'ролл {i}', rnd.randint(80, 600), '', f'Описание ролла {i}', 'Классические',
+                             recipe, '', rnd.randint(0, 1), 0])
+
+    with open(os.path.join(data_dir, 'sets.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'name', 'cost_price', 'set_price', 'discount_percent'])
+        for i in range(1, sets_count + 1):
+            writer.writerow([i, f'сет {i}', '', rnd.randint(600, 4000), rnd.randint(0, 30)])
+
+    with open(os.path.join(data_dir, 'set_composition.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['set_id', 'roll_id', 'roll_name'])
+        for i in range(1, sets_count + 1):
+            for roll_id in rnd.sample(range(1, rolls_count + 1), 4):
+                writer.writerow([i, roll_id, f'ролл {roll_id}'])
+
+
+def change_prices(data_dir, share=0.1, seed=7):
+    """Меняет цену у части роллов"""
+    rnd = random.Random(seed)
+    path = os.path.join(data_dir, 'rolls.csv')
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f, delimiter=';'))
+    for row in rows[1:]:
+        if rnd.random() < share:
+            row[2] = str(int(row[2]) + 10)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, delimiter=';').writerows(rows)
+
+
+def row_by_row_baseline(db_path, data_dir):
+    """Построчная вставка роллов с отдельным INSERT на каждую строку (как в старом загрузчике)"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM rolls")
+    with open(os.path.join(data_dir, 'rolls.csv'), encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f, delimiter=';'):
+            cursor.execute('''
+                INSERT INTO rolls (name, description, cost_price, sale_price, image_url, is_popular, is_new)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (row['name'], row['description'], float(row['sale_price']) * 0.3, float(row['sale_price']),
+                  row['image_url'], row['is_popular'], row['is_new']))
+    conn.commit()
+    conn.close()
+
+
+def timed(title, func):
+    started = time.perf_counter()
+    result = func()
+    print(f"⏱️ {title}: {time.perf_counter() - started:.2f} с")
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Бенчмарк импорта меню')
+    parser.add_argument('--rolls', type=int, default=100000, help='Количество роллов в синтетическом меню')
+    parser.add_argument('--baseline', action='store_true', help='Также замерить построчную вставку')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='menu_bench_')
+    try:
+        db_path = os.path.join(work_dir, 'bench.db')
+        engine = create_engine(f'sqlite:///{db_path}')
+        db.metadata.create_all(engine)
+
+        timed(f'Генерация меню на {args.rolls} роллов', lambda: generate_menu(work_dir, args.rolls))
+
+        report = timed('Первичный импорт', lambda: import_menu(engine, work_dir))
+        print(f"   {report['tables']}")
+        report = timed('Повторный импорт без изменений', lambda: import_menu(engine, work_dir))
+        print(f"   {report['tables']}")
+        change_prices(work_dir)
+        report = timed('Импорт с изменением 10% цен', lambda: import_menu(engine, work_dir))
+        print(f"   {report['tables']}")
+
+        if args.baseline:
+            timed('Построчная вставка роллов (старый способ)', lambda: row_by_row_baseline(db_path, work_dir))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+# Бенчмарк сериализации ответов на синтетических данных: сеты (сет -> роллы ->
+# ингредиенты) и история заказов. Замеряется процессорное время:
+# - рукописные рекурсивные to_dict (как были в models.py) + стандартный json;
+# - скомпилированные кодировщики serializers.py + orjson;
+# - эндпоинты /api/sets/<id> и /api/orders целиком, со стандартным JSON Flask и с FastJSONProvider,
+#   а также с ?fields= (клиенту нужна только часть полей).
+#
+#   python bench_serialization.py [--sets 200] [--orders 500] [--repeat 20]
+
+
+def legacy_to_dict(obj):
+    """Рукописная рекурсивная сериализация, как в старых to_dict() моделей"""
+    from models import db, Roll, RollIngredient, Ingredient, Set, SetRoll, Order, OrderItem, OtherItem
+
+    def iso(value):
+        return value.isoformat() if value else None
+
+    if isinstance(obj, Ingredient):
+        return {'id': obj.id, 'name': obj.name, 'cost_per_unit': obj.cost_per_unit,
+                'price_per_unit': obj.price_per_unit, 'stock_quantity': obj.stock_quantity, 'unit': obj.unit,
+                'created_at': iso(obj.created_at), 'updated_at': iso(obj.updated_at)}
+    if isinstance(obj, RollIngredient):
+        return {'id': obj.id, 'roll_id': obj.roll_id, 'ingredient_id': obj.ingredient_id,
+                'amount_per_roll': obj.amount_per_roll,
+                'ingredient': legacy_to_dict(obj.ingredient) if obj.ingredient else None}
+    if isinstance(obj, Roll):
+        return {'id': obj.id, 'name': obj.name, 'description': obj.description, 'cost_price': obj.cost_price,
+                'sale_price': obj.sale_price, 'price': obj.sale_price, 'image_url': obj.image_url,
+                'is_popular': obj.is_popular, 'is_new': obj.is_new,
+                'ingredients': [legacy_to_dict(ing) for ing in obj.ingredients],
+                'created_at': iso(obj.created_at), 'updated_at': iso(obj.updated_at)}
+    if isinstance(obj, SetRoll):
+        return {'id': obj.id, 'set_id': obj.set_id, 'roll_id': obj.roll_id, 'quantity': obj.quantity,
+                'roll': legacy_to_dict(obj.roll) if obj.roll else None}
+    if isinstance(obj, Set):
+        return {'id': obj.id, 'name': obj.name, 'description': obj.description, 'cost_price': obj.cost_price,
+                'set_price': obj.set_price, 'discount_percent': obj.discount_percent, 'image_url': obj.image_url,
+                'is_popular': obj.is_popular, 'is_new': obj.is_new,
+                'rolls': [legacy_to_dict(sr) for sr in obj.rolls],
+                'created_at': iso(obj.created_at), 'updated_at': iso(obj.updated_at)}
+    if isinstance(obj, OrderItem):
+        # Запрос товара на каждую позицию
+        model = {'roll': Roll, 'set': Set, 'other_item': OtherItem}.get(obj.item_type)
+        product = db.session.get(model, obj.item_id) if model else None
+        return {'id': obj.id, 'order_id': obj.order_id, 'item_type': obj.item_type, 'item_id': obj.item_id,
+                'item_name': product.name if product else 'Товар',
+                'item_image': (product.image_url or '') if product else '',
+                'quantity': obj.quantity, 'unit_price': obj.unit_price, 'total_price': obj.total_price}
+    if isinstance(obj, Order):
+        return {'id': obj.id, 'user_id': obj.user_id, 'phone': obj.phone, 'delivery_address': obj.delivery_address,
+                'payment_method': obj.payment_method, 'status': obj.status, 'total_price': obj.total_price,
+                'comment': obj.comment, 'items': [legacy_to_dict(item) for item in obj.items],
+                'created_at': iso(obj.created_at), 'updated_at': iso(obj.updated_at)}
+    raise TypeError(type(obj))
+
+
+def generate(app, sets_count, orders_count, seed=42):
+    """Синтетическое меню и история заказов одного покупателя"""
+    from werkzeug.security import generate_password_hash
+    from models import db, User, Ingredient, Roll, RollIngredient, Set, SetRoll, Order, OrderItem
+
+    rnd = random.Random(seed)
+    with app.app_context():
+        db.session.add(User(name='Покупатель', email='bench@bench.local', phone='0',
+                            password_hash=generate_password_hash('bench')))
+        ingredients = [Ingredient(name=f'ингредиент {i}', cost_per_unit=1, price_per_unit=1.5, unit='г',
+                                  stock_quantity=1000) for i in range(100)]
+        rolls = [Roll(name=f'ролл {i}', description=f'Описание ролла {i}', cost_price=100,
+                      sale_price=rnd.randint(200, 600), image_url=f'/img/roll{i}.png') for i in range(300)]
+        db.session.add_all(ingredients + rolls)
+        db.session.flush()
+        for roll in rolls:
+            for ingredient in rnd.sample(ingredients, 5):
+                db.session.add(RollIngredient(roll_id=roll.id, ingredient_id=ingredient.id, amount_per_roll=20))
+
+        sets = [Set(name=f'сет {i}', cost_price=500, set_price=rnd.randint(900, 3000)) for i in range(sets_count)]
+        db.session.add_all(sets)
+        db.session.flush()
+        for set_item in sets:
+            for roll in rnd.sample(rolls, 6):
+                db.session.add(SetRoll(set_id=set_item.id, roll_id=roll.id, quantity=rnd.randint(1, 2)))
+
+        for _ in range(orders_count):
+            order = Order(user_id=1, phone='0', delivery_address='ул. Тестовая, 1', payment_method='cash',
+                          total_price=0)
+            db.session.add(order)
+            db.session.flush()
+            for _ in range(5):
+                item_type = rnd.choice(['roll', 'roll', 'set'])
+                item_id = rnd.choice(rolls if item_type == 'roll' else sets).id
+                db.session.add(OrderItem(order_id=order.id, item_type=item_type, item_id=item_id,
+                                         quantity=1, unit_price=300, total_price=300))
+        db.session.commit()
+
+
+def cpu_ms(func, repeat):
+    """Процессорное время на один вызов, мс (лучший из трех прогонов)"""
+    best = None
+    for _ in range(3):
+        started = time.process_time()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.process_time() - started) / repeat * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк сериализации ответов')
+    parser.add_argument('--sets', type=int, default=200, help='Количество сетов')
+    parser.add_argument('--orders', type=int, default=500, help='Количество заказов у покупателя')
+    parser.add_argument('--repeat', type=int, default=20, help='Повторов на замер')
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['SQLITE_DB_PATH'] = db_path
+    os.environ.setdefault('REQUEST_LOG', 'off')  # Журнал запросов тестового клиента не нужен
+
+    from flask.json.provider import DefaultJSONProvider
+    from app_sqlite import app
+    from models import db, Set, SetRoll, Roll, RollIngredient, Order
+    from migrations import migrate
+    from serializers import FastJSONProvider, serialize, orjson
+
+    try:
+        with app.app_context():
+            migrate(db.engine)
+        generate(app, args.sets, args.orders)
+        print(f"📦 Сетов: {args.sets}, заказов: {args.orders}, JSON: {'orjson' if orjson else 'json'}")
+
+        with app.app_context():
+            sets = Set.query.options(
+                db.selectinload(Set.rolls).selectinload(SetRoll.roll)
+                .selectinload(Roll.ingredients).selectinload(RollIngredient.ingredient)
+            ).all()
+            orders = Order.query.options(db.selectinload(Order.items)).all()
+            fast = FastJSONProvider(app)
+
+            for title, objects in (('сеты', sets), ('заказы', orders)):
+                legacy = cpu_ms(lambda: json.dumps([legacy_to_dict(obj) for obj in objects], sort_keys=True),
+                                args.repeat)
+                compiled = cpu_ms(lambda: fast.dumps(serialize(objects)), args.repeat)
+                print(f"⏱️ Сериализация ({title}): to_dict + json {legacy:.1f} мс, "
+                      f"кодировщики + {'orjson' if orjson else 'json'} {compiled:.1f} мс "
+                      f"(в {legacy / compiled:.1f} раза быстрее)")
+
+        client = app.test_client()
+        token = client.post('/api/login', json={'email': 'bench@bench.local', 'password': 'bench'}).get_json()
+        headers = {'Authorization': f"Bearer {token['access_token']}"}
+        endpoints = [
+            ('GET /api/sets/1', lambda suffix='': client.get(f'/api/sets/1{suffix}')),
+            ('GET /api/orders', lambda suffix='': client.get(f'/api/orders{suffix}', headers=headers)),
+        ]
+        trimmed = {'GET /api/sets/1': '?fields=quantity,roll.name', 'GET /api/orders': '?fields=id,status,items.item_name'}
+        for title, call in endpoints:
+            app.json = DefaultJSONProvider(app)
+            standard = cpu_ms(call, args.repeat)
+            app.json = FastJSONProvider(app)
+            optimized = cpu_ms(call, args.repeat)
+            selected = cpu_ms(lambda: call(trimmed[title]), args.repeat)
+            size = len(call().data)
+            trimmed_size = len(call(trimmed[title]).data)
+            print(f"⏱️ {title}: стандартный JSON {standard:.1f} мс, FastJSONProvider {optimized:.1f} мс, "
+                  f"с ?fields= {selected:.1f} мс ({size / 1024:.1f} КБ -> {trimmed_size / 1024:.1f} КБ)")
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,9 @@
-import sqlite3
+from database import connect
+
 
 def check_admin_users():
     try:
-        conn = sqlite3.connect('sushi_express.db')
+        conn = connect()
         cursor = conn.cursor()
         
         print("🔍 Проверяю пользователей-админов...")
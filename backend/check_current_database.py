@@ -1,3 +1,5 @@
+from database import connect
+
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
@@ -5,14 +7,13 @@
 Скрипт для проверки текущей базы данных
 """
 
-import sqlite3
 
 def check_current_database():
     print("🔍 ПРОВЕРКА ТЕКУЩЕЙ БАЗЫ ДАННЫХ")
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect('sushi_express.db')
+        conn = connect()
         cursor = conn.cursor()
         
         print("📊 СТАТИСТИКА БАЗЫ ДАННЫХ:")
@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 """Скрипт для проверки структуры базы данных"""
 
-import sqlite3
 import os
+from database import connect
+from config import DB_PATH
 
 def check_database():
-    db_path = 'backend/instance/sushi_express.db'
+    db_path = DB_PATH
     
     if not os.path.exists(db_path):
         print(f"❌ База данных не найдена: {db_path}")
@@ -13,7 +14,7 @@ def check_database():
         
     print(f"✅ База данных найдена: {db_path}")
     
-    conn = sqlite3.connect(db_path)
+    conn = connect()
     cursor = conn.cursor()
     
     try:
@@ -1,3 +1,5 @@
+from database import connect
+
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
@@ -5,14 +7,13 @@
 Скрипт для проверки связей в базе данных между пользователями, заказами и шеф-поваром
 """
 
-import sqlite3
 
 def check_database_connections():
     print("🔍 ПРОВЕРКА СВЯЗЕЙ В БАЗЕ ДАННЫХ")
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect('sushi_express.db')
+        conn = connect()
         cursor = conn.cursor()
         
         print("👥 ПРОВЕРКА ПОЛЬЗОВАТЕЛЕЙ")
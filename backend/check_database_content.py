@@ -7,19 +7,21 @@
 
 import sqlite3
 import os
+from database import connect
+from config import DB_PATH
 
 def check_database_content():
     print("🔍 ПРОВЕРКА СОДЕРЖИМОГО БАЗЫ ДАННЫХ")
     print("=" * 50)
     
-    db_path = 'sushi_express.db'
+    db_path = DB_PATH
     
     if not os.path.exists(db_path):
         print(f"❌ База данных не найдена: {db_path}")
         return
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect()
         cursor = conn.cursor()
         
         # Проверяем количество записей в каждой таблице
@@ -4,13 +4,14 @@
 """
 
 import sqlite3
+from database import connect
 
 def check_database():
     """Проверяет структуру базы данных"""
     
     try:
         # Подключение к базе данных
-        conn = sqlite3.connect('sushi_express.db')
+        conn = connect()
         cursor = conn.cursor()
         
         # Получаем список таблиц
@@ -1,13 +1,14 @@
+from database import connect
+
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import sqlite3
 
 def check_database():
     print("🔍 ПРОВЕРКА БАЗЫ ДАННЫХ")
     print("=" * 50)
     
-    conn = sqlite3.connect('sushi_express.db')
+    conn = connect()
     cursor = conn.cursor()
     
     # Проверяем количество записей
@@ -5,17 +5,14 @@
 Скрипт для проверки исправленной базы данных
 """
 
-import sqlite3
-import os
+from database import connect
 
 def check_fixed_database():
     print("🔍 ПРОВЕРКА ИСПРАВЛЕННОЙ БАЗЫ ДАННЫХ")
     print("=" * 50)
     
-    db_path = 'sushi_express.db'
-    
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect()
         cursor = conn.cursor()
         
         # Проверяем роллы
@@ -1,14 +1,15 @@
+from database import connect
+
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import sqlite3
 
 def check_ingredients_structure():
     print("🔍 ПРОВЕРКА СТРУКТУРЫ ТАБЛИЦЫ INGREDIENTS")
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect('sushi_express.db')
+        conn = connect()
         cursor = conn.cursor()
         
         # Получаем структуру таблицы ingredients
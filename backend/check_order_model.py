@@ -1,3 +1,5 @@
+from database import connect
+
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
@@ -5,14 +7,13 @@
 Скрипт для проверки модели Order
 """
 
-import sqlite3
 
 def check_order_model():
     print("🔍 ПРОВЕРКА МОДЕЛИ ORDER")
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect('sushi_express.db')
+        conn = connect()
         cursor = conn.cursor()
         
         # Проверяем структуру таблицы orders
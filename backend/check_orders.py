@@ -1,8 +1,8 @@
-import sqlite3
 import json
+from database import connect
 
 # Подключаемся к базе данных
-conn = sqlite3.connect('sushi_express.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("🔍 ПРОВЕРКА СИСТЕМЫ ЗАКАЗОВ")
@@ -1,3 +1,5 @@
+from database import connect
+
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
@@ -5,14 +7,13 @@
 Быстрая проверка таблицы заказов
 """
 
-import sqlite3
 
 def check_orders_table():
     print("📦 ТАБЛИЦА ЗАКАЗОВ В БД")
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect('sushi_express.db')
+        conn = connect()
         cursor = conn.cursor()
         
         print("🔍 СТРУКТУРА ТАБЛИЦЫ orders:")
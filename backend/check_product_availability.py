@@ -1,14 +1,15 @@
+from database import connect
+
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import sqlite3
 
 def check_product_availability():
     print("🔍 ПРОВЕРКА НАЛИЧИЯ ТОВАРОВ")
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect('sushi_express.db')
+        conn = connect()
         cursor = conn.cursor()
         
         print("📋 ПРОВЕРКА НАЛИЧИЯ ИНГРЕДИЕНТОВ")
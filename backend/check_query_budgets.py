@@ -0,0 +1,172 @@
+import argparse
+import os
+import sys
+import tempfile
+
+# Проверка числа SQL-запросов на эндпоинт: путь клиента и админа из explain_queries.py
+# на временной БД, для каждого эндпоинта - наибольшее число запросов за вызов.
+# Больше бюджета - код выхода 1 (N+1 после изменения моделей или эндпоинта ловится
+# до продакшена). Бюджеты - с запасом от текущих значений; если эндпоинт стал
+# законно делать больше запросов, поднимите его бюджет здесь.
+# Бюджет на маленьких тестовых данных N+1 не ловит, поэтому эндпоинты списков
+# (корзина, заказы покупателя и админа) дополнительно вызываются на малых и больших
+# данных: число запросов на малых данных - предел для больших (query_stats.assert_max_queries),
+# превышение печатается с самыми частыми запросами.
+#
+#   python check_query_budgets.py [--verbose]
+
+DEFAULT_BUDGET = 10
+
+ENDPOINT_BUDGETS = {
+    'create_order': 20,
+    'get_cart': 15,
+    'get_admin_stats': 15,
+    'register': 15,
+    'reload_menu_endpoint': 25,  # Сверка всего меню из assets/data с БД
+}
+
+BUYER_ORDERS = 3  # Заказов покупателя сверх сценария: число запросов не должно расти с их количеством
+
+SCALING_ROLLS = 8  # Роллов для проверки роста числа запросов с размером корзины
+SCALING_INGREDIENTS = 4  # Ингредиентов в каждом из этих роллов
+SCALING_CART_SIZES = (2, SCALING_ROLLS)  # Размеры корзины: малая и большая
+SCALING_ORDERS = 10  # Заказов, добавляемых между замерами списков заказов
+
+
+def run_buyer(client, ids):
+    """Корзина из нескольких роллов и несколько заказов, затем списки заказов покупателя и админа"""
+    def call(method, path, token=None, json=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return client.open(path, method=method, json=json, headers=headers).get_json(silent=True) or {}
+
+    user = call('POST', '/api/login', json={'email': 'user@explain.local', 'password': 'explain'})['access_token']
+    admin = call('POST', '/api/login', json={'email': 'admin@explain.local', 'password': 'explain'})['access_token']
+    for _ in range(BUYER_ORDERS):
+        for roll_id in ids['roll_ids']:
+            call('POST', '/api/cart/add', user, {'item_type': 'roll', 'item_id': roll_id, 'quantity': 1})
+        call('GET', '/api/cart', user)
+        call('POST', '/api/orders', user, {'delivery_address': 'ул. Тестовая, 1', 'payment_method': 'cash'})
+    call('GET', '/api/orders', user)
+    call('GET', '/api/orders/all', admin)
+
+
+def seed_scaling(app):
+    """Роллы с несколькими ингредиентами: в сиде explain_queries у ролла один ингредиент"""
+    from models import db, Ingredient, Roll, RollIngredient
+
+    with app.app_context():
+        ingredients = [Ingredient(name=f'Ингредиент {i}', cost_per_unit=1, price_per_unit=1.2, unit='г',
+                                  stock_quantity=1000) for i in range(SCALING_INGREDIENTS)]
+        rolls = [Roll(name=f'Ролл масштаба {i}', cost_price=100, sale_price=400 + i) for i in range(SCALING_ROLLS)]
+        db.session.add_all(ingredients + rolls)
+        db.session.flush()
+        for roll in rolls:
+            for ingredient in ingredients:
+                db.session.add(RollIngredient(roll_id=roll.id, ingredient_id=ingredient.id, amount_per_roll=10))
+        db.session.commit()
+        return [roll.id for roll in rolls]
+
+
+def check_scaling(client, roll_ids):
+    """Число запросов эндпоинтов списков на малых и больших данных. Возвращает число эндпоинтов, где оно растет"""
+    from query_stats import collect_queries, assert_max_queries, QueryBudgetExceeded
+
+    def call(method, path, token=None, json=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return client.open(path, method=method, json=json, headers=headers).get_json(silent=True) or {}
+
+    def baseline(path, token):
+        with collect_queries() as collected:
+            call('GET', path, token)
+        return len(collected)
+
+    def expect_no_growth(title, path, token, small_queries, sizes):
+        """На больших данных запросов не больше, чем на малых"""
+        try:
+            with assert_max_queries(small_queries, f'{title} ({sizes})') as collected:
+                call('GET', path, token)
+        except QueryBudgetExceeded as e:
+            print(f'❌ {e}')
+            return 1
+        print(f'✅ {title:<16} {sizes}: {small_queries} -> {len(collected)} запросов')
+        return 0
+
+    user = call('POST', '/api/login', json={'email': 'user@explain.local', 'password': 'explain'})['access_token']
+    admin = call('POST', '/api/login', json={'email': 'admin@explain.local', 'password': 'explain'})['access_token']
+
+    def fill_cart(size):
+        call('POST', '/api/cart/clear', user)
+        for roll_id in roll_ids[:size]:
+            call('POST', '/api/cart/add', user, {'item_type': 'roll', 'item_id': roll_id, 'quantity': 1})
+
+    def orders_count():
+        return len(call('GET', '/api/orders/all', admin).get('orders', []))
+
+    failures = 0
+    small, large = SCALING_CART_SIZES
+    fill_cart(small)
+    cart_queries = baseline('/api/cart', user)
+    fill_cart(large)
+    failures += expect_no_growth('get_cart', '/api/cart', user, cart_queries, f'роллов в корзине {small} -> {large}')
+
+    orders_before = orders_count()
+    user_orders_queries = baseline('/api/orders', user)
+    all_orders_queries = baseline('/api/orders/all', admin)
+    for _ in range(SCALING_ORDERS):
+        fill_cart(small)
+        call('POST', '/api/orders', user, {'delivery_address': 'ул. Тестовая, 1', 'payment_method': 'cash'})
+    sizes = f'заказов {orders_before} -> {orders_count()}'
+    failures += expect_no_growth('get_user_orders', '/api/orders', user, user_orders_queries, sizes)
+    failures += expect_no_growth('get_all_orders', '/api/orders/all', admin, all_orders_queries, sizes)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бюджеты SQL-запросов по эндпоинтам')
+    parser.add_argument('--verbose', action='store_true', help='Печатать все эндпоинты, а не только превышения')
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['SQLITE_DB_PATH'] = db_path
+    os.environ.setdefault('REQUEST_LOG', 'off')  # Журнал запросов тестового клиента не нужен
+
+    from app_sqlite import app
+    from models import db, Roll
+    from migrations import migrate
+    from explain_queries import seed, run_journey
+    from query_stats import get_recent_requests, summarize_by_endpoint
+
+    try:
+        with app.app_context():
+            migrate(db.engine)
+        ids = seed(app)
+        with app.app_context():
+            ids['roll_ids'] = [roll_id for roll_id, in db.session.query(Roll.id).order_by(Roll.id)]
+        client = app.test_client()
+        run_journey(client, ids)
+        run_buyer(client, ids)
+        scaling_roll_ids = seed_scaling(app)
+
+        failures = 0
+        for row in summarize_by_endpoint(get_recent_requests()):
+            budget = ENDPOINT_BUDGETS.get(row['endpoint'], DEFAULT_BUDGET)
+            over = row['max_queries'] > budget
+            failures += over
+            if over or args.verbose:
+                marker = '❌' if over else '✅'
+                print(f"{marker} {row['endpoint']:<32} {row['max_queries']:>4} запросов (бюджет {budget}), "
+                      f"БД {row['db_ms']} мс за {row['calls']} вызов.")
+
+        print(f'📊 Эндпоинтов сверх бюджета: {failures}')
+        growing = check_scaling(client, scaling_roll_ids)
+        print(f'📈 Эндпоинтов, где число запросов растет с данными: {growing}')
+        return 1 if failures or growing else 0
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,9 @@
-import sqlite3
+from database import connect
+
 
 def check_schema():
     """Проверяем схему базы данных"""
-    conn = sqlite3.connect('sushi_express.db')
+    conn = connect()
     cursor = conn.cursor()
     
     print("🔍 Проверяем схему таблицы users:")
@@ -1,3 +1,5 @@
+from database import connect
+
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
@@ -5,14 +7,13 @@
 Скрипт для проверки структуры таблицы sets
 """
 
-import sqlite3
 
 def check_sets_structure():
     print("🔍 ПРОВЕРКА СТРУКТУРЫ ТАБЛИЦЫ SETS")
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect('sushi_express.db')
+        conn = connect()
         cursor = conn.cursor()
         
         # Проверяем структуру таблицы sets
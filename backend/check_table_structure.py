@@ -1,6 +1,7 @@
-import sqlite3
+from database import connect
 
-conn = sqlite3.connect('sushi_express.db')
+
+conn = connect()
 cursor = conn.cursor()
 
 print("🔍 СТРУКТУРА ТАБЛИЦ")
@@ -1,7 +1,8 @@
-import sqlite3
+from database import connect
+
 
 def check_user():
-    conn = sqlite3.connect('sushi_express.db')
+    conn = connect()
     cursor = conn.cursor()
     
     # Проверяем пользователя test2@test.com
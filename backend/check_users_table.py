@@ -1,8 +1,9 @@
-import sqlite3
+from database import connect
+
 
 def check_users_table():
     try:
-        conn = sqlite3.connect('sushi_express.db')
+        conn = connect()
         cursor = conn.cursor()
         
         print("🔍 Проверяю структуру таблицы users...")
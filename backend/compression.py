@@ -0,0 +1,119 @@
+import zlib
+
+from flask import request
+
+try:
+    import zstandard
+except ImportError:  # Без zstandard сжимаем только gzip
+    zstandard = None
+
+from config import COMPRESSION, COMPRESS_MIN_SIZE, COMPRESS_STREAM_SIZE, COMPRESS_GZIP_LEVEL, COMPRESS_ZSTD_LEVEL
+
+# Сжатие ответов (gzip, zstd - если установлен zstandard) по заголовку Accept-Encoding клиента.
+# Большие JSON (все заказы, пользователи с корзинами, сеты с роллами) сжимаются в 6-14 раз,
+# а мобильному клиенту на медленной сети передача обходится дороже, чем сжатие серверу.
+# - Ответы меньше COMPRESS_MIN_SIZE не сжимаются: они и так умещаются в один TCP-пакет.
+# - Ответы больше COMPRESS_STREAM_SIZE сжимаются частями по мере отправки: первые байты
+#   уходят клиенту раньше, а сжатая копия всего тела не держится в памяти.
+# - Потоковые ответы (генераторы) сжимаются так же частями.
+# - Сжимаются только текстовые типы (JSON, text/*); картинки и архивы уже сжаты.
+# Flutter (dart:io HttpClient) сам отправляет Accept-Encoding: gzip и распаковывает ответ.
+# Уровни и порог выбраны по bench_compression.py.
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'application/javascript', 'image/svg+xml')
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def available_encodings():
+    """Поддерживаемые сжатия в порядке предпочтения"""
+    return ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+
+
+def choose_encoding(accept_encodings):
+    """Сжатие для ответа по Accept-Encoding (werkzeug Accept): zstd, gzip или None"""
+    best, best_quality = None, 0
+    for encoding in available_encodings():
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _compressor(encoding, level=None):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level or COMPRESS_ZSTD_LEVEL).compressobj()
+    return zlib.compressobj(level or COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits=31 - формат gzip
+
+
+def compress(data, encoding, level=None):
+    """Сжатое тело целиком"""
+    compressor = _compressor(encoding, level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _slices(data):
+    view = memoryview(data)
+    for start in range(0, len(view), STREAM_CHUNK_SIZE):
+        yield view[start:start + STREAM_CHUNK_SIZE]
+
+
+def compress_stream(chunks, encoding, level=None):
+    """Сжатие по частям: отдает сжатые данные, как только они готовы"""
+    compressor = _compressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()  # Исходный генератор ответа (и его stream_with_context) завершается как обычно
+
+
+def _is_compressible(response):
+    if request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 304):
+        return False
+    if 'Content-Encoding' in response.headers or 'no-transform' in response.headers.get('Cache-Control', ''):
+        return False
+    mimetype = response.mimetype or ''
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES or mimetype.endswith('+json')
+
+
+def init_compression(app):
+    """Сжатие ответов. Регистрировать раньше остальных after_request: Flask вызывает их в обратном
+    порядке, и сжатие должно быть последним - журнал запросов читает тело ответа несжатым"""
+    if not COMPRESSION:
+        return
+
+    @app.after_request
+    def _compress_response(response):
+        if not _is_compressible(response):
+            return response
+        response.vary.add('Accept-Encoding')  # Кэши прокси хранят сжатый и несжатый варианты отдельно
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < COMPRESS_MIN_SIZE:
+                return response
+            if len(data) >= COMPRESS_STREAM_SIZE:
+                response.response = compress_stream(_slices(data), encoding)
+                response.headers.pop('Content-Length', None)
+            else:
+                response.set_data(compress(data, encoding))
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # Сжатое тело побайтно отличается от несжатого - сильный ETag становится слабым
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,101 @@
+import os
+import tempfile
+
+# Общая конфигурация БД для сервера и всех служебных скриптов.
+# Единственный файл БД - backend/sushi_express.db (его же использует app_sqlite.py).
+# Другой файл можно указать только явно, переменной окружения SQLITE_DB_PATH.
+# Путь не зависит от текущего каталога: скрипты, запущенные из корня репозитория
+# или из backend/, работают с одной и той же базой.
+# Если задан DATABASE_URL (PostgreSQL, см. docker-compose.yml), используется он -
+# код приложения один для обеих СУБД.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DB_PATH = os.path.abspath(os.getenv('SQLITE_DB_PATH', os.path.join(BASE_DIR, 'sushi_express.db')))
+
+
+def normalize_database_url(url):
+    """Для PostgreSQL без явного драйвера - psycopg2 из requirements.txt
+    (SQLAlchemy 2.1 по умолчанию выбирает psycopg 3). postgres:// - старый формат Heroku и др."""
+    for scheme in ('postgres://', 'postgresql://'):
+        if url.startswith(scheme):
+            return 'postgresql+psycopg2://' + url[len(scheme):]
+    return url
+
+
+DATABASE_URL = normalize_database_url(os.getenv('DATABASE_URL') or f'sqlite:///{DB_PATH}')
+IS_SQLITE = DATABASE_URL.startswith('sqlite')
+
+# Пул только для чтения: каталог и отчеты админки (см. db_routing.py).
+# Для PostgreSQL - адрес реплики, без него все идет в основную БД.
+# Для SQLite по умолчанию - тот же файл, открытый только для чтения (отдельный пул соединений).
+# DATABASE_REPLICA_URL=off - отключить
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL') or (
+    f"sqlite:///file:{DATABASE_URL[len('sqlite:///'):]}?mode=ro&uri=true" if IS_SQLITE else ''
+)
+DATABASE_REPLICA_URL = normalize_database_url(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL != 'off' else ''
+
+# Файлы, которые раньше угадывались скриптами. При старте предупреждаем, если они есть рядом
+LEGACY_DB_PATHS = [
+    os.path.join(BASE_DIR, 'instance', 'sushi_express.db'),
+    os.path.join(BASE_DIR, '..', 'instance', 'sushi_express.db'),
+    os.path.join(BASE_DIR, '..', 'sushi_express.db'),
+]
+
+# Пул соединений (на процесс). Для PostgreSQL держите
+# (DB_POOL_SIZE + DB_MAX_OVERFLOW) * процессов * узлов меньше max_connections сервера
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # Пересоздавать соединения старше N секунд (балансировщики рвут простаивающие)
+
+# Настройки соединений SQLite
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))  # Ждать блокировку вместо "database is locked"
+SQLITE_WAL = os.getenv('SQLITE_WAL', '1') == '1'  # Читатели не блокируют писателей
+
+# Проверка схемы при старте: 'warn' - предупредить, 'strict' - не запускаться, 'off' - не проверять
+SCHEMA_CHECK = os.getenv('SCHEMA_CHECK', 'warn')
+
+# Подсчет SQL-запросов на HTTP-запрос (см. query_stats.py)
+QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', '30'))  # Печатать запросы, сделавшие больше N SQL-запросов (0 - не печатать)
+SERVER_TIMING = os.getenv('SERVER_TIMING', '1') == '1'  # Заголовок Server-Timing с числом запросов и временем БД
+
+# Метрики Prometheus (см. metrics.py)
+METRICS_DIR = os.getenv('METRICS_DIR', '')  # Каталог снимков процессов: нужен, если воркеров несколько (gunicorn -w N)
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))  # Как часто воркер записывает свой снимок, с
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # Если задан, /metrics требует заголовок Authorization: Bearer <токен>
+
+# Сэмплирующий профилировщик запросов (см. profiler.py), по умолчанию выключен
+PROFILE_ROUTES = os.getenv('PROFILE_ROUTES', '')  # Эндпоинты через запятую: имя функции (get_cart) или маршрут (/api/cart)
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # Доля остальных запросов, например 0.01
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))  # Интервал снятия стеков
+PROFILE_MIN_MS = float(os.getenv('PROFILE_MIN_MS', '0'))  # Сохранять только запросы медленнее N мс
+PROFILE_MAX_CONCURRENT = int(os.getenv('PROFILE_MAX_CONCURRENT', '4'))  # Одновременно профилируемых запросов
+PROFILE_DIR = os.path.abspath(os.getenv('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles')))
+
+# Проверка готовности узла /api/health/ready (см. health.py)
+HEALTH_DB_TIMEOUT_MS = int(os.getenv('HEALTH_DB_TIMEOUT_MS', '1000'))  # Дольше - БД "медленная"; столько же ждем блокировку SQLite
+HEALTH_WAL_WARN_MB = int(os.getenv('HEALTH_WAL_WARN_MB', '64'))  # Предупреждать, если WAL-файл больше N МБ
+
+# Журнал запросов в JSON (см. request_log.py)
+REQUEST_LOG = os.getenv('REQUEST_LOG', 'stdout')  # stdout, путь к файлу или off
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # Записей в очереди; при переполнении записи теряются, запрос не ждет
+
+# Журнал медленных SQL-запросов (см. slow_queries.py)
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))  # Запросы дольше N мс попадают в журнал (0 - выключено)
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', '1') == '1'  # Снимать план нового медленного запроса в фоне
+
+# Фоновые задачи узла (см. background.py): выполняются в одном процессе на узел
+MENU_AUTO_RELOAD = os.getenv('MENU_AUTO_RELOAD') == '1'  # Перезагружать меню при изменении файлов в assets/data
+MENU_WATCH_INTERVAL = int(os.getenv('MENU_WATCH_INTERVAL', '5'))  # Как часто проверять файлы меню, с
+BACKUP_INTERVAL_MINUTES = int(os.getenv('BACKUP_INTERVAL_MINUTES', '0'))  # Снимки SQLite по расписанию (0 - выключено)
+BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', '7'))  # Сколько снимков хранить
+BACKGROUND_LOCK_PATH = os.getenv('BACKGROUND_LOCK_PATH', os.path.join(tempfile.gettempdir(), 'sushi-express-background.lock'))
+
+# Сжатие ответов по Accept-Encoding (см. compression.py)
+COMPRESSION = os.getenv('COMPRESSION', '1') == '1'  # Выключите, если ответы уже сжимает прокси (nginx gzip on)
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))  # Ответы меньше N байт не сжимаются: и так умещаются в один TCP-пакет
+COMPRESS_STREAM_SIZE = int(os.getenv('COMPRESS_STREAM_SIZE', '262144'))  # Ответы больше N байт сжимаются и отправляются частями
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))  # 1-9, см. bench_compression.py
+COMPRESS_ZSTD_LEVEL = int(os.getenv('COMPRESS_ZSTD_LEVEL', '3'))  # Если установлен zstandard
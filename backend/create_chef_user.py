@@ -7,6 +7,7 @@ import sqlite3
 import hashlib
 import secrets
 import string
+from database import connect
 
 def generate_referral_code():
     """Генерирует случайный реферальный код"""
@@ -20,7 +21,7 @@ def create_chef_user():
     """Создает пользователя шеф-повара"""
     
     # Подключение к базе данных
-    conn = sqlite3.connect('sushi_express.db')
+    conn = connect()
     cursor = conn.cursor()
     
     try:
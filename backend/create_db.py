@@ -1,12 +1,13 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from config import DB_PATH, DATABASE_URL
 
 # Создаем Flask приложение
 app = Flask(__name__)
 
 # Конфигурация для SQLite
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///sushi_express.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Инициализация SQLAlchemy
@@ -121,15 +122,15 @@ class OrderItem(db.Model):
 if __name__ == '__main__':
     # Удаляем старую БД если существует
     import os
-    if os.path.exists('sushi_express.db'):
-        os.remove('sushi_express.db')
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
         print("🗑️ Старая база данных удалена")
     
     # Создаем новую БД
     with app.app_context():
         db.create_all()
         print("✅ База данных SQLite создана!")
-        print("📁 Файл: sushi_express.db")
+        print(f"📁 Файл: {DB_PATH}")
         print("📊 Созданные таблицы:")
         print("   - users")
         print("   - ingredients") 
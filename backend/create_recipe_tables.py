@@ -1,15 +1,10 @@
-import sqlite3
-import os
+from database import connect
 
 def create_recipe_tables():
     """Создает таблицы для рецептов роллов и сетов"""
     
     # Подключаемся к базе данных
-    db_path = 'sushi_express.db'
-    if not os.path.exists(db_path):
-        db_path = 'instance/sushi_express.db'
-    
-    conn = sqlite3.connect(db_path)
+    conn = connect()
     cursor = conn.cursor()
     
     try:
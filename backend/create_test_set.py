@@ -1,14 +1,9 @@
-import sqlite3
-import os
+from database import connect
 
 def create_test_set():
     """Создает новый тестовый сет для демонстрации функций редактирования"""
     
-    db_path = 'sushi_express.db'
-    if not os.path.exists(db_path):
-        db_path = 'instance/sushi_express.db'
-    
-    conn = sqlite3.connect(db_path)
+    conn = connect()
     cursor = conn.cursor()
     
     try:
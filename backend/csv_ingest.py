@@ -0,0 +1,129 @@
+import csv
+import os
+
+# Потоковое чтение табличных файлов меню без pandas.
+# CSV читается стандартным модулем csv с определением разделителя
+# (в assets/data встречаются и ';', и ','), значения приводятся к типам
+# по схеме {колонка: str | int | float | bool}. pandas нужен только для .xlsx
+# и импортируется лишь когда действительно читается Excel.
+
+SNIFF_SAMPLE_SIZE = 64 * 1024
+DELIMITERS = ';,\t'
+
+_TRUE_VALUES = ('1', '1.0', 'true', 'да', 'yes')
+_FALSE_VALUES = ('0', '0.0', 'false', 'нет', 'no')
+
+
+class IngestError(Exception):
+    """Файл нельзя прочитать (нет адаптера или формат не распознан)"""
+
+
+def sniff_dialect(sample):
+    """Определяет диалект CSV по началу файла"""
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS)
+    except csv.Error:
+        # Sniffer не справился (например, одна колонка) - выбираем самый частый разделитель заголовка
+        header = sample.split('\n', 1)[0]
+        delimiter = max(DELIMITERS, key=header.count)
+
+        class Dialect(csv.excel):
+            pass
+        Dialect.delimiter = delimiter
+        return Dialect
+
+
+def _to_str(value):
+    return value
+
+
+def _to_float(value):
+    return float(value.replace(',', '.').replace(' ', ''))
+
+
+def _to_int(value):
+    number = _to_float(value)
+    if not number.is_integer():
+        raise ValueError(value)
+    return int(number)
+
+
+def _to_bool(value):
+    value = value.lower()
+    if value in _TRUE_VALUES:
+        return True
+    if value in _FALSE_VALUES:
+        return False
+    raise ValueError(value)
+
+
+_CONVERTERS = {str: _to_str, int: _to_int, float: _to_float, bool: _to_bool}
+_TYPE_NAMES = {str: 'строкой', int: 'целым числом', float: 'числом', bool: 'флагом 0/1'}
+
+
+def coerce_row(row, schema):
+    """Приводит значения строки к типам схемы; пустые значения становятся None.
+
+    Колонки, которых нет в схеме, отбрасываются. При ошибке - ValueError
+    с названием колонки.
+    """
+    result = {}
+    for column, column_type in schema.items():
+        value = row.get(column)
+        if value is not None and not isinstance(value, str):
+            value = str(value)  # Значения из Excel приходят уже типизированными
+        value = value.strip() if value is not None else None
+        if not value:
+            result[column] = None
+            continue
+        try:
+            result[column] = _CONVERTERS[column_type](value)
+        except ValueError:
+            raise ValueError(f'поле {column} должно быть {_TYPE_NAMES[column_type]}, получено "{value}"')
+    return result
+
+
+def read_csv(path):
+    """Построчно читает CSV: (номер строки, {колонка: текст})"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        dialect = sniff_dialect(f.read(SNIFF_SAMPLE_SIZE))
+        f.seek(0)
+        for line_no, row in enumerate(csv.DictReader(f, dialect=dialect), start=2):
+            yield line_no, row
+
+
+def read_excel(path):
+    """Читает XLSX через pandas (необязательная зависимость)"""
+    try:
+        import pandas as pd
+    except ImportError:
+        raise IngestError(f'Для чтения {os.path.basename(path)} нужен pandas (pip install pandas openpyxl)')
+
+    for line_no, row in enumerate(pd.read_excel(path).to_dict('records'), start=2):
+        yield line_no, {key: (None if pd.isna(value) else value) for key, value in row.items()}
+
+
+def find_table(data_dir, name):
+    """Путь к файлу таблицы: CSV предпочтительнее XLSX"""
+    for extension in ('.csv', '.xlsx'):
+        path = os.path.join(data_dir, name + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def read_table(data_dir, name, schema):
+    """Потоково читает таблицу name из data_dir.
+
+    Возвращает пары (номер строки, строка или ValueError): ошибка приведения
+    типов не останавливает чтение, вызывающий код решает, что с ней делать.
+    """
+    path = find_table(data_dir, name)
+    if path is None:
+        return
+    rows = read_excel(path) if path.endswith('.xlsx') else read_csv(path)
+    for line_no, row in rows:
+        try:
+            yield line_no, coerce_row(row, schema)
+        except ValueError as e:
+            yield line_no, e
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine
+
+from config import (DATABASE_URL, DATABASE_REPLICA_URL, DB_PATH, LEGACY_DB_PATHS, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+                    DB_POOL_TIMEOUT, DB_POOL_RECYCLE, normalize_database_url, IS_SQLITE, SQLITE_BUSY_TIMEOUT_MS,
+                    SQLITE_WAL, SCHEMA_CHECK)
+from models import db
+from metrics import InstrumentedQueuePool
+
+# Фабрика соединений: один движок SQLAlchemy с пулом на процесс.
+# Сервер (через Flask-SQLAlchemy) и скрипты получают соединения одинаково
+# настроенными: ожидание блокировки вместо "database is locked" и режим WAL.
+# При старте отпечаток схемы БД сверяется с models.py.
+
+ENGINE_OPTIONS = {
+    'poolclass': InstrumentedQueuePool,  # QueuePool с замером ожидания соединения (metrics.py)
+    'pool_size': DB_POOL_SIZE,
+    'max_overflow': DB_MAX_OVERFLOW,
+    'pool_timeout': DB_POOL_TIMEOUT,
+    'pool_recycle': DB_POOL_RECYCLE,
+    'pool_pre_ping': True,  # Соединение, оборванное сервером или failover, заменяется до выдачи из пула
+}
+
+# Пул только для чтения (реплика). Для PostgreSQL транзакции в нем read-only:
+# случайная запись в реплику - ошибка, а не расхождение данных
+REPLICA_ENGINE_OPTIONS = dict(ENGINE_OPTIONS)
+if DATABASE_REPLICA_URL.startswith('postgresql'):
+    REPLICA_ENGINE_OPTIONS['connect_args'] = {'options': '-c default_transaction_read_only=on'}
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+class SchemaMismatchError(Exception):
+    """Схема БД не совпадает с models.py"""
+
+
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    # Слушатель общий для всех движков, остальные СУБД не трогаем
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}')
+    if SQLITE_WAL:
+        try:
+            cursor.execute('PRAGMA journal_mode = WAL')
+            cursor.execute('PRAGMA synchronous = NORMAL')  # В режиме WAL достаточно и заметно быстрее FULL
+        except sqlite3.OperationalError:
+            pass  # Соединение только для чтения (пул реплики): режим журнала задает основной пул
+    cursor.close()
+
+
+def create_db_engine(url=DATABASE_URL, **options):
+    """Новый движок с настройками пула проекта"""
+    return create_engine(normalize_database_url(url), **{**ENGINE_OPTIONS, **options})
+
+
+def get_engine():
+    """Общий движок процесса (создается при первом обращении)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_db_engine()
+        return _engine
+
+
+def connect():
+    """Соединение DB-API из пула (для скриптов на sqlite3). close() возвращает его в пул"""
+    return get_engine().raw_connection()
+
+
+def _schema_items(engine):
+    """Что из объявленного в models.py есть в БД: таблицы, колонки и индексы"""
+    inspector = inspect(engine)
+    present, expected = set(), set()
+    for table in db.metadata.sorted_tables:
+        columns = {f'{table.name}.{column.name}' for column in table.columns}
+        indexes = {f'{table.name}#{index.name}' for index in table.indexes}
+        expected |= columns | indexes
+        if not inspector.has_table(table.name):
+            continue
+        present |= columns & {f"{table.name}.{column['name']}" for column in inspector.get_columns(table.name)}
+        present |= indexes & {f"{table.name}#{index['name']}" for index in inspector.get_indexes(table.name)}
+    return present, expected
+
+
+def _fingerprint(items):
+    return hashlib.sha256('\n'.join(sorted(items)).encode()).hexdigest()[:16]
+
+
+def schema_fingerprint(engine=None):
+    """Отпечаток схемы БД по объектам, объявленным в models.py.
+
+    Колонки, которых нет в моделях (остались от старых схем), не учитываются,
+    поэтому отпечаток совпадает с ожидаемым, если в БД есть все нужное моделям.
+    """
+    present, _ = _schema_items(engine or get_engine())
+    return _fingerprint(present)
+
+
+def verify_schema(engine=None, mode=SCHEMA_CHECK):
+    """Сверяет схему БД с models.py. Возвращает отчет; в режиме 'strict' при расхождении - исключение"""
+    engine = engine or get_engine()
+    if mode == 'off':
+        return {'ok': True, 'checked': False}
+
+    present, expected = _schema_items(engine)
+    report = {
+        'ok': present == expected,
+        'checked': True,
+        'fingerprint': _fingerprint(present),
+        'expected': _fingerprint(expected),
+        'missing': sorted(expected - present),
+    }
+    if not report['ok'] and mode == 'strict':
+        raise SchemaMismatchError(
+            f"Схема БД не совпадает с models.py, нет: {', '.join(report['missing'][:10])}. "
+            'Запустите: python migrations.py'
+        )
+    return report
+
+
+def upsert(conn, table, rows, index_elements, update_columns=None):
+    """INSERT ... ON CONFLICT для SQLite и PostgreSQL.
+
+    index_elements - колонки уникального ограничения. Без update_columns
+    конфликтующие строки пропускаются (DO NOTHING), иначе в них обновляются
+    перечисленные колонки значениями из вставки.
+    """
+    if not rows:
+        return 0
+    if conn.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif conn.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f'upsert не поддерживается для {conn.dialect.name}')
+
+    statement = insert(table)
+    if update_columns:
+        statement = statement.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: statement.excluded[column] for column in update_columns}
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=index_elements)
+    return conn.execute(statement, rows).rowcount
+
+
+def find_stray_databases():
+    """Другие файлы БД рядом с проектом, которые скрипты раньше могли использовать по ошибке"""
+    if not IS_SQLITE:
+        return []
+    return [
+        os.path.abspath(path) for path in LEGACY_DB_PATHS
+        if os.path.exists(path) and os.path.abspath(path) != DB_PATH
+    ]
@@ -0,0 +1,62 @@
+import functools
+from contextlib import contextmanager
+
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+# Маршрутизация запросов сессии между основной БД и пулом только для чтения.
+# Эндпоинты каталога и отчетов помечаются @read_only: их SELECT идут в реплику
+# (bind 'replica', см. DATABASE_REPLICA_URL в config.py), и тяжелые отчеты
+# не занимают соединения оформления заказов. Все остальное - в основную БД.
+# Запись (flush, INSERT/UPDATE/DELETE) всегда идет в основную БД, и после нее
+# до конца запроса чтение тоже идет оттуда - запрос видит свои изменения.
+# Клиент, который только что что-то изменил и не хочет ждать репликацию,
+# присылает заголовок X-Read-Your-Writes: 1 - запрос целиком идет в основную БД.
+
+REPLICA_BIND_KEY = 'replica'
+READ_YOUR_WRITES_HEADER = 'X-Read-Your-Writes'
+
+PRIMARY = 'primary'
+REPLICA = 'replica'
+
+
+def current_route():
+    """Куда идут запросы на чтение в текущем контексте приложения"""
+    if not has_app_context():
+        return PRIMARY
+    return g.get('db_route', PRIMARY)
+
+
+class RoutingSession(Session):
+    """Сессия Flask-SQLAlchemy, выбирающая пул по маршруту текущего запроса"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engines = self._db.engines
+        if bind is None and REPLICA_BIND_KEY in engines and current_route() == REPLICA:
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.db_route = PRIMARY  # Дальше в этом запросе читаем свои изменения из основной БД
+            else:
+                return engines[REPLICA_BIND_KEY]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """Эндпоинт только читает: запросы идут в пул реплики, если она настроена"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.headers.get(READ_YOUR_WRITES_HEADER) != '1':
+            g.db_route = REPLICA
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def use_primary():
+    """Участок кода внутри @read_only, которому нужны самые свежие данные"""
+    previous = g.get('db_route', PRIMARY)
+    g.db_route = PRIMARY
+    try:
+        yield
+    finally:
+        g.db_route = previous
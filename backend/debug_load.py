@@ -1,14 +1,15 @@
-import sqlite3
 import os
+from database import connect
+from config import DB_PATH
 
 def debug_database():
     """Отладка базы данных"""
     
-    if not os.path.exists('sushi_express.db'):
+    if not os.path.exists(DB_PATH):
         print("❌ База данных не существует!")
         return
     
-    conn = sqlite3.connect('sushi_express.db')
+    conn = connect()
     cursor = conn.cursor()
     
     try:
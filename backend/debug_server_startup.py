@@ -7,6 +7,7 @@
 
 import sys
 import traceback
+from config import DATABASE_URL
 
 def debug_server_startup():
     print("🔍 ДИАГНОСТИКА ЗАПУСКА СЕРВЕРА")
@@ -48,8 +49,7 @@ def debug_server_startup():
         
         print("\n📝 Проверяем конфигурацию...")
         app.config['SECRET_KEY'] = 'your-super-secret-key-change-this-in-production'
-        db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sushi_express.db')
-        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+        app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
         app.config['JWT_SECRET_KEY'] = 'jwt-secret-string'
         app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=30)
@@ -0,0 +1,206 @@
+import argparse
+import os
+import re
+import sys
+import tempfile
+from collections import OrderedDict
+
+# Аудит индексов: прогоняет путь клиента и админа по всем эндпоинтам API
+# на временной БД (схема строится миграциями, как в продакшене),
+# перехватывает каждый SQL-запрос и выполняет для него EXPLAIN QUERY PLAN.
+# Полный проход по таблице (SCAN без индекса) в запросе с условием - ошибка,
+# сортировка через временное B-дерево - предупреждение.
+# Код выхода 1, если найдены сканирования, - можно запускать в CI.
+#
+#   python explain_queries.py [--verbose]
+
+# Небольшие справочные таблицы, полный проход по которым ожидаем
+ALLOWED_SCANS = {
+    'loyalty_rolls',  # Список роллов накопительной системы читается целиком (десятки строк)
+}
+
+_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+_FILTERED_RE = re.compile(r'\b(WHERE|JOIN)\b')
+
+
+def seed(app):
+    """Минимальные данные, чтобы каждый эндпоинт дошел до своих запросов"""
+    from werkzeug.security import generate_password_hash
+    from models import (db, User, Ingredient, Roll, RollIngredient, Set, SetRoll, OtherItem,
+                        LoyaltyCard, LoyaltyRoll, LoyaltyCardUsage)
+
+    with app.app_context():
+        password_hash = generate_password_hash('explain')
+        admin = User(name='Админ', email='admin@explain.local', phone='0', password_hash=password_hash,
+                     is_admin=True, referral_code='EXPLADM1')
+        user = User(name='Клиент', email='user@explain.local', phone='0', password_hash=password_hash,
+                    bonus_points=100, referral_code='EXPLUSR1')
+        db.session.add_all([admin, user])
+
+        ingredient = Ingredient(name='Рис', cost_per_unit=1, price_per_unit=1.2, unit='г', stock_quantity=1000)
+        db.session.add(ingredient)
+        rolls = [Roll(name=f'Ролл {i}', cost_price=100, sale_price=300 + i) for i in range(3)]
+        db.session.add_all(rolls)
+        db.session.flush()
+
+        for roll in rolls:
+            db.session.add(RollIngredient(roll_id=roll.id, ingredient_id=ingredient.id, amount_per_roll=100))
+        set_item = Set(name='Сет', cost_price=300, set_price=900)
+        db.session.add(set_item)
+        db.session.flush()
+        db.session.add(SetRoll(set_id=set_item.id, roll_id=rolls[0].id, quantity=2))
+        db.session.add(OtherItem(name='Соус', cost_price=10, sale_price=30, category='соусы'))
+
+        db.session.add(LoyaltyRoll(roll_id=rolls[1].id))
+        card = LoyaltyCard(user_id=user.id, card_number='LC-001', filled_rolls=3)
+        db.session.add(card)
+        db.session.flush()
+        db.session.add(LoyaltyCardUsage(user_id=user.id, loyalty_card_id=card.id, roll_id=rolls[1].id))
+        db.session.commit()
+
+        return {'roll_id': rolls[0].id, 'set_id': set_item.id}
+
+
+def run_journey(client, ids):
+    """Путь клиента и админа по API: регистрация, меню, корзина, заказ, бонусы, админка"""
+    def call(method, path, token=None, json=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = client.open(path, method=method, json=json, headers=headers)
+        return response.get_json(silent=True) or {}
+
+    def login(email):
+        return call('POST', '/api/login', json={'email': email, 'password': 'explain'})['access_token']
+
+    call('GET', '/api/health')
+    call('POST', '/api/register', json={'name': 'Новый', 'email': 'new@explain.local', 'phone': '0',
+                                        'password': 'explain', 'referral_code': 'EXPLUSR1'})
+    user = login('user@explain.local')
+    admin = login('admin@explain.local')
+
+    call('GET', '/api/rolls')
+    call('GET', '/api/sets')
+    call('GET', f"/api/rolls/{ids['roll_id']}")
+    call('GET', f"/api/sets/{ids['set_id']}")
+    call('GET', '/api/other-items')
+
+    call('POST', '/api/favorites/add', user, {'item_type': 'roll', 'item_id': ids['roll_id']})
+    call('GET', '/api/favorites', user)
+    call('DELETE', f"/api/favorites/remove/{ids['roll_id']}", user)
+
+    call('POST', '/api/cart/add', user, {'item_type': 'roll', 'item_id': ids['roll_id'], 'quantity': 2})
+    call('POST', '/api/cart/add', user, {'item_type': 'set', 'item_id': ids['set_id']})
+    call('DELETE', f"/api/cart/remove/{ids['set_id']}", user)
+    call('POST', '/api/cart/use-bonus', user, {'bonus_points': 50})
+    call('GET', '/api/cart', user)
+    order = call('POST', '/api/orders', user, {'delivery_address': 'ул. Тестовая, 1', 'payment_method': 'cash'})
+    order_id = (order.get('order') or {}).get('id', 1)
+    call('POST', '/api/cart/clear', user)
+
+    call('GET', '/api/orders', user)
+    call('GET', '/api/orders?view=summary', user)
+    call('GET', f'/api/orders/{order_id}', user)
+    call('GET', '/api/wallet', user)
+    call('GET', '/api/loyalty/cards', user)
+    call('GET', '/api/loyalty/available-rolls', user)
+    call('GET', '/api/loyalty/history', user)
+    call('GET', '/api/referral/my-code', user)
+    call('POST', '/api/referral/check-code', user, {'referral_code': 'EXPLADM1'})
+    call('GET', '/api/referral/history', user)
+
+    call('GET', '/api/orders/all', admin)
+    call('PUT', f'/api/orders/{order_id}/status', admin, {'status': 'Готовится'})
+    call('GET', '/api/admin/ingredients', admin)
+    call('GET', '/api/admin/users', admin)
+    call('GET', '/api/admin/stats', admin)
+    call('GET', f"/api/admin/rolls/{ids['roll_id']}/recipe", admin)
+    call('POST', '/api/admin/menu/reload', admin, {'dry_run': True})
+
+
+def analyze(connection, statement, parameters):
+    """Возвращает (план, сканирования, предупреждения) для одного запроса"""
+    plan = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+    filtered = bool(_FILTERED_RE.search(statement))
+
+    scans, warnings = [], []
+    for detail in plan:
+        match = _SCAN_RE.match(detail)
+        if match and 'INDEX' not in detail and filtered and match.group(1) not in ALLOWED_SCANS:
+            scans.append(detail)
+        if 'USE TEMP B-TREE' in detail:
+            warnings.append(detail)
+    return plan, scans, warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN QUERY PLAN для запросов всех эндпоинтов')
+    parser.add_argument('--verbose', action='store_true', help='Печатать план каждого запроса')
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['SQLITE_DB_PATH'] = db_path
+    os.environ.setdefault('REQUEST_LOG', 'off')  # Журнал запросов тестового клиента не нужен
+
+    from flask import request, has_request_context
+    from sqlalchemy import event
+    from app_sqlite import app
+    from models import db
+    from migrations import migrate
+
+    try:
+        with app.app_context():
+            engine = db.engine
+            engines = list(db.engines.values())  # Основной пул и пул реплики (db_routing.py)
+        migrate(engine)
+        ids = seed(app)
+
+        statements = OrderedDict()
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'INSERT')):
+                return
+            if executemany:
+                parameters = parameters[0]
+            endpoint = request.endpoint if has_request_context() else '-'
+            entry = statements.setdefault(statement, {'parameters': parameters, 'endpoints': set()})
+            entry['endpoints'].add(endpoint)
+
+        for routed_engine in engines:
+            event.listen(routed_engine, 'before_cursor_execute', capture)
+        run_journey(app.test_client(), ids)
+        for routed_engine in engines:
+            event.remove(routed_engine, 'before_cursor_execute', capture)
+
+        hit = {endpoint for entry in statements.values() for endpoint in entry['endpoints']}
+        missed = sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                        if rule.endpoint != 'static' and rule.endpoint not in hit)
+
+        total_scans = 0
+        with engine.connect() as connection:
+            for statement, entry in statements.items():
+                plan, scans, warnings = analyze(connection, statement, entry['parameters'])
+                total_scans += len(scans)
+                if not (scans or warnings or args.verbose):
+                    continue
+                print(f"\n🔎 {', '.join(sorted(entry['endpoints']))}")
+                print('   ' + ' '.join(statement.split())[:300])
+                for detail in plan:
+                    marker = '❌' if detail in scans else '⚠️' if detail in warnings else '  '
+                    print(f'   {marker} {detail}')
+
+        print(f"\n📊 Запросов: {len(statements)}, эндпоинтов: {len(hit - {'-'})}, сканирований без индекса: {total_scans}")
+        if missed:
+            print(f"⚠️ Эндпоинты без запросов к БД или не пройденные сценарием: {', '.join(missed)}")
+        return 1 if total_scans else 0
+    finally:
+        # Сначала закрываем соединения пулов: в режиме WAL файлы -wal и -shm удаляются вместе с БД
+        with app.app_context():
+            for routed_engine in db.engines.values():
+                routed_engine.dispose()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,9 @@
-import sqlite3
-import os
+from database import connect
 
 def fill_roll_recipes():
     """Заполняет рецепты роллов на основе существующих данных"""
     
-    db_path = 'sushi_express.db'
-    if not os.path.exists(db_path):
-        db_path = 'instance/sushi_express.db'
-    
-    conn = sqlite3.connect(db_path)
+    conn = connect()
     cursor = conn.cursor()
     
     try:
@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 """Скрипт для исправления проблем с базой данных"""
 
-import sqlite3
 import os
+from database import connect
+from config import DB_PATH
 
 def fix_database():
-    db_path = 'sushi_express.db'
+    db_path = DB_PATH
     
     if not os.path.exists(db_path):
         print(f"❌ База данных не найдена: {db_path}")
@@ -13,7 +14,7 @@ def fix_database():
     
     print(f"✅ Работаем с базой: {db_path}")
     
-    conn = sqlite3.connect(db_path)
+    conn = connect()
     cursor = conn.cursor()
     
     try:
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import os
+from config import DB_PATH
 
 def fix_db_creation_message():
     print("🔧 ИСПРАВЛЕНИЕ СООБЩЕНИЯ О СОЗДАНИИ БД")
@@ -12,7 +13,7 @@ def fix_db_creation_message():
         content = f.read()
     
     # Проверяем, существует ли база данных
-    db_exists = os.path.exists('sushi_express.db')
+    db_exists = os.path.exists(DB_PATH)
     
     if db_exists:
         print("✅ База данных уже существует")
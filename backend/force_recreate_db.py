@@ -1,12 +1,13 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 import os
+from config import DATABASE_URL
 
 # Создаем Flask приложение
 app = Flask(__name__)
 
 # Конфигурация для SQLite
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///sushi_express.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Инициализация SQLAlchemy
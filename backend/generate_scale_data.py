@@ -0,0 +1,338 @@
+import argparse
+import random
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, text
+from werkzeug.security import generate_password_hash
+
+from database import create_db_engine
+from migrations import migrate
+from models import (User, Ingredient, Roll, RollIngredient, Set, SetRoll, OtherItem, Order, OrderItem,
+                    LoyaltyCard, LoyaltyRoll, LoyaltyCardUsage, ReferralUsage, PointsTransaction)
+from referrals import REFERRAL_BONUS_POINTS, REFERRAL_CODE_LENGTH, REFERRAL_CODE_ALPHABET
+
+# Генератор синтетических данных для проверки производительности на объемах продакшена:
+# пользователи, заказы с позициями, накопительные карты с историей использования,
+# рефералы с начислениями в журнале баллов. Данные согласованы со схемой models.py
+# и между собой: счетчики рефералов и бонусные баллы пользователя совпадают
+# с referral_usage и points_ledger, позиции ссылаются на существующие товары,
+# а сумма заказа равна сумме позиций.
+# Результат детерминирован: одинаковые --seed и параметры на одинаковой исходной БД
+# дают одинаковые строки (кроме хеша пароля - он один на всех, с солью).
+# Строки вставляются пачками executemany (--batch-size) в больших транзакциях
+# (--users-per-transaction пользователей со всеми их заказами), id задаются явно.
+# Схема создается миграциями, как в продакшене; если меню пустое - создается синтетическое.
+# Пишет только в явно указанную БД, в рабочую по умолчанию - никогда.
+#
+#   python generate_scale_data.py --db /tmp/scale.db --users 1000000
+#   python generate_scale_data.py --url postgresql://localhost/sushi_scale --users 200000 --orders-per-user 8
+#
+# Войти можно любым сгенерированным пользователем: user<id>@scale.local / SCALE_PASSWORD.
+
+SCALE_PASSWORD = 'scale-password'
+USER_EMAIL = 'user{}@scale.local'
+
+END_DATE = datetime(2026, 1, 1)  # Фиксированная дата вместо now(): данные не зависят от дня запуска
+BATCH_SIZE = 5000
+USERS_PER_TRANSACTION = 20000
+
+REFERRED_SHARE = 0.2  # Доля пользователей, пришедших по реферальному коду
+MAX_ORDERS_PER_USER = 200
+MAX_ITEMS_PER_ORDER = 20
+LOYALTY_CARD_SIZE = 8  # Роллов на одну накопительную карту
+RECENT_ORDER_DAYS = 2  # Заказы моложе этого еще в работе, старые - доставлены или отменены
+CANCELLED_SHARE = 0.05
+
+ACTIVE_STATUSES = ('Принят', 'Готовится', 'Готов', 'В пути')
+PAYMENT_METHODS = ('cash', 'card')
+
+FIRST_NAMES = ('Айбек', 'Айгуль', 'Алия', 'Бакыт', 'Динара', 'Эрлан', 'Жанна', 'Нурлан', 'Мээрим', 'Тимур',
+               'Асель', 'Руслан', 'Камила', 'Данияр', 'Элина', 'Максим', 'Анна', 'Сергей', 'Ольга', 'Артем')
+STREETS = ('Чуй', 'Манаса', 'Токтогула', 'Киевская', 'Ахунбаева', 'Боконбаева', 'Исанова', 'Советская',
+           'Московская', 'Логвиненко')
+
+# Родительские таблицы раньше дочерних: пачки сбрасываются в этом порядке
+TABLES = [model.__table__ for model in (
+    Ingredient, Roll, RollIngredient, Set, SetRoll, OtherItem, LoyaltyRoll,
+    User, ReferralUsage, PointsTransaction, Order, OrderItem, LoyaltyCard, LoyaltyCardUsage,
+)]
+GENERATED_TABLES = [table for table in TABLES if table.name in (
+    'users', 'referral_usage', 'points_ledger', 'orders', 'order_items', 'loyalty_cards', 'loyalty_card_usage',
+)]
+
+
+class BulkWriter:
+    """Буферы строк по таблицам. Пачка уходит одним executemany, родительские таблицы - первыми"""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.conn = None
+        self.buffers = {table: [] for table in TABLES}
+        self.counts = Counter()
+
+    def add(self, table, row):
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for table, rows in self.buffers.items():
+            if rows:
+                self.conn.execute(table.insert(), rows)
+                self.counts[table.name] += len(rows)
+                rows.clear()
+
+
+def referral_code(user_id):
+    """Реферальный код из id (S + id в base36): уникален без проверки по БД"""
+    digits = ''
+    while user_id:
+        user_id, digit = divmod(user_id, len(REFERRAL_CODE_ALPHABET))
+        digits = REFERRAL_CODE_ALPHABET[digit] + digits
+    return 'S' + digits.rjust(REFERRAL_CODE_LENGTH - 1, REFERRAL_CODE_ALPHABET[0])
+
+
+def _next_id(conn, model):
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def ensure_menu(conn, writer, rnd):
+    """Товары для позиций заказов: из БД или, если меню пустое, синтетические"""
+    if not conn.execute(select(func.count(Roll.id))).scalar():
+        print('🍣 Меню пустое - создаем синтетическое')
+        # Справочники могут быть заполнены и без роллов - id продолжают существующие
+        ingredient_ids = range(_next_id(conn, Ingredient), _next_id(conn, Ingredient) + 100)
+        roll_ids = range(_next_id(conn, Roll), _next_id(conn, Roll) + 300)
+        for i in ingredient_ids:
+            cost = round(rnd.uniform(0.01, 3), 2)
+            writer.add(Ingredient.__table__, {'id': i, 'name': f'Ингредиент {i}', 'cost_per_unit': cost,
+                                              'price_per_unit': round(cost * 1.2, 2), 'stock_quantity': 100000,
+                                              'unit': 'г', 'created_at': END_DATE, 'updated_at': END_DATE})
+        for i in roll_ids:
+            price = rnd.randrange(180, 700, 10)
+            writer.add(Roll.__table__, {'id': i, 'name': f'Ролл {i}', 'description': f'Описание ролла {i}',
+                                        'cost_price': round(price * 0.3, 2), 'sale_price': price, 'image_url': None,
+                                        'is_popular': rnd.random() < 0.1, 'is_new': rnd.random() < 0.05,
+                                        'created_at': END_DATE, 'updated_at': END_DATE})
+            for ingredient_id in rnd.sample(ingredient_ids, 4):
+                writer.add(RollIngredient.__table__, {'roll_id': i, 'ingredient_id': ingredient_id,
+                                                      'amount_per_roll': rnd.randint(5, 120)})
+        first_set_id = _next_id(conn, Set)
+        for i in range(first_set_id, first_set_id + 60):
+            price = rnd.randrange(900, 4000, 50)
+            writer.add(Set.__table__, {'id': i, 'name': f'Сет {i}', 'description': None,
+                                       'cost_price': round(price * 0.4, 2), 'set_price': price,
+                                       'discount_percent': rnd.randint(0, 30), 'image_url': None,
+                                       'is_popular': rnd.random() < 0.1, 'is_new': False,
+                                       'created_at': END_DATE, 'updated_at': END_DATE})
+            for roll_id in rnd.sample(roll_ids, 4):
+                writer.add(SetRoll.__table__, {'set_id': i, 'roll_id': roll_id, 'quantity': rnd.randint(1, 2)})
+        first_other_id = _next_id(conn, OtherItem)
+        for i in range(first_other_id, first_other_id + 30):
+            price = rnd.randrange(30, 300, 10)
+            writer.add(OtherItem.__table__, {'id': i, 'name': f'Товар {i}', 'description': None,
+                                             'cost_price': round(price * 0.5, 2), 'sale_price': price,
+                                             'category': rnd.choice(('соусы', 'напитки', 'другое')),
+                                             'image_url': None, 'stock_quantity': 1000, 'unit': 'шт',
+                                             'is_popular': False, 'is_new': False,
+                                             'created_at': END_DATE, 'updated_at': END_DATE})
+        for roll_id in roll_ids[:10]:
+            writer.add(LoyaltyRoll.__table__, {'roll_id': roll_id, 'is_available': True, 'created_at': END_DATE})
+        writer.flush()
+
+    catalog = {
+        'roll': conn.execute(select(Roll.id, Roll.sale_price).order_by(Roll.id)).all(),
+        'set': conn.execute(select(Set.id, Set.set_price).order_by(Set.id)).all(),
+        'other_item': conn.execute(select(OtherItem.id, OtherItem.sale_price).order_by(OtherItem.id)).all(),
+    }
+    loyalty_rolls = conn.execute(select(LoyaltyRoll.roll_id).order_by(LoyaltyRoll.id)).scalars().all()
+    return catalog, loyalty_rolls or [roll_id for roll_id, _ in catalog['roll'][:10]]
+
+
+def plan_referrals(users, rnd):
+    """Кто кого пригласил (индексы новых пользователей, -1 - без приглашения) и сколько пригласил каждый.
+
+    Планируется заранее: строка пригласившего вставляется раньше приглашенных,
+    и в ней сразу должны быть итоговые счетчик и баланс.
+    """
+    referrers = array('l', [-1]) * users
+    counts = array('l', [0]) * users
+    for i in range(1, users):
+        if rnd.random() < REFERRED_SHARE:
+            # Чаще приглашают давние пользователи: у них было больше времени
+            referrer = int(i * rnd.random() ** 2)
+            referrers[i] = referrer
+            counts[referrer] += 1
+    return referrers, counts
+
+
+def _pick_item(rnd, catalog):
+    roll = rnd.random()
+    item_type = 'roll' if roll < 0.7 or not catalog['set'] else 'set' if roll < 0.92 else 'other_item'
+    if not catalog[item_type]:
+        item_type = 'roll'
+    item_id, price = rnd.choice(catalog[item_type])
+    return item_type, item_id, price
+
+
+def _order_status(rnd, created_at):
+    if END_DATE - created_at < timedelta(days=RECENT_ORDER_DAYS):
+        return rnd.choice(ACTIVE_STATUSES)
+    return 'Отменен' if rnd.random() < CANCELLED_SHARE else 'Доставлен'
+
+
+def generate(engine, users, orders_per_user=5.0, items_per_order=3.0, days=730, seed=42,
+             batch_size=BATCH_SIZE, users_per_transaction=USERS_PER_TRANSACTION):
+    """Добавляет users пользователей со всей их историей. Возвращает число вставленных строк по таблицам"""
+    rnd = random.Random(seed)
+    writer = BulkWriter(batch_size)
+    with engine.begin() as conn:
+        writer.conn = conn
+        catalog, loyalty_rolls = ensure_menu(conn, writer, random.Random(f'{seed}:menu'))
+        next_ids = {model.__tablename__: _next_id(conn, model)
+                    for model in (User, Order, OrderItem, LoyaltyCard, LoyaltyCardUsage)}
+
+    first_user_id = next_ids['users']
+    referrers, referral_counts = plan_referrals(users, random.Random(f'{seed}:referrals'))
+    bonus_balances = array('l', [0]) * users  # Баланс по мере начислений - для balance_after в журнале
+    password_hash = generate_password_hash(SCALE_PASSWORD)
+    start_date = END_DATE - timedelta(days=days)
+    span = END_DATE - start_date
+
+    order_id, item_id = next_ids['orders'], next_ids['order_items']
+    card_id, usage_id = next_ids['loyalty_cards'], next_ids['loyalty_card_usage']
+    started = time.perf_counter()
+
+    for chunk_start in range(0, users, users_per_transaction):
+        with engine.begin() as conn:
+            writer.conn = conn
+            for i in range(chunk_start, min(chunk_start + users_per_transaction, users)):
+                user_id = first_user_id + i
+                created_at = start_date + span * (i / users)
+                phone = f'+996 {rnd.randint(500, 779)} {rnd.randint(0, 999999):06d}'
+                location = f'ул. {rnd.choice(STREETS)}, {rnd.randint(1, 250)}'
+                bonus = referral_counts[i] * REFERRAL_BONUS_POINTS
+
+                referrer = referrers[i]
+                referrer_code = referral_code(first_user_id + referrer) if referrer >= 0 else None
+                writer.add(User.__table__, {
+                    'id': user_id, 'name': f'{rnd.choice(FIRST_NAMES)} {i}', 'email': USER_EMAIL.format(user_id),
+                    'phone': phone, 'location': location, 'password_hash': password_hash,
+                    'loyalty_points': 0, 'bonus_points': bonus, 'referral_code': referral_code(user_id),
+                    'referred_by': referrer_code, 'referrals_count': referral_counts[i],
+                    'referral_bonus_earned': bonus, 'favorites': None, 'cart': None,
+                    'created_at': created_at, 'last_login_at': None, 'is_active': True, 'is_admin': False,
+                })
+                if referrer >= 0:
+                    bonus_balances[referrer] += REFERRAL_BONUS_POINTS
+                    writer.add(ReferralUsage.__table__, {
+                        'referrer_id': first_user_id + referrer, 'referred_id': user_id,
+                        'referral_code': referrer_code, 'bonus_points_awarded': REFERRAL_BONUS_POINTS,
+                        'created_at': created_at,
+                    })
+                    writer.add(PointsTransaction.__table__, {
+                        'user_id': first_user_id + referrer, 'points_type': 'bonus',
+                        'amount': REFERRAL_BONUS_POINTS, 'balance_after': bonus_balances[referrer],
+                        'reason': 'referral', 'order_id': None, 'created_at': created_at,
+                    })
+
+                # Заказы пользователя по времени; роллы доставленных заказов заполняют накопительные карты
+                orders_count = min(int(rnd.expovariate(1 / orders_per_user)), MAX_ORDERS_PER_USER)
+                order_dates = sorted(created_at + (END_DATE - created_at) * rnd.random() for _ in range(orders_count))
+                filled = 0
+                for ordered_at in order_dates:
+                    status = _order_status(rnd, ordered_at)
+                    items_count = min(1 + int(rnd.expovariate(1 / max(items_per_order - 1, 0.1))),
+                                      MAX_ITEMS_PER_ORDER)
+                    items = []
+                    for _ in range(items_count):
+                        item_type, product_id, price = _pick_item(rnd, catalog)
+                        quantity = rnd.choice((1, 1, 1, 2, 3))
+                        if item_type == 'roll' and status == 'Доставлен':
+                            filled += quantity
+                        items.append({
+                            'id': item_id, 'order_id': order_id, 'item_type': item_type, 'item_id': product_id,
+                            'quantity': quantity, 'unit_price': price, 'total_price': price * quantity,
+                        })
+                        item_id += 1
+                    # Строка заказа в буфер раньше позиций: при сбросе пачки позиция не опередит свой заказ
+                    writer.add(Order.__table__, {
+                        'id': order_id, 'user_id': user_id, 'phone': phone, 'delivery_address': location,
+                        'payment_method': rnd.choice(PAYMENT_METHODS), 'status': status,
+                        'total_price': sum(item['total_price'] for item in items), 'comment': None,
+                        'created_at': ordered_at,
+                        'updated_at': min(ordered_at + timedelta(minutes=rnd.randint(5, 90)), END_DATE),
+                    })
+                    for item in items:
+                        writer.add(OrderItem.__table__, item)
+
+                    while filled >= LOYALTY_CARD_SIZE:
+                        # Карта заполнена этим заказом - бесплатный ролл и новая карта
+                        filled -= LOYALTY_CARD_SIZE
+                        writer.add(LoyaltyCard.__table__, {
+                            'id': card_id, 'user_id': user_id, 'card_number': f'LC-{card_id:06d}',
+                            'filled_rolls': LOYALTY_CARD_SIZE, 'is_completed': True,
+                            'created_at': created_at, 'completed_at': ordered_at,
+                        })
+                        writer.add(LoyaltyCardUsage.__table__, {
+                            'id': usage_id, 'user_id': user_id, 'loyalty_card_id': card_id,
+                            'roll_id': rnd.choice(loyalty_rolls), 'order_id': order_id, 'used_at': ordered_at,
+                        })
+                        card_id += 1
+                        usage_id += 1
+                    order_id += 1
+
+                if order_dates:
+                    writer.add(LoyaltyCard.__table__, {
+                        'id': card_id, 'user_id': user_id, 'card_number': f'LC-{card_id:06d}',
+                        'filled_rolls': filled, 'is_completed': False,
+                        'created_at': order_dates[0], 'completed_at': None,
+                    })
+                    card_id += 1
+            writer.flush()
+
+        done = min(chunk_start + users_per_transaction, users)
+        rows = sum(writer.counts[table.name] for table in GENERATED_TABLES)
+        elapsed = time.perf_counter() - started
+        print(f'👥 {done}/{users} пользователей, {rows} строк, {rows / elapsed:.0f} строк/с')
+
+    with engine.begin() as conn:
+        if engine.dialect.name == 'postgresql':
+            # id задавались явно - последовательности нужно сдвинуть за них, иначе приложение получит дубликат ключа
+            for table in TABLES:
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                                  f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {table.name}), false)"))
+        conn.exec_driver_sql('ANALYZE')  # Статистика планировщика для новых объемов
+    return writer.counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Синтетические данные для проверки производительности')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--db', help='Файл SQLite (создается, если его нет)')
+    target.add_argument('--url', help='URL БД (например, postgresql://...)')
+    parser.add_argument('--users', type=int, default=100000, help='Сколько пользователей добавить')
+    parser.add_argument('--orders-per-user', type=float, default=5.0, help='Среднее число заказов на пользователя')
+    parser.add_argument('--items-per-order', type=float, default=3.0, help='Среднее число позиций в заказе')
+    parser.add_argument('--days', type=int, default=730, help='За сколько дней до END_DATE распределить данные')
+    parser.add_argument('--seed', type=int, default=42, help='Зерно генератора')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Строк в одном executemany')
+    parser.add_argument('--users-per-transaction', type=int, default=USERS_PER_TRANSACTION,
+                        help='Пользователей (со всеми заказами) в одной транзакции')
+    args = parser.parse_args()
+
+    engine = create_db_engine(f'sqlite:///{args.db}' if args.db else args.url)
+    migrate(engine)
+
+    started = time.perf_counter()
+    counts = generate(engine, args.users, args.orders_per_user, args.items_per_order, args.days, args.seed,
+                      args.batch_size, args.users_per_transaction)
+    elapsed = time.perf_counter() - started
+    for table in TABLES:
+        if counts[table.name]:
+            print(f'   {table.name}: {counts[table.name]}')
+    print(f'🎉 Вставлено {sum(counts.values())} строк за {elapsed:.1f} с')
@@ -0,0 +1,136 @@
+import os
+import time
+
+from sqlalchemy import text
+
+from config import DB_MAX_OVERFLOW, SQLITE_BUSY_TIMEOUT_MS, HEALTH_DB_TIMEOUT_MS, HEALTH_WAL_WARN_MB
+from menu_cache import get_cache_ages, MENU_CACHE_TTL
+from menu_reload import is_reload_in_progress
+from migrations import get_pending_migrations, is_migration_running
+
+# Проверки для балансировщика и оркестратора:
+# - живость (/api/health/live): процесс отвечает, БД не трогаем - перезапуск
+#   узла не поможет, если недоступна общая БД;
+# - готовность (/api/health/ready): узел может обслуживать запросы. 503, если
+#   БД не отвечает (нет файла, заблокирована, сервер недоступен), пул соединений
+#   исчерпан, схема отстает от кода или идут миграции / перезагрузка меню -
+#   балансировщик снимает с узла трафик, пока проверка не станет снова успешной.
+# Остальное (размер WAL, возраст снимка меню, медленный ответ БД) - в отчете
+# как предупреждения, готовность не меняет.
+
+STARTED_AT = time.time()
+
+_schema_current = False  # Все миграции кода применены (новых до перезапуска процесса не появится)
+
+
+def sqlite_file(engine):
+    """Путь к файлу SQLite движка (None - не SQLite)"""
+    if engine.dialect.name != 'sqlite' or not engine.url.database:
+        return None
+    path = engine.url.database
+    return path[len('file:'):] if path.startswith('file:') else path
+
+
+def pool_status(engine):
+    """Занятость пула соединений движка"""
+    pool = engine.pool
+    if not hasattr(pool, 'checkedout') or not hasattr(pool, 'size'):
+        return {'class': type(pool).__name__}
+    capacity = pool.size() + DB_MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    return {
+        'size': pool.size(),
+        'capacity': capacity,
+        'checked_out': checked_out,
+        'saturation': round(checked_out / capacity, 2) if capacity else 0,
+    }
+
+
+def check_database(engine):
+    """Простой запрос к БД с замером времени. Блокировку SQLite ждем не дольше HEALTH_DB_TIMEOUT_MS"""
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            if engine.dialect.name == 'sqlite':
+                conn.exec_driver_sql(f'PRAGMA busy_timeout = {HEALTH_DB_TIMEOUT_MS}')
+                try:
+                    # Чтение схемы берет разделяемую блокировку файла - SELECT 1 ее не берет
+                    conn.execute(text('SELECT count(*) FROM sqlite_master'))
+                finally:
+                    conn.exec_driver_sql(f'PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}')
+            else:
+                conn.execute(text('SELECT 1'))
+    except Exception as e:
+        error = str(e).splitlines()[0]
+    else:
+        error = None
+    latency_ms = round((time.perf_counter() - started) * 1000, 1)
+    if error:
+        return {'ok': False, 'error': error, 'latency_ms': latency_ms}
+    return {'ok': True, 'latency_ms': latency_ms, 'slow': latency_ms > HEALTH_DB_TIMEOUT_MS}
+
+
+def wal_status(path):
+    """Размер WAL-файла SQLite: растет, если контрольные точки не успевают (длинные читающие транзакции)"""
+    wal_path = path + '-wal'
+    size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    return {'size_mb': round(size / 1024 / 1024, 2), 'large': size > HEALTH_WAL_WARN_MB * 1024 * 1024}
+
+
+def liveness():
+    return {'status': 'alive', 'pid': os.getpid(), 'uptime_seconds': round(time.time() - STARTED_AT)}
+
+
+def readiness(db):
+    """(готов ли узел, отчет по проверкам)"""
+    global _schema_current
+    reasons, warnings, checks = [], [], {}
+
+    for key, engine in db.engines.items():
+        name = key or 'primary'
+        pool = pool_status(engine)
+        check = {'pool': pool}
+        path = sqlite_file(engine)
+        if path and not os.path.exists(path):
+            # Соединение создало бы пустой файл вместо настоящей БД
+            check.update(ok=False, error=f'Нет файла БД {path}')
+            reasons.append(f'Нет файла БД {name}: {path}')
+        elif pool.get('capacity') and pool['checked_out'] >= pool['capacity']:
+            # Проверка ждала бы соединение до DB_POOL_TIMEOUT, как и любой новый запрос
+            reasons.append(f'Пул соединений {name} исчерпан')
+        else:
+            check.update(check_database(engine))
+            if not check['ok']:
+                reasons.append(f"БД {name} не отвечает: {check['error']}")
+            elif check['slow']:
+                warnings.append(f"БД {name} отвечает медленно: {check['latency_ms']} мс")
+        checks[name] = check
+
+    primary_ok = checks['primary'].get('ok', False)
+    if is_migration_running(db.engine if primary_ok else None):
+        reasons.append('Выполняются миграции схемы')
+    elif not _schema_current and primary_ok:
+        pending = get_pending_migrations(db.engine)
+        if pending:
+            reasons.append(f"Не применены миграции: {', '.join(name for _, name in pending)}")
+        else:
+            _schema_current = True
+
+    if is_reload_in_progress():
+        reasons.append('Перезагружается меню')
+
+    path = sqlite_file(db.engine)
+    if path:
+        checks['wal'] = wal_status(path)
+        if checks['wal']['large']:
+            warnings.append(f"WAL-файл {checks['wal']['size_mb']} МБ")
+
+    ages = get_cache_ages()
+    checks['menu_cache'] = {'ttl_seconds': MENU_CACHE_TTL, 'age_seconds': ages}
+
+    return not reasons, {
+        'status': 'ready' if not reasons else 'not_ready',
+        'reasons': reasons,
+        'warnings': warnings,
+        'checks': checks,
+    }
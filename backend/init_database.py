@@ -4,132 +4,36 @@
 """
 
 import sqlite3
-import hashlib
 import secrets
 import string
 
+from werkzeug.security import generate_password_hash
+
+from config import DB_PATH
+from database import get_engine, connect
+from migrations import migrate
+from menu_import import INGREDIENT_MARKUP
+
 def generate_referral_code():
     """Генерирует случайный реферальный код"""
     return ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(8))
 
 def hash_password(password):
-    """Хеширует пароль"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Хеширует пароль (тем же способом, что и API при регистрации)"""
+    return generate_password_hash(password)
 
 def init_database():
     """Инициализирует базу данных"""
     
+    # Схема создается миграциями по models.py (раньше здесь был свой CREATE TABLE,
+    # который расходился с моделями: rolls.price вместо cost_price/sale_price и т.д.)
+    migrate(get_engine())
+
     # Подключение к базе данных
-    conn = sqlite3.connect('sushi_express.db')
+    conn = connect()
     cursor = conn.cursor()
     
     try:
-        print("🏗️ Создание таблиц...")
-        
-        # Таблица пользователей
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                phone TEXT,
-                password_hash TEXT NOT NULL,
-                location TEXT,
-                loyalty_points INTEGER DEFAULT 0,
-                bonus_points INTEGER DEFAULT 0,
-                referral_code TEXT UNIQUE,
-                referred_by TEXT,
-                is_active BOOLEAN DEFAULT 1,
-                is_admin BOOLEAN DEFAULT 0,
-                cart TEXT DEFAULT '[]',
-                favorites TEXT DEFAULT '{}',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login_at TIMESTAMP
-            )
-        """)
-        
-        # Таблица роллов
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS rolls (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                price REAL NOT NULL,
-                image_url TEXT,
-                ingredients TEXT,
-                category TEXT,
-                is_popular BOOLEAN DEFAULT 0,
-                is_available BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Таблица сетов
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                price REAL NOT NULL,
-                image_url TEXT,
-                rolls_included TEXT,
-                is_popular BOOLEAN DEFAULT 0,
-                is_available BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Таблица заказов
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS orders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                user_name TEXT NOT NULL,
-                user_phone TEXT NOT NULL,
-                user_email TEXT NOT NULL,
-                delivery_address TEXT NOT NULL,
-                delivery_latitude REAL NOT NULL,
-                delivery_longitude REAL NOT NULL,
-                total_amount REAL NOT NULL,
-                status TEXT DEFAULT 'pending',
-                notes TEXT,
-                delivery_instructions TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        """)
-        
-        # Таблица элементов заказа
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS order_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                order_id INTEGER NOT NULL,
-                item_type TEXT NOT NULL,
-                item_id INTEGER NOT NULL,
-                item_name TEXT NOT NULL,
-                item_image TEXT,
-                quantity INTEGER NOT NULL,
-                price REAL NOT NULL,
-                total_price REAL NOT NULL,
-                FOREIGN KEY (order_id) REFERENCES orders (id)
-            )
-        """)
-        
-        # Таблица ингредиентов
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS ingredients (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                current_stock REAL NOT NULL,
-                unit TEXT NOT NULL,
-                min_stock REAL DEFAULT 0,
-                cost_per_unit REAL DEFAULT 0,
-                supplier TEXT,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
         print("✅ Таблицы созданы!")
         
         # Создаем пользователя шеф-повара
@@ -192,21 +96,23 @@ def init_database():
         print("🥘 Добавление базовых ингредиентов...")
         
         ingredients = [
-            ("Рис для суши", 15.0, "кг", 5.0, 150.0, "Поставщик риса"),
-            ("Лосось", 8.0, "кг", 2.0, 800.0, "Рыбный поставщик"),
-            ("Авокадо", 12.0, "шт", 5.0, 50.0, "Фруктовый поставщик"),
-            ("Сыр Филадельфия", 6.0, "упаковок", 2.0, 300.0, "Молочный поставщик"),
-            ("Нори", 50.0, "листов", 10.0, 20.0, "Морской поставщик"),
-            ("Васаби", 3.0, "тюбиков", 1.0, 150.0, "Специи поставщик"),
-            ("Имбирь", 2.0, "банок", 1.0, 100.0, "Консервы поставщик"),
+            ("Рис для суши", 15.0, "кг", 150.0),
+            ("Лосось", 8.0, "кг", 800.0),
+            ("Авокадо", 12.0, "шт", 50.0),
+            ("Сыр Филадельфия", 6.0, "упаковок", 300.0),
+            ("Нори", 50.0, "листов", 20.0),
+            ("Васаби", 3.0, "тюбиков", 150.0),
+            ("Имбирь", 2.0, "банок", 100.0),
         ]
         
-        for name, stock, unit, min_stock, cost, supplier in ingredients:
+        for name, stock, unit, cost in ingredients:
             cursor.execute("""
-                INSERT OR IGNORE INTO ingredients (
-                    name, current_stock, unit, min_stock, cost_per_unit, supplier
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (name, stock, unit, min_stock, cost, supplier))
+                INSERT INTO ingredients (
+                    name, stock_quantity, unit, cost_per_unit, price_per_unit, created_at, updated_at
+                )
+                SELECT ?, ?, ?, ?, ?, datetime('now'), datetime('now')
+                WHERE NOT EXISTS (SELECT 1 FROM ingredients WHERE name = ?)
+            """, (name, stock, unit, cost, round(cost * INGREDIENT_MARKUP, 2), name))
         
         print("✅ Ингредиенты добавлены!")
         
@@ -227,7 +133,7 @@ def init_database():
             print(f"   - {user[1]} ({user[2]}) {'[АДМИН]' if user[3] else ''}")
         
         print("\n🥘 Ингредиенты:")
-        cursor.execute("SELECT name, current_stock, unit FROM ingredients;")
+        cursor.execute("SELECT name, stock_quantity, unit FROM ingredients;")
         ingredients = cursor.fetchall()
         for ingredient in ingredients:
             print(f"   - {ingredient[0]}: {ingredient[1]} {ingredient[2]}")
@@ -243,5 +149,6 @@ def init_database():
 
 if __name__ == "__main__":
     print("🍣 Инициализация базы данных...")
+    print(f"📁 Файл: {DB_PATH}")
     init_database()
 
@@ -0,0 +1,286 @@
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from urllib.parse import urlsplit
+
+# Нагрузочный тест: N одновременных покупателей проходят реальный путь клиента
+# против запущенного API (только локально / на стенде, не против продакшена).
+#   покупатель: вход -> меню /api/rolls -> /api/cart/add -> POST /api/orders -> опрос статуса заказа
+#   зритель:    вход -> меню /api/rolls и /api/sets (без заказа)
+# Доля покупателей задается --mix, пользователи стартуют равномерно за --ramp секунд.
+# В конце - задержки p50/p95/p99 и пропускная способность по каждому эндпоинту,
+# по ним подбирается число воркеров перед вечерним пиком.
+#
+#   python load_test.py --users 50 --duration 60 --ramp 10 --mix buyer=30,browser=70
+#   python load_test.py --url http://127.0.0.1:5002 --users 20 --json results.json
+#
+# Только стандартная библиотека: HTTP/1.1 с keep-alive поверх asyncio streams.
+
+USER_EMAIL = 'loadtest{}@loadtest.local'
+USER_PASSWORD = 'loadtest-password'
+
+_ID_RE = re.compile(r'/\d+')
+
+
+class HttpClient:
+    """Минимальный асинхронный HTTP/1.1 клиент с одним keep-alive соединением"""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, token=None):
+        """Возвращает (статус, JSON ответа или None)"""
+        payload = json.dumps(body).encode() if body is not None else b''
+        headers = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', 'Accept: application/json',
+                   f'Content-Length: {len(payload)}']
+        if body is not None:
+            headers.append('Content-Type: application/json')
+        if token:
+            headers.append(f'Authorization: Bearer {token}')
+        data = ('\r\n'.join(headers) + '\r\n\r\n').encode() + payload
+
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                self.writer.write(data)
+                await self.writer.drain()
+                return await asyncio.wait_for(self._read_response(), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Сервер закрыл простаивавшее соединение - повторяем один раз на новом
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _read_response(self):
+        status_line = await self.reader.readuntil(b'\r\n')
+        version, status = status_line.split(b' ', 2)[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding') == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            content = b''.join(chunks)
+        elif 'content-length' in headers:
+            content = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            content = await self.reader.read()
+
+        if version == b'HTTP/1.0' or headers.get('connection', '').lower() == 'close' or \
+                'content-length' not in headers and 'transfer-encoding' not in headers:
+            await self.close()
+        try:
+            return int(status), json.loads(content) if content else None
+        except ValueError:
+            return int(status), None
+
+
+class Stats:
+    """Задержки и ошибки по эндпоинтам"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, endpoint, seconds, ok, detail=None):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if not ok:
+            self.errors.setdefault(endpoint, {}).setdefault(str(detail), 0)
+            self.errors[endpoint][str(detail)] += 1
+
+    def report(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        rows = []
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            rows.append({
+                'endpoint': endpoint,
+                'requests': len(values),
+                'errors': sum(self.errors.get(endpoint, {}).values()),
+                'error_details': self.errors.get(endpoint, {}),
+                'rps': round(len(values) / elapsed, 2),
+                'p50_ms': round(percentile(values, 50) * 1000, 1),
+                'p95_ms': round(percentile(values, 95) * 1000, 1),
+                'p99_ms': round(percentile(values, 99) * 1000, 1),
+                'max_ms': round(values[-1] * 1000, 1),
+            })
+        total = sum(row['requests'] for row in rows)
+        return {'seconds': round(elapsed, 2), 'requests': total, 'rps': round(total / elapsed, 2), 'endpoints': rows}
+
+
+def percentile(sorted_values, p):
+    """Перцентиль по методу ближайшего ранга"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def endpoint_name(method, path):
+    """GET /api/orders/15?fields=status -> GET /api/orders/<id>"""
+    return f"{method} {_ID_RE.sub('/<id>', path.split('?')[0])}"
+
+
+class VirtualUser:
+    def __init__(self, index, args, stats):
+        self.index = index
+        self.args = args
+        self.stats = stats
+        self.client = HttpClient(args.url, timeout=args.timeout)
+        self.token = None
+        self.rolls = []
+
+    async def call(self, method, path, body=None, expected=(200,)):
+        started = time.perf_counter()
+        try:
+            status, payload = await self.client.request(method, path, body, self.token)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            self.stats.record(endpoint_name(method, path), time.perf_counter() - started, False, type(e).__name__)
+            return None, None
+        self.stats.record(endpoint_name(method, path), time.perf_counter() - started, status in expected, status)
+        return status, payload
+
+    async def think(self):
+        if self.args.think:
+            await asyncio.sleep(random.uniform(0, self.args.think * 2))
+
+    async def login(self):
+        credentials = {'email': USER_EMAIL.format(self.index), 'password': USER_PASSWORD}
+        status, payload = await self.call('POST', '/api/login', credentials, expected=(200, 401))
+        if status == 401:
+            # Первый запуск: создаем пользователя для нагрузочного теста
+            status, payload = await self.call('POST', '/api/register', dict(
+                credentials, name=f'Нагрузка {self.index}', phone='0'
+            ), expected=(201,))
+        self.token = (payload or {}).get('access_token')
+        return self.token is not None
+
+    async def browse(self):
+        status, payload = await self.call('GET', '/api/rolls')
+        if status == 200 and payload:
+            self.rolls = [roll['id'] for roll in payload.get('rolls', [])]
+        await self.think()
+        await self.call('GET', '/api/sets')
+
+    async def buy(self):
+        await self.browse()
+        if not self.rolls:
+            return
+        await self.think()
+        for roll_id in random.sample(self.rolls, min(len(self.rolls), random.randint(1, 3))):
+            await self.call('POST', '/api/cart/add', {'item_type': 'roll', 'item_id': roll_id,
+                                                     'quantity': random.randint(1, 2)})
+        await self.think()
+        status, payload = await self.call('POST', '/api/orders', {
+            'delivery_address': 'ул. Нагрузочная, 1', 'payment_method': 'cash'
+        }, expected=(201,))
+        order_id = ((payload or {}).get('order') or {}).get('id')
+        if status != 201 or not order_id:
+            return
+        for _ in range(self.args.polls):
+            await asyncio.sleep(self.args.poll_interval)
+            await self.call('GET', f'/api/orders/{order_id}?fields=id,status')
+
+    async def run(self, deadline):
+        try:
+            if not await self.login():
+                return
+            while time.perf_counter() < deadline:
+                if random.random() < self.args.buyer_share:
+                    await self.buy()
+                else:
+                    await self.browse()
+                await self.think()
+        finally:
+            await self.client.close()
+
+
+def parse_mix(value):
+    """'buyer=30,browser=70' -> доля покупателей"""
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight)
+    unknown = set(weights) - {'buyer', 'browser'}
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+    total = sum(weights.values())
+    return weights.get('buyer', 0) / total if total else 0
+
+
+async def run_load(args):
+    stats = Stats()
+    deadline = time.perf_counter() + args.ramp + args.duration
+    tasks = []
+    for index in range(args.users):
+        user = VirtualUser(index, args, stats)
+        tasks.append(asyncio.create_task(user.run(deadline)))
+        if args.users > 1:
+            await asyncio.sleep(args.ramp / args.users)  # Равномерный разгон
+    await asyncio.gather(*tasks)
+    stats.finished = time.perf_counter()
+    return stats.report()
+
+
+def print_report(report):
+    print(f"\n📊 {report['requests']} запросов за {report['seconds']} с, {report['rps']} запр/с")
+    print(f"{'Эндпоинт':<32} {'запросов':>9} {'ошибок':>7} {'запр/с':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for row in report['endpoints']:
+        print(f"{row['endpoint']:<32} {row['requests']:>9} {row['errors']:>7} {row['rps']:>8} "
+              f"{row['p50_ms']:>6}мс {row['p95_ms']:>6}мс {row['p99_ms']:>6}мс {row['max_ms']:>6}мс")
+        for detail, count in row['error_details'].items():
+            print(f"   ❌ {detail}: {count}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Нагрузочный тест пути покупателя')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Адрес API')
+    parser.add_argument('--users', type=int, default=20, help='Одновременных пользователей')
+    parser.add_argument('--duration', type=float, default=30, help='Длительность после разгона, с')
+    parser.add_argument('--ramp', type=float, default=5, help='Время разгона до --users, с')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('buyer=30,browser=70'), dest='buyer_share',
+                        help='Доли сценариев, например buyer=30,browser=70')
+    parser.add_argument('--think', type=float, default=0.5, help='Средняя пауза между действиями, с (0 - без пауз)')
+    parser.add_argument('--polls', type=int, default=3, help='Сколько раз опрашивать статус заказа')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='Интервал опроса статуса, с')
+    parser.add_argument('--timeout', type=float, default=30, help='Таймаут запроса, с')
+    parser.add_argument('--seed', type=int, help='Seed генератора случайных чисел (повторяемый сценарий)')
+    parser.add_argument('--json', help='Сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    print(f"🚀 {args.users} пользователей на {args.url}: разгон {args.ramp} с, нагрузка {args.duration} с, "
+          f"покупателей {args.buyer_share:.0%}")
+    result = asyncio.run(run_load(args))
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(dict(result, config={key: value for key, value in vars(args).items() if key != 'json'}),
+                      f, ensure_ascii=False, indent=2)
+        print(f"💾 Результаты: {args.json}")
@@ -0,0 +1,128 @@
+import threading
+import time
+
+from models import db, Roll, Set, LoyaltyRoll, CatalogVersion
+
+# Кэш каталога (снимок меню) общий для /api/rolls, /api/sets и /api/loyalty/available-rolls.
+# Каждый раздел строится одним запросом по нужным колонкам, без загрузки ORM-объектов
+# и их связей. Снимок сбрасывается по TTL или явно через invalidate_menu_cache().
+# Каждый раздел помечен версией каталога из БД (таблица catalog_version, ее увеличивает
+# импорт меню в своей транзакции). Перед выдачей раздела версия читается по первичному
+# ключу: после перезагрузки меню на любом воркере или узле раздел перестраивается
+# сразу, а не через MENU_CACHE_TTL.
+
+MENU_CACHE_TTL = 60  # секунд
+
+_lock = threading.Lock()
+_version = 0
+_sections = {}  # имя раздела -> (версия, время построения, данные)
+
+
+def _build_rolls():
+    """Список роллов для меню"""
+    rows = db.session.query(
+        Roll.id, Roll.name, Roll.description, Roll.sale_price, Roll.image_url
+    ).order_by(Roll.id).all()
+
+    return [{
+        'id': row.id,
+        'name': row.name,
+        'description': row.description,
+        'price': row.sale_price,  # Добавляем поле price
+        'sale_price': row.sale_price,
+        'image_url': row.image_url,
+        'category': 'roll',
+        'is_available': True
+    } for row in rows]
+
+
+def _build_sets():
+    """Список сетов для меню"""
+    rows = db.session.query(
+        Set.id, Set.name, Set.description, Set.set_price, Set.image_url
+    ).order_by(Set.id).all()
+
+    return [{
+        'id': row.id,
+        'name': row.name,
+        'description': row.description,
+        'price': row.set_price,  # Добавляем поле price
+        'set_price': row.set_price,
+        'image_url': row.image_url,
+        'is_available': True
+    } for row in rows]
+
+
+def _build_loyalty_rolls():
+    """Роллы накопительной системы вместе с данными самого ролла (один JOIN)"""
+    rows = db.session.query(
+        LoyaltyRoll.id, LoyaltyRoll.roll_id, LoyaltyRoll.is_available,
+        Roll.name, Roll.description, Roll.image_url, Roll.sale_price
+    ).join(Roll, LoyaltyRoll.roll_id == Roll.id).filter(
+        LoyaltyRoll.is_available == True
+    ).order_by(LoyaltyRoll.id).all()
+
+    return [{
+        'id': row.id,
+        'roll_id': row.roll_id,
+        'required_stamps': 10,
+        'is_available': row.is_available,
+        'roll_name': row.name,
+        'roll_description': row.description,
+        'roll_image_url': row.image_url or '',
+        'roll_price': row.sale_price
+    } for row in rows]
+
+
+_BUILDERS = {
+    'rolls': _build_rolls,
+    'sets': _build_sets,
+    'loyalty_rolls': _build_loyalty_rolls,
+}
+
+
+def get_catalog_version():
+    """Версия каталога в БД (0 - меню еще не импортировалось)"""
+    return db.session.query(CatalogVersion.version).filter(CatalogVersion.id == 1).scalar() or 0
+
+
+def get_menu_section(name):
+    """Возвращает раздел снимка меню, перестраивая его при необходимости"""
+    version = (get_catalog_version(), _version)
+    entry = _sections.get(name)
+    if entry and entry[0] == version and time.monotonic() - entry[1] < MENU_CACHE_TTL:
+        return entry[2]
+
+    with _lock:
+        # Другой поток мог уже перестроить раздел, пока мы ждали блокировку
+        version = (version[0], _version)
+        entry = _sections.get(name)
+        if entry and entry[0] == version and time.monotonic() - entry[1] < MENU_CACHE_TTL:
+            return entry[2]
+
+        data = _BUILDERS[name]()
+        _sections[name] = (version, time.monotonic(), data)
+        return data
+
+
+def invalidate_menu_cache():
+    """Сбрасывает снимок меню (например, после изменения цен)"""
+    global _version
+    with _lock:
+        _version += 1
+        _sections.clear()
+
+
+def get_menu_version():
+    """Версия каталога в БД - одна на все процессы и узлы"""
+    return get_catalog_version()
+
+
+def get_cache_ages():
+    """Возраст разделов снимка меню в секундах (None - раздел еще не построен или сброшен)"""
+    now = time.monotonic()
+    ages = {}
+    for name in _BUILDERS:
+        entry = _sections.get(name)
+        ages[name] = round(now - entry[1], 1) if entry else None
+    return ages
@@ -0,0 +1,445 @@
+import argparse
+import os
+import re
+import time
+from datetime import datetime
+
+from sqlalchemy import inspect, select, update, bindparam
+
+from models import Ingredient, Roll, RollIngredient, Set, SetRoll, LoyaltyRoll, LoyaltyCardUsage, CatalogVersion
+from csv_ingest import read_table
+from database import create_db_engine, get_engine, upsert
+
+# Импорт меню из assets/data (ingredients, rolls, sets, set_composition).
+# Строки читаются потоком через csv_ingest (без pandas) и проверяются, затем изменения применяются одной
+# транзакцией по естественному ключу (название без учета регистра):
+# новые строки вставляются, измененные обновляются пачками executemany,
+# неизменные не трогаются. Пользователи, заказы и остатки на складе не затрагиваются.
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', 'data')
+
+BATCH_SIZE = 1000
+INGREDIENT_MARKUP = 1.2  # Цена ингредиента = себестоимость + 20%
+ROLL_COST_RATIO = 0.3  # Себестоимость ролла, если в файле ее нет
+SET_COST_RATIO = 0.4  # Себестоимость сета, если в файле ее нет
+DEFAULT_AMOUNT_PER_ROLL = 0.0  # Количество ингредиента, если в рецептуре оно не указано
+
+# Названия роллов в set_composition отличаются от названий в rolls.csv
+ROLL_NAME_ALIASES = {
+    'темпура чикен маки': 'чикен маки',
+    'овощной ролл': 'овощьной ролл',
+    'мини ролл огурец': 'мини рол огурец',
+    'запеченная маки курица': 'маки курица',
+    'запеченный маки курица': 'маки курица',
+    'запечённый магистр': 'запеч магистр',
+    'запечённая фила': 'запеч фила',
+    'запеченная филадельфия': 'запеч фила',
+    'ролл нежный (запеч.)': 'запеч фила',
+    'ролл нежный': 'запеч фила',
+    'ролл запеченный нежный': 'запеч фила',
+    'унаги запечённый': 'унаги запеч',
+    'копчёная фила': 'копченная фила',
+    'фила с угрём': 'фила с угрем',
+    'филадельфия спешл': 'фила спешл',
+    'ролл чикаго': 'чикаго ролл',
+    'ролл томаго': 'саке маки',
+}
+
+# Количество в конце позиции рецептуры: "Лосось 30г", "рис: 120", "икра 2 шт"
+_RECIPE_AMOUNT_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*(?:г|гр|шт|мл)?\.?$')
+
+
+class MenuImportError(Exception):
+    """Файлы меню содержат ошибки и импорт остановлен"""
+
+
+def natural_key(name):
+    return ' '.join(str(name).split()).lower()
+
+
+# Схемы колонок для приведения типов; лишние колонки файлов (category, gross_profit...) не читаются
+SCHEMAS = {
+    'ingredients': {'name': str, 'quantity': float, 'unit': str, 'price_per_unit': float},
+    'rolls': {'name': str, 'sale_price': float, 'cost': float, 'description': str, 'ingredients': str,
+              'image_url': str, 'is_popular': bool, 'is_new': bool},
+    'sets': {'id': str, 'name': str, 'cost_price': float, 'set_price': float, 'discount_percent': float},
+    'set_composition': {'set_id': str, 'roll_name': str, 'quantity': int},
+}
+
+
+def _required(row, field):
+    if row[field] is None:
+        raise ValueError(f'не заполнено поле {field}')
+    return row[field]
+
+
+def _non_negative(row, field, default=None):
+    value = row[field]
+    if value is None:
+        return default
+    if value < 0:
+        raise ValueError(f'поле {field} не может быть отрицательным')
+    return value
+
+
+def _parse_file(data_dir, name, parse_row, report, grouped=False):
+    """Проверяет строки файла; строки с ошибками попадают в отчет и пропускаются.
+
+    Возвращает {ключ: строка}, а при grouped=True - {ключ: [строки]}.
+    """
+    parsed = {}
+    for line_no, row in read_table(data_dir, name, SCHEMAS[name]):
+        try:
+            if isinstance(row, ValueError):
+                raise row
+            item = parse_row(row)
+        except ValueError as e:
+            report['errors'].append(f'{name}: строка {line_no}: {e}')
+            continue
+        key = item.pop('_key')
+        if grouped:
+            parsed.setdefault(key, []).append(item)
+        elif key in parsed:
+            report['warnings'].append(f'{name}: строка {line_no}: дубликат "{key}" пропущен')
+        else:
+            parsed[key] = item
+    return parsed
+
+
+def _parse_ingredient(row):
+    name = _required(row, 'name')
+    cost = _non_negative(row, 'price_per_unit')
+    if cost is None:
+        raise ValueError('не заполнено поле price_per_unit')
+    return {
+        '_key': natural_key(name),
+        'name': name,
+        'cost_per_unit': cost,
+        'price_per_unit': round(cost * INGREDIENT_MARKUP, 4),
+        'unit': row['unit'] or 'шт',
+        'stock_quantity': _non_negative(row, 'quantity', default=0),
+    }
+
+
+def _parse_roll(row):
+    name = _required(row, 'name')
+    sale_price = _non_negative(row, 'sale_price')
+    if sale_price is None:
+        raise ValueError('не заполнено поле sale_price')
+    return {
+        '_key': natural_key(name),
+        'name': name,
+        'description': row['description'],
+        'sale_price': sale_price,
+        'cost_price': _non_negative(row, 'cost', default=round(sale_price * ROLL_COST_RATIO, 2)),
+        'image_url': row['image_url'],
+        'is_popular': bool(row['is_popular']),
+        'is_new': bool(row['is_new']),
+        '_recipe': parse_recipe(row['ingredients']),
+    }
+
+
+def _parse_set(row):
+    name = _required(row, 'name')
+    set_price = _non_negative(row, 'set_price')
+    if set_price is None:
+        raise ValueError('не заполнено поле set_price')
+    return {
+        '_key': natural_key(name),
+        'name': name,
+        'set_price': set_price,
+        'cost_price': _non_negative(row, 'cost_price', default=round(set_price * SET_COST_RATIO, 2)),
+        'discount_percent': _non_negative(row, 'discount_percent', default=0),
+        '_source_id': row['id'],
+    }
+
+
+def _parse_set_roll(row):
+    set_id = _required(row, 'set_id')
+    roll_key = natural_key(_required(row, 'roll_name'))
+    quantity = row['quantity'] or 1
+    if quantity < 1:
+        raise ValueError('поле quantity должно быть не меньше 1')
+    return {
+        '_key': set_id,
+        'roll_key': ROLL_NAME_ALIASES.get(roll_key, roll_key),
+        'quantity': quantity,
+    }
+
+
+def parse_recipe(text):
+    """Разбирает колонку ingredients из rolls.csv.
+
+    Возвращает [(полное название, название без количества, количество или None)]:
+    полное название нужно для ингредиентов с числом в имени ("сырный соус 350").
+    """
+    recipe = []
+    for part in (text or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        full_key = natural_key(part)
+        match = _RECIPE_AMOUNT_RE.search(part)
+        name = part[:match.start()].rstrip(' :-') if match else ''
+        if name:
+            recipe.append((full_key, natural_key(name), float(match.group(1).replace(',', '.'))))
+        else:
+            recipe.append((full_key, full_key, None))
+    return recipe
+
+
+def _batches(rows):
+    for i in range(0, len(rows), BATCH_SIZE):
+        yield rows[i:i + BATCH_SIZE]
+
+
+def _load_existing(conn, table, columns):
+    """Существующие строки таблицы по естественному ключу (первая по id при дубликатах)"""
+    existing = {}
+    for row in conn.execute(select(table.c.id, *[table.c[c] for c in columns]).order_by(table.c.id)):
+        existing.setdefault(natural_key(row.name), row._asdict())
+    return existing
+
+
+def _upsert(conn, table, parsed, columns, insert_only=(), stats=None):
+    """Вставляет новые и обновляет измененные строки; возвращает {ключ: id}"""
+    existing = _load_existing(conn, table, ['name'] + [c for c in columns if c != 'name'])
+    now = datetime.utcnow()
+
+    inserts, updates = [], []
+    for key, item in parsed.items():
+        values = {c: item[c] for c in columns}
+        current = existing.get(key)
+        if current is None:
+            values.update({c: item[c] for c in insert_only})
+            values.update(created_at=now, updated_at=now)
+            inserts.append(values)
+        elif any(current[c] != values[c] for c in columns):
+            values.update(b_id=current['id'], updated_at=now)
+            updates.append(values)
+
+    for batch in _batches(inserts):
+        conn.execute(table.insert(), batch)
+
+    if updates:
+        statement = table.update().where(table.c.id == bindparam('b_id')).values(
+            {c: bindparam(c) for c in columns + ['updated_at']}
+        )
+        for batch in _batches(updates):
+            conn.execute(statement, batch)
+
+    stats.update(inserted=len(inserts), updated=len(updates), unchanged=len(parsed) - len(inserts) - len(updates))
+
+    ids = {key: row['id'] for key, row in existing.items()}
+    if inserts:
+        ids = {key: row['id'] for key, row in _load_existing(conn, table, ['name']).items()}
+    return ids
+
+
+def _sync_links(conn, table, owner_column, target_column, value_column, owners, desired, stats):
+    """Приводит связи владельцев owners к desired = {(owner_id, target_id): value}.
+
+    value=None означает "количество не указано": новая связь получает значение
+    по умолчанию, у существующей значение не меняется.
+    """
+    existing = {}
+    for row in conn.execute(select(table.c.id, table.c[owner_column], table.c[target_column], table.c[value_column])):
+        if row[1] in owners:
+            existing.setdefault((row[1], row[2]), (row[0], row[3]))
+
+    inserts, updates = [], []
+    for pair, value in desired.items():
+        current = existing.get(pair)
+        if current is None:
+            inserts.append({owner_column: pair[0], target_column: pair[1],
+                            value_column: DEFAULT_AMOUNT_PER_ROLL if value is None else value})
+        elif value is not None and current[1] != value:
+            updates.append({'b_id': current[0], value_column: value})
+
+    deletes = [{'b_id': row_id} for pair, (row_id, _) in existing.items() if pair not in desired]
+
+    for batch in _batches(inserts):
+        conn.execute(table.insert(), batch)
+    if updates:
+        statement = table.update().where(table.c.id == bindparam('b_id')).values({value_column: bindparam(value_column)})
+        for batch in _batches(updates):
+            conn.execute(statement, batch)
+    if deletes:
+        statement = table.delete().where(table.c.id == bindparam('b_id'))
+        for batch in _batches(deletes):
+            conn.execute(statement, batch)
+
+    stats.update(inserted=len(inserts), updated=len(updates), deleted=len(deletes))
+
+
+def _prune(conn, table, keep_ids, links, stats, history=(), report=None):
+    """Удаляет строки каталога, которых больше нет в файлах, вместе со связями.
+
+    history - таблицы истории (table, колонка), которые ссылаются на строку внешним ключом
+    и не удаляются: такие строки остаются в каталоге, о них пишется предупреждение.
+    """
+    stale = [row.id for row in conn.execute(select(table.c.id)) if row.id not in keep_ids]
+    referenced = set()
+    for history_table, column in history:
+        for batch in _batches(stale):
+            referenced.update(conn.execute(select(history_table.c[column]).distinct().where(
+                history_table.c[column].in_(batch))).scalars())
+    if referenced:
+        report['warnings'].append(f'{table.name}: не удалены (есть в истории {", ".join(t.name for t, _ in history)}) '
+                                  f'id {", ".join(map(str, sorted(referenced)))}')
+        stale = [row_id for row_id in stale if row_id not in referenced]
+    for link_table, column in links:
+        statement = link_table.delete().where(link_table.c[column] == bindparam('b_id'))
+        for batch in _batches([{'b_id': row_id} for row_id in stale]):
+            conn.execute(statement, batch)
+    statement = table.delete().where(table.c.id == bindparam('b_id'))
+    for batch in _batches([{'b_id': row_id} for row_id in stale]):
+        conn.execute(statement, batch)
+    stats['deleted'] = len(stale)
+
+
+def parse_menu(data_dir=DATA_DIR):
+    """Читает и проверяет все файлы меню, не обращаясь к БД"""
+    report = {'errors': [], 'warnings': [], 'tables': {}}
+    menu = {
+        'ingredients': _parse_file(data_dir, 'ingredients', _parse_ingredient, report),
+        'rolls': _parse_file(data_dir, 'rolls', _parse_roll, report),
+        'sets': _parse_file(data_dir, 'sets', _parse_set, report),
+        'set_composition': _parse_file(data_dir, 'set_composition', _parse_set_roll, report, grouped=True),
+    }
+    return menu, report
+
+
+def apply_menu(conn, menu, report, prune=False):
+    """Применяет разобранное меню в рамках уже открытой транзакции conn"""
+    tables = report['tables']
+    for name in ('ingredients', 'rolls', 'roll_ingredients', 'sets', 'set_rolls'):
+        tables[name] = {}
+
+    ingredient_ids = _upsert(
+        conn, Ingredient.__table__, menu['ingredients'],
+        ['name', 'cost_per_unit', 'price_per_unit', 'unit'],
+        insert_only=['stock_quantity'],  # Остатки на складе ведутся в приложении, импорт их не сбрасывает
+        stats=tables['ingredients']
+    )
+    roll_ids = _upsert(
+        conn, Roll.__table__, menu['rolls'],
+        ['name', 'description', 'cost_price', 'sale_price', 'image_url', 'is_popular', 'is_new'],
+        stats=tables['rolls']
+    )
+    set_ids = _upsert(
+        conn, Set.__table__, menu['sets'],
+        ['name', 'cost_price', 'set_price', 'discount_percent'],
+        stats=tables['sets']
+    )
+
+    # Рецептуры из колонки ingredients в rolls.csv
+    recipes = {}
+    for key, roll in menu['rolls'].items():
+        for full_key, ingredient_key, amount in roll['_recipe']:
+            if full_key in ingredient_ids:
+                ingredient_key, amount = full_key, None
+            ingredient_id = ingredient_ids.get(ingredient_key)
+            if ingredient_id is None:
+                report['warnings'].append(f'rolls: "{roll["name"]}": ингредиент "{ingredient_key}" не найден в справочнике')
+                continue
+            recipes[(roll_ids[key], ingredient_id)] = amount
+    _sync_links(conn, RollIngredient.__table__, 'roll_id', 'ingredient_id', 'amount_per_roll',
+                {roll_ids[key] for key in menu['rolls']}, recipes, tables['roll_ingredients'])
+
+    # Составы сетов: set_id в set_composition - это id строки в sets.csv
+    set_keys_by_source_id = {item['_source_id']: key for key, item in menu['sets'].items() if item['_source_id']}
+    compositions = {}
+    for source_id, items in menu['set_composition'].items():
+        set_key = set_keys_by_source_id.get(source_id)
+        if set_key is None:
+            report['warnings'].append(f'set_composition: сет с id {source_id} не найден в sets')
+            continue
+        for item in items:
+            roll_id = roll_ids.get(item['roll_key'])
+            if roll_id is None:
+                report['warnings'].append(f'set_composition: ролл "{item["roll_key"]}" не найден в rolls')
+                continue
+            pair = (set_ids[set_key], roll_id)
+            compositions[pair] = compositions.get(pair, 0) + item['quantity']
+    _sync_links(conn, SetRoll.__table__, 'set_id', 'roll_id', 'quantity',
+                {set_ids[key] for key in set_keys_by_source_id.values()}, compositions, tables['set_rolls'])
+
+    if prune:
+        loyalty = [(LoyaltyRoll.__table__, 'roll_id')] if inspect(conn).has_table('loyalty_rolls') else []
+        # Выданные по накопительной карте роллы остаются: история ссылается на них внешним ключом
+        usage = [(LoyaltyCardUsage.__table__, 'roll_id')] if inspect(conn).has_table('loyalty_card_usage') else []
+        _prune(conn, Roll.__table__, {roll_ids[key] for key in menu['rolls']},
+               [(RollIngredient.__table__, 'roll_id'), (SetRoll.__table__, 'roll_id')] + loyalty, tables['rolls'],
+               history=usage, report=report)
+        _prune(conn, Set.__table__, {set_ids[key] for key in menu['sets']},
+               [(SetRoll.__table__, 'set_id')], tables['sets'])
+        _prune(conn, Ingredient.__table__, {ingredient_ids[key] for key in menu['ingredients']},
+               [(RollIngredient.__table__, 'ingredient_id')], tables['ingredients'])
+
+    return report
+
+
+def has_changes(report):
+    """Импорт что-то вставил, изменил или удалил"""
+    return any(stats.get(key) for stats in report['tables'].values() for key in ('inserted', 'updated', 'deleted'))
+
+
+def bump_catalog_version(conn):
+    """Увеличивает версию каталога в транзакции conn: снимки меню во всех процессах перестроятся"""
+    table = CatalogVersion.__table__
+    bumped = conn.execute(update(table).where(table.c.id == 1).values(
+        version=table.c.version + 1, updated_at=datetime.utcnow())).rowcount
+    if not bumped:  # БД создана без миграций (create_all) - строки версии еще нет
+        upsert(conn, table, [{'id': 1, 'version': 1, 'updated_at': datetime.utcnow()}], ['id'])
+
+
+def import_menu(engine, data_dir=DATA_DIR, prune=False, dry_run=False, strict=False):
+    """Полный импорт меню одной транзакцией. Возвращает отчет с количеством изменений"""
+    menu, report = parse_menu(data_dir)
+    if strict and report['errors']:
+        raise MenuImportError('; '.join(report['errors']))
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            apply_menu(conn, menu, report, prune=prune)
+            if has_changes(report):
+                bump_catalog_version(conn)
+            if dry_run:
+                transaction.rollback()
+            else:
+                transaction.commit()
+        except Exception:
+            transaction.rollback()
+            raise
+
+    return report
+
+
+def print_report(report):
+    for name, stats in report['tables'].items():
+        print(f"   {name}: " + ', '.join(f'{k}={v}' for k, v in stats.items()))
+    for warning in report['warnings'][:20]:
+        print(f"⚠️ {warning}")
+    if len(report['warnings']) > 20:
+        print(f"⚠️ ... и еще {len(report['warnings']) - 20} предупреждений")
+    for error in report['errors']:
+        print(f"❌ {error}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Импорт меню из assets/data в БД')
+    parser.add_argument('--db', help='Путь к файлу SQLite (по умолчанию - БД из config.py / DATABASE_URL)')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='Каталог с CSV/XLSX файлами меню')
+    parser.add_argument('--prune', action='store_true', help='Удалить позиции, которых нет в файлах')
+    parser.add_argument('--dry-run', action='store_true', help='Проверить и посчитать изменения без записи')
+    parser.add_argument('--strict', action='store_true', help='Не импортировать, если в файлах есть ошибки')
+    args = parser.parse_args()
+
+    engine = create_db_engine(f'sqlite:///{args.db}') if args.db else get_engine()
+    started = time.perf_counter()
+    result = import_menu(engine, args.data_dir,
+                         prune=args.prune, dry_run=args.dry_run, strict=args.strict)
+    print(f"{'🔍 Проверка' if args.dry_run else '✅ Импорт'} меню завершен за {time.perf_counter() - started:.2f} с")
+    print_report(result)
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+from models import db
+from menu_cache import get_menu_section, invalidate_menu_cache, get_menu_version
+from menu_import import DATA_DIR, import_menu, has_changes
+from csv_ingest import find_table
+
+# Горячая перезагрузка меню без перезапуска сервера.
+# Файлы разбираются и проверяются до записи, затем изменения применяются
+# одной короткой транзакцией (читатели до commit видят старое меню),
+# после чего сбрасывается только снимок меню и сразу строится заново.
+# Таблицы не подменяются целиком: id роллов и сетов должны сохраниться,
+# на них ссылаются заказы, сеты и накопительная система.
+
+MENU_TABLES = ('ingredients', 'rolls', 'sets', 'set_composition')
+
+_reload_lock = threading.Lock()
+_last_reload = {'at': None, 'report': None, 'menu_version': None}
+
+
+class MenuReloadInProgress(Exception):
+    """Перезагрузка меню уже выполняется"""
+
+
+def is_reload_in_progress():
+    return _reload_lock.locked()
+
+
+def get_last_reload():
+    return dict(_last_reload)
+
+
+def reload_menu(data_dir=DATA_DIR, prune=False, dry_run=False, strict=True):
+    """Импортирует меню из файлов и публикует новую версию каталога"""
+    if not _reload_lock.acquire(blocking=False):
+        raise MenuReloadInProgress('Перезагрузка меню уже выполняется')
+
+    try:
+        report = import_menu(db.engine, data_dir, prune=prune, dry_run=dry_run, strict=strict)
+
+        if not dry_run:
+            if has_changes(report):  # Файлы без изменений - версия каталога та же, снимок не трогаем
+                invalidate_menu_cache()
+                # Прогреваем снимок, чтобы первые запросы после перезагрузки не строили его сами
+                for section in ('rolls', 'sets'):
+                    get_menu_section(section)
+                db.session.remove()
+
+            _last_reload.update(at=datetime.utcnow(), report=report, menu_version=get_menu_version())
+
+        return report
+    finally:
+        _reload_lock.release()
+
+
+def _files_state(data_dir):
+    state = {}
+    for name in MENU_TABLES:
+        path = find_table(data_dir, name)
+        if path:
+            state[path] = os.path.getmtime(path)
+    return state
+
+
+def start_menu_watcher(app, data_dir=DATA_DIR, interval=5):
+    """Следит за файлами меню и перезагружает его при изменении (фоновый поток)"""
+    def run():
+        state = _files_state(data_dir)
+        while True:
+            time.sleep(interval)
+            current = _files_state(data_dir)
+            if current == state:
+                continue
+            state = current
+            with app.app_context():
+                try:
+                    report = reload_menu(data_dir)
+                    print(f"🔄 Меню перезагружено: {report['tables']}")
+                except Exception as e:
+                    print(f"❌ Ошибка перезагрузки меню: {e}")
+
+    thread = threading.Thread(target=run, name='menu-watcher', daemon=True)
+    thread.start()
+    return thread
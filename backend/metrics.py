@@ -0,0 +1,412 @@
+import bisect
+import json
+import os
+import threading
+import time
+import weakref
+
+try:
+    import fcntl
+except ImportError:  # Windows: снимки завершившихся процессов не сворачиваем
+    fcntl = None
+
+from flask import g, request
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from config import METRICS_DIR, METRICS_FLUSH_INTERVAL
+
+# Метрики в формате Prometheus (GET /metrics): задержки по маршрутам, запросы
+# в обработке, пул соединений БД, блокировки БД, заказы и размер корзины.
+# Счетчики - обычные числа в памяти процесса под одной блокировкой, без
+# внешних зависимостей.
+# Несколько процессов (gunicorn -w N) каждый держит свои счетчики. Если задан
+# METRICS_DIR, процесс раз в METRICS_FLUSH_INTERVAL секунд и при каждом
+# запросе /metrics записывает свой снимок в METRICS_DIR/metrics-<pid>.json,
+# а /metrics складывает снимки всех процессов: счетчики и гистограммы
+# суммируются (в том числе завершившихся воркеров - счетчики не убывают),
+# показатели (gauge) - только по живым процессам. Снимки завершившихся
+# процессов /metrics сворачивает в один файл metrics-retired.json и удаляет:
+# каталог не растет с перезапусками воркеров.
+# Без METRICS_DIR /metrics показывает только процесс, который ответил.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+POOL_CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+CART_SIZE_BUCKETS = (1, 2, 3, 5, 8, 13, 20, 50)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+RETIRED_SNAPSHOT = 'metrics-retired.json'  # Сумма счетчиков и гистограмм завершившихся процессов
+
+_lock = threading.Lock()
+_registry = {}  # имя -> метрика, в порядке объявления
+_pools = weakref.WeakSet()
+_flusher_pid = None
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}  # значения меток -> значение
+        _registry[name] = self
+
+    def collect(self):
+        """Значения для снимка: {значения меток: значение}"""
+        with _lock:
+            return {key: list(value) if isinstance(value, list) else value for key, value in self.values.items()}
+
+
+class Counter(_Metric):
+    """Только растет: число событий"""
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        with _lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+
+class Gauge(_Metric):
+    """Текущее значение. collect_func() - вычислить значения в момент снимка"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), collect_func=None):
+        super().__init__(name, documentation, labels)
+        self.collect_func = collect_func
+
+    def inc(self, *label_values, amount=1):
+        with _lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def collect(self):
+        if self.collect_func is not None:
+            return self.collect_func()
+        return super().collect()
+
+
+class Histogram(_Metric):
+    """Распределение: число наблюдений по корзинам, сумма и количество"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            series = self.values.get(label_values)
+            if series is None:
+                # Наблюдения по корзинам (последняя - +Inf), затем сумма
+                series = self.values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+
+HTTP_REQUESTS = Counter('http_requests_total', 'HTTP-запросы', ('method', 'route', 'status'))
+HTTP_LATENCY = Histogram('http_request_duration_seconds', 'Время обработки HTTP-запроса', ('method', 'route'))
+HTTP_IN_FLIGHT = Gauge('http_requests_in_flight', 'HTTP-запросы в обработке')
+DB_POOL_CHECKOUT = Histogram('db_pool_checkout_seconds', 'Ожидание соединения из пула БД', ('pool',),
+                             buckets=POOL_CHECKOUT_BUCKETS)
+DB_POOL_TIMEOUTS = Counter('db_pool_timeouts_total', 'Соединение из пула БД не получено за DB_POOL_TIMEOUT', ('pool',))
+DB_LOCK_ERRORS = Counter('db_lock_errors_total',
+                         'Блокировки БД, не дождавшиеся снятия (SQLite: database is locked после busy_timeout, '
+                         'PostgreSQL: deadlock, lock timeout)', ('database',))
+ORDERS = Counter('orders_by_status_total', 'Заказы по статусам: созданные и переведенные в статус', ('status',))
+CART_SIZE = Histogram('cart_size_items', 'Позиций в корзине при оформлении заказа', buckets=CART_SIZE_BUCKETS)
+
+
+def _collect_pools():
+    values = {}
+    for pool in list(_pools):
+        name = getattr(pool, 'metrics_name', 'default')
+        values[(name, 'checked_out')] = values.get((name, 'checked_out'), 0) + pool.checkedout()
+        values[(name, 'idle')] = values.get((name, 'idle'), 0) + pool.checkedin()
+        values[(name, 'overflow')] = values.get((name, 'overflow'), 0) + max(pool.overflow(), 0)
+    return values
+
+
+DB_POOL_CONNECTIONS = Gauge('db_pool_connections', 'Соединения пула БД по состоянию', ('pool', 'state'),
+                            collect_func=_collect_pools)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, замеряющий ожидание соединения (пул исчерпан - ждем, пока другой поток вернет соединение)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _pools.add(self)
+
+    def recreate(self):
+        # engine.dispose() заменяет пул новым - имя для метрик переносим
+        pool = super().recreate()
+        if hasattr(self, 'metrics_name'):
+            pool.metrics_name = self.metrics_name
+        return pool
+
+    def connect(self):
+        name = getattr(self, 'metrics_name', 'default')
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc(name)
+            raise
+        finally:
+            DB_POOL_CHECKOUT.observe(time.perf_counter() - started, name)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _count_lock_errors(context):
+    error = context.original_exception
+    message = str(error).lower()
+    if 'database is locked' in message or getattr(error, 'pgcode', None) in ('40P01', '55P03'):
+        DB_LOCK_ERRORS.inc(context.engine.dialect.name if context.engine is not None else 'unknown')
+
+
+def _reset_after_fork():
+    # Воркер gunicorn (--preload) не наследует счетчики мастер-процесса
+    global _lock, _flusher_pid
+    _lock = threading.Lock()
+    _flusher_pid = None
+    for metric in _registry.values():
+        metric.values = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# ===== Снимки процессов и формат Prometheus =====
+
+def snapshot():
+    """Значения всех метрик этого процесса"""
+    return {
+        'pid': os.getpid(),
+        'time': time.time(),
+        'metrics': {name: [[list(key), value] for key, value in metric.collect().items()]
+                    for name, metric in _registry.items()},
+    }
+
+
+def _write_snapshot(path, data):
+    """Атомарная запись - читатель не увидит половину файла"""
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+
+
+def flush():
+    """Записывает снимок процесса в METRICS_DIR"""
+    if not METRICS_DIR:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    _write_snapshot(os.path.join(METRICS_DIR, f'metrics-{os.getpid()}.json'), snapshot())
+
+
+def _process_alive(pid):
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _load_snapshot(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # Файл удален или перезаписывается
+
+
+def _process_snapshots():
+    """Снимки процессов из METRICS_DIR: [(путь, данные)], без metrics-retired.json"""
+    snapshots = []
+    for filename in os.listdir(METRICS_DIR):
+        if filename == RETIRED_SNAPSHOT or not (filename.startswith('metrics-') and filename.endswith('.json')):
+            continue
+        path = os.path.join(METRICS_DIR, filename)
+        data = _load_snapshot(path)
+        if data is not None:
+            snapshots.append((path, data))
+    return snapshots
+
+
+def _retire_dead_snapshots():
+    """Сворачивает снимки завершившихся процессов в metrics-retired.json и удаляет их.
+
+    Сворачивает один процесс узла (блокировка файла), остальные в это время читают
+    снимки как есть. В metrics-retired.json записывается, какие снимки уже учтены:
+    если процесс упадет между записью суммы и удалением файлов, снимки не посчитаются дважды.
+    """
+    if fcntl is None:
+        return
+    with open(os.path.join(METRICS_DIR, '.retire.lock'), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return  # Сворачивает другой процесс
+        dead = [(path, data) for path, data in _process_snapshots()
+                if data.get('pid') != os.getpid() and not _process_alive(data['pid'])]
+        if not dead:
+            return
+
+        retired_path = os.path.join(METRICS_DIR, RETIRED_SNAPSHOT)
+        retired = _load_snapshot(retired_path) or {'metrics': {}, 'folded': []}
+        folded = {tuple(entry) for entry in retired.get('folded', [])}
+        fresh = [data for _, data in dead if (data['pid'], data['time']) not in folded]
+        # merge пропускает показатели (gauge) завершившихся процессов - в сумму попадают только счетчики
+        totals = merge([{'pid': os.getpid(), 'metrics': retired['metrics']}] + fresh)
+        _write_snapshot(retired_path, {
+            'time': time.time(),
+            'metrics': {name: [[list(key), value] for key, value in values.items()] for name, values in totals.items()},
+            'folded': [[data['pid'], data['time']] for _, data in dead],
+        })
+        for path, _ in dead:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _read_snapshots():
+    own = snapshot()
+    snapshots = [own]
+    if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+        return snapshots
+    _retire_dead_snapshots()
+
+    retired = _load_snapshot(os.path.join(METRICS_DIR, RETIRED_SNAPSHOT))
+    folded = set()
+    if retired is not None:
+        folded = {tuple(entry) for entry in retired.get('folded', [])}
+        snapshots.append({'pid': own['pid'], 'metrics': retired['metrics']})  # Без показателей, только суммы
+    for _, data in _process_snapshots():
+        if data.get('pid') != own['pid'] and (data.get('pid'), data.get('time')) not in folded:
+            snapshots.append(data)
+    return snapshots
+
+
+def merge(snapshots):
+    """Сумма снимков процессов: {имя метрики: {значения меток: значение}}"""
+    merged = {name: {} for name in _registry}
+    for data in snapshots:
+        alive = None
+        for name, samples in data.get('metrics', {}).items():
+            metric = _registry.get(name)
+            if metric is None:
+                continue
+            if metric.kind == 'gauge':
+                if alive is None:
+                    alive = data['pid'] == os.getpid() or _process_alive(data['pid'])
+                if not alive:
+                    continue
+            values = merged[name]
+            for key, value in samples:
+                key = tuple(key)
+                if isinstance(value, list):
+                    current = values.get(key)
+                    values[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    values[key] = values.get(key, 0) + value
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value) if value != int(value) else str(int(value))
+    return str(value)
+
+
+def render(merged):
+    """Текстовый формат Prometheus 0.0.4"""
+    lines = []
+    for name, metric in _registry.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(merged[name].items()):
+            if metric.kind != 'histogram':
+                lines.append(f'{name}{_labels(metric.labels, key)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                le = bound if isinstance(bound, str) else _number(float(bound))
+                lines.append(f'{name}_bucket{_labels(metric.labels, key, [("le", le)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(metric.labels, key)} {_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(metric.labels, key)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def render_all():
+    """Метрики всех процессов (см. METRICS_DIR) в формате Prometheus"""
+    flush()
+    return render(merge(_read_snapshots()))
+
+
+def _start_flusher():
+    """Периодическая запись снимка - в каждом воркере свой поток (потоки не переживают fork)"""
+    global _flusher_pid
+    if not METRICS_DIR or _flusher_pid == os.getpid():
+        return
+    _flusher_pid = os.getpid()
+
+    def loop():
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                flush()
+            except OSError as e:
+                print(f'❌ Ошибка записи метрик: {e}')
+
+    threading.Thread(target=loop, name='metrics-flush', daemon=True).start()
+
+
+# ===== Подключение к приложению =====
+
+def init_metrics(app, db):
+    """Метрики HTTP-запросов и имена пулов (основной, реплика) для метрик пула"""
+    with app.app_context():
+        for key, engine in db.engines.items():
+            engine.pool.metrics_name = key or 'primary'
+
+    @app.before_request
+    def _start_request_metrics():
+        _start_flusher()
+        g.metrics_started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        started = g.get('metrics_started')
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+            HTTP_LATENCY.observe(time.perf_counter() - started, request.method, route)
+            HTTP_REQUESTS.inc(request.method, route, str(response.status_code))
+        return response
+
+    @app.teardown_request
+    def _finish_request_metrics(error=None):
+        if g.pop('metrics_started', None) is not None:
+            HTTP_IN_FLIGHT.dec()
@@ -0,0 +1,495 @@
+import argparse
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import (inspect, text, select, bindparam, MetaData, Table, Column,
+                        Integer, String, DateTime, Float, Boolean, Text)
+
+from database import create_db_engine, get_engine, upsert
+import schema_v1
+from menu_import import ROLL_COST_RATIO, SET_COST_RATIO, INGREDIENT_MARKUP
+
+# Версионированные миграции схемы вместо разовых скриптов add_*/fix_*.
+# Примененные версии записываются в таблицу schema_version, каждая миграция
+# идемпотентна (повторный запуск после сбоя безопасен).
+# Правило для больших таблиц: никаких долгих транзакций. Колонки добавляются
+# через ADD COLUMN (в SQLite это изменение только схемы, без перезаписи таблицы),
+# а заполнение данных идет пачками по диапазонам id - каждая пачка отдельной
+# короткой транзакцией, так что оформление заказов ждет не дольше одной пачки.
+# Миграции не читают models.py: таблицы версии 1 заморожены в schema_v1.py, а все,
+# что появилось позже (колонки, индексы, таблицы), добавляется явным DDL в своей миграции.
+# Новая миграция добавляется в конец MIGRATIONS со следующим номером, вместе с правкой
+# models.py; database.verify_schema сверяет результат с моделями.
+
+BACKFILL_BATCH_SIZE = 500
+BACKFILL_PAUSE = 0.01  # Пауза между пачками (секунды), чтобы писатели успевали взять блокировку
+
+# Старые таблицы из init_database.py: откуда брать значения колонок моделей (SQL-выражения по старым колонкам)
+LEGACY_SOURCES = {
+    'rolls': {
+        'sale_price': 'price',
+        'cost_price': f'ROUND(price * {ROLL_COST_RATIO}, 2)',
+    },
+    'sets': {
+        'set_price': 'price',
+        'cost_price': f'ROUND(price * {SET_COST_RATIO}, 2)',
+    },
+    'ingredients': {
+        'stock_quantity': 'current_stock',
+        'price_per_unit': f'ROUND(COALESCE(cost_per_unit, 0) * {INGREDIENT_MARKUP}, 2)',
+        'updated_at': 'last_updated',
+    },
+    'orders': {
+        'phone': 'user_phone',
+        'total_price': 'total_amount',
+        'comment': 'notes',
+        'payment_method': "'cash'",
+    },
+    'order_items': {
+        'unit_price': 'price',
+    },
+}
+
+schema_version = Table(
+    'schema_version', MetaData(),
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+    Column('duration_ms', Integer),
+)
+
+# Таблица миграции 7 в том виде, в каком миграция ее создает
+catalog_version = Table(
+    'catalog_version', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False, default=0),
+    Column('updated_at', DateTime),
+)
+
+# Индексы миграции 6 (внешние ключи и колонки фильтров): имя, таблица, колонки
+DECLARED_INDEXES = (
+    ('ix_roll_ingredients_roll_id', 'roll_ingredients', ('roll_id',)),
+    ('ix_roll_ingredients_ingredient_id', 'roll_ingredients', ('ingredient_id',)),
+    ('ix_set_rolls_set_id', 'set_rolls', ('set_id',)),
+    ('ix_set_rolls_roll_id', 'set_rolls', ('roll_id',)),
+    ('ix_orders_created_at', 'orders', ('created_at',)),
+    ('ix_orders_user_id_created_at', 'orders', ('user_id', 'created_at')),
+    ('ix_order_items_order_id', 'order_items', ('order_id',)),
+    ('ix_loyalty_cards_user_id', 'loyalty_cards', ('user_id',)),
+    ('ix_loyalty_rolls_roll_id', 'loyalty_rolls', ('roll_id',)),
+    ('ix_loyalty_card_usage_loyalty_card_id', 'loyalty_card_usage', ('loyalty_card_id',)),
+    ('ix_loyalty_card_usage_roll_id', 'loyalty_card_usage', ('roll_id',)),
+    ('ix_loyalty_card_usage_order_id', 'loyalty_card_usage', ('order_id',)),
+    ('ix_loyalty_card_usage_user_id_used_at', 'loyalty_card_usage', ('user_id', 'used_at')),
+    ('ix_referral_codes_user_id', 'referral_codes', ('user_id',)),
+    ('ix_referral_usage_referrer_id_created_at', 'referral_usage', ('referrer_id', 'created_at')),
+    ('ix_points_ledger_order_id', 'points_ledger', ('order_id',)),
+)
+
+_migration_lock = threading.Lock()
+
+# Ключ pg_advisory_lock: при одновременном старте нескольких узлов миграции выполняет один
+PG_MIGRATION_LOCK_ID = 3401
+
+
+class MigrationError(Exception):
+    """Миграцию нельзя применить к этой БД"""
+
+
+def is_migration_running(engine=None):
+    """Миграции выполняются в этом процессе или, для PostgreSQL (если передан engine), на любом узле"""
+    if _migration_lock.locked():
+        return True
+    if engine is None or engine.dialect.name != 'postgresql':
+        return False
+    # pg_advisory_lock(bigint) виден в pg_locks как classid = старшие 32 бита, objid = младшие, objsubid = 1
+    with engine.connect() as conn:
+        return bool(conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND granted "
+            "AND classid = 0 AND objid = :key AND objsubid = 1)"
+        ), {'key': PG_MIGRATION_LOCK_ID}).scalar())
+
+
+def run_in_batches(engine, table, sql, batch_size=BACKFILL_BATCH_SIZE, params=None):
+    """Выполняет sql (с параметрами :low и :high) по диапазонам id таблицы.
+
+    Каждая пачка - отдельная транзакция. Строки, добавленные после старта,
+    пишет уже новый код приложения, поэтому верхняя граница берется один раз.
+    Возвращает общее количество затронутых строк.
+    """
+    with engine.connect() as conn:
+        max_id = conn.execute(text(f'SELECT MAX(id) FROM {table}')).scalar() or 0
+
+    affected = 0
+    for low in range(0, max_id, batch_size):
+        with engine.begin() as conn:
+            result = conn.execute(text(sql), {**(params or {}), 'low': low, 'high': low + batch_size})
+            affected += max(result.rowcount, 0)
+        time.sleep(BACKFILL_PAUSE)
+    return affected
+
+
+def backfill(engine, table, assignments, where=None, batch_size=BACKFILL_BATCH_SIZE):
+    """UPDATE table SET assignments [WHERE where] пачками по id"""
+    condition = f' AND ({where})' if where else ''
+    return run_in_batches(
+        engine, table,
+        f'UPDATE {table} SET {assignments} WHERE id > :low AND id <= :high{condition}',
+        batch_size
+    )
+
+
+def _literal(value):
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'  # Понимают и SQLite, и PostgreSQL
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _scalar_default(column):
+    if column.default is not None and column.default.is_scalar:
+        return _literal(column.default.arg)
+    return None
+
+
+def _fallback(column):
+    """Значение для NOT NULL колонки, если в старой строке его нет"""
+    default = _scalar_default(column)
+    if default is not None:
+        return default
+    if isinstance(column.type, (String, Text)):
+        return "''"
+    if isinstance(column.type, Boolean):
+        return 'FALSE'
+    if isinstance(column.type, (Integer, Float)):
+        return '0'
+    if isinstance(column.type, DateTime):
+        return 'CURRENT_TIMESTAMP'
+    return 'NULL'
+
+
+def _column_ddl(column, dialect, for_add=False):
+    ddl = f'{column.name} {column.type.compile(dialect=dialect)}'
+    if column.primary_key:
+        return ddl + ' PRIMARY KEY'
+    # ADD COLUMN не может добавить NOT NULL без значения по умолчанию - такие колонки заполняет backfill
+    if not column.nullable and not for_add:
+        ddl += ' NOT NULL'
+    if column.unique and not for_add:
+        ddl += ' UNIQUE'
+    default = _scalar_default(column)
+    if default is not None:
+        ddl += f' DEFAULT {default}'
+    for fk in column.foreign_keys:
+        target_table, target_column = fk.target_fullname.split('.')
+        ddl += f' REFERENCES {target_table} ({target_column})'
+    return ddl
+
+
+def _needs_rebuild(table, existing):
+    """Старая таблица мешает вставке через модели: лишняя NOT NULL колонка без значения по умолчанию"""
+    return any(
+        column['name'] not in table.c and not column['nullable'] and column['default'] is None
+        and not column.get('primary_key')
+        for column in existing
+    )
+
+
+def _source_available(source, names):
+    """Выражение можно вычислить: все упомянутые в нем колонки есть в таблице"""
+    identifiers = set(re.findall(r"'[^']*'|([a-z_]+)(?!\s*\()", source)) - {'', 'NULL'}
+    return identifiers <= names
+
+
+def _add_missing_columns(engine, table, existing, batch_size):
+    names = {column['name'] for column in existing}
+    added = []
+    for column in table.columns:
+        if column.name in names:
+            continue
+        with engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {_column_ddl(column, engine.dialect, for_add=True)}'))
+        added.append(column.name)
+
+    # Обязательные колонки получают значение из старых колонок или безопасное значение по умолчанию
+    sources = LEGACY_SOURCES.get(table.name, {})
+    for name in added:
+        column = table.c[name]
+        source = sources.get(name)
+        if source and _source_available(source, names):
+            backfill(engine, table.name, f'{name} = {source}', f'{name} IS NULL', batch_size)
+        elif not column.nullable:
+            backfill(engine, table.name, f'{name} = {_fallback(column)}', f'{name} IS NULL', batch_size)
+    return added
+
+
+def _rebuild_table(engine, table, existing, batch_size):
+    """Перестраивает старую таблицу по модели без остановки записи.
+
+    Новая таблица создается рядом, триггеры на старой повторяют в ней все
+    изменения, строки копируются пачками, затем таблицы меняются местами одной
+    короткой транзакцией. Старые колонки, которых нет в модели, сохраняются
+    как необязательные - данные не теряются.
+    """
+    if engine.dialect.name != 'sqlite':
+        raise MigrationError(f'Перестройка таблицы {table.name} поддерживается только для SQLite')
+
+    name = table.name
+    temp = f'{name}__migrating'
+    existing_names = {column['name'] for column in existing}
+    sources = LEGACY_SOURCES.get(name, {})
+    legacy = [column for column in existing if column['name'] not in table.c]
+
+    definitions = [_column_ddl(column, engine.dialect) for column in table.columns]
+    expressions = []
+    for column in table.columns:
+        if column.name in existing_names:
+            expression = column.name
+        else:
+            source = sources.get(column.name)
+            expression = source if source and _source_available(source, existing_names) else 'NULL'
+        if not column.nullable and not column.primary_key:
+            expression = f'COALESCE({expression}, {_fallback(column)})'
+        expressions.append(expression)
+    for column in legacy:
+        definitions.append(f"{column['name']} {column['type'].compile(dialect=engine.dialect)}")
+        expressions.append(column['name'])
+
+    column_list = ', '.join([column.name for column in table.columns] + [column['name'] for column in legacy])
+    select_sql = f"SELECT {', '.join(expressions)} FROM {name}"
+    triggers = [f'{temp}_insert', f'{temp}_update', f'{temp}_delete']
+
+    with engine.begin() as conn:
+        # Остатки прерванного запуска
+        for trigger in triggers:
+            conn.execute(text(f'DROP TRIGGER IF EXISTS {trigger}'))
+        conn.execute(text(f'DROP TABLE IF EXISTS {temp}'))
+
+        conn.execute(text(f"CREATE TABLE {temp} ({', '.join(definitions)})"))
+        for trigger, event in zip(triggers, ('INSERT', 'UPDATE')):
+            conn.execute(text(
+                f'CREATE TRIGGER {trigger} AFTER {event} ON {name} BEGIN '
+                f'INSERT OR REPLACE INTO {temp} ({column_list}) {select_sql} WHERE id = NEW.id; END'
+            ))
+        conn.execute(text(
+            f'CREATE TRIGGER {triggers[2]} AFTER DELETE ON {name} BEGIN '
+            f'DELETE FROM {temp} WHERE id = OLD.id; END'
+        ))
+
+    # Строки, уже переписанные триггером, не перезаписываются (OR IGNORE)
+    copied = run_in_batches(
+        engine, name,
+        f'INSERT OR IGNORE INTO {temp} ({column_list}) {select_sql} WHERE id > :low AND id <= :high',
+        batch_size
+    )
+
+    with engine.begin() as conn:
+        for trigger in triggers:
+            conn.execute(text(f'DROP TRIGGER IF EXISTS {trigger}'))
+        conn.execute(text(f'DROP TABLE {name}'))
+        conn.execute(text(f'ALTER TABLE {temp} RENAME TO {name}'))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+    return copied
+
+
+# --- Миграции ---
+
+def _create_missing_tables(engine, batch_size):
+    schema_v1.metadata.create_all(engine, checkfirst=True)
+
+
+def _align_tables_with_models(engine, batch_size):
+    """Приводит существующие таблицы к схеме версии 1 (заменяет add_new_fields_safely, fix_*_price_column и т.п.)"""
+    inspector = inspect(engine)
+    for table in schema_v1.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = inspector.get_columns(table.name)
+        if _needs_rebuild(table, existing):
+            copied = _rebuild_table(engine, table, existing, batch_size)
+            print(f"   🔁 {table.name}: таблица перестроена по модели, перенесено {copied} строк")
+        else:
+            added = _add_missing_columns(engine, table, existing, batch_size)
+            if added:
+                print(f"   ➕ {table.name}: добавлены колонки {', '.join(added)}")
+
+
+def _backfill_referral_counters(engine, batch_size):
+    # Пересчет из referral_usage идемпотентен: счетчик и строка приглашения меняются в одной транзакции
+    updated = backfill(engine, 'users', '''
+        referrals_count = (SELECT COUNT(*) FROM referral_usage ru WHERE ru.referrer_id = users.id),
+        referral_bonus_earned = (SELECT COALESCE(SUM(ru.bonus_points_awarded), 0)
+                                 FROM referral_usage ru WHERE ru.referrer_id = users.id)
+    ''', batch_size=batch_size)
+    print(f"   👥 Счетчики рефералов пересчитаны для {updated} пользователей")
+
+
+def _is_unique(inspector, table, columns):
+    """Уникальность колонок уже обеспечена ограничением UNIQUE или уникальным индексом"""
+    columns = list(columns)
+    constraints = inspector.get_unique_constraints(table)
+    indexes = [index for index in inspector.get_indexes(table) if index['unique']]
+    return any(item['column_names'] == columns for item in constraints + indexes)
+
+
+def _unique_referral_code_index(engine, batch_size):
+    # В старых БД индекса нет, а выдача кодов (referrals.assign_referral_code) на него полагается.
+    # В новой БД колонку уже защищает UNIQUE из схемы версии 1 - второй индекс не нужен.
+    # Повторяющийся код остается у пользователя с наименьшим id, у остальных (и пустые коды)
+    # сбрасывается в NULL - новый код им выдается при следующем GET /api/referral/my-code
+    if _is_unique(inspect(engine), 'users', ['referral_code']):
+        return
+    with engine.begin() as conn:
+        cleared = conn.execute(text('''
+            SELECT u.id FROM users u
+            WHERE u.referral_code = ''
+               OR EXISTS (SELECT 1 FROM users earlier
+                          WHERE earlier.referral_code = u.referral_code AND earlier.id < u.id)
+            ORDER BY u.id
+        ''')).scalars().all()
+        if cleared:
+            conn.execute(text('UPDATE users SET referral_code = NULL WHERE id IN :ids').bindparams(
+                bindparam('ids', expanding=True)), {'ids': cleared})
+            shown = ', '.join(str(user_id) for user_id in cleared[:20]) + (' ...' if len(cleared) > 20 else '')
+            print(f"   ⚠️ Повторяющиеся реферальные коды сброшены у {len(cleared)} пользователей: {shown}")
+        conn.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ix_users_referral_code ON users (referral_code)'))
+
+
+def _points_ledger_opening_balances(engine, batch_size):
+    # Начальные остатки нужны, чтобы сумма журнала совпадала с балансом пользователя.
+    # Пишутся только тем, у кого еще нет ни одной записи этого типа баллов.
+    for points_type, column in (('bonus', 'bonus_points'), ('loyalty', 'loyalty_points')):
+        inserted = run_in_batches(engine, 'users', f'''
+            INSERT INTO points_ledger (user_id, points_type, amount, balance_after, reason, created_at)
+            SELECT id, :points_type, {column}, {column}, 'opening_balance', CURRENT_TIMESTAMP
+            FROM users
+            WHERE id > :low AND id <= :high AND COALESCE({column}, 0) != 0
+              AND NOT EXISTS (SELECT 1 FROM points_ledger pl
+                              WHERE pl.user_id = users.id AND pl.points_type = :points_type)
+        ''', batch_size, {'points_type': points_type})
+        print(f"   💰 {points_type}: записано {inserted} начальных остатков")
+
+
+def _create_declared_indexes(engine, batch_size):
+    """Создает индексы DECLARED_INDEXES (внешние ключи и колонки фильтров)"""
+    inspector = inspect(engine)
+    existing = {}
+    for name, table, columns in DECLARED_INDEXES:
+        if table not in existing:
+            existing[table] = {index['name'] for index in inspector.get_indexes(table)}
+        if name in existing[table]:
+            continue
+        started = time.perf_counter()
+        if engine.dialect.name == 'postgresql':
+            # Без блокировки записи в таблицу; CONCURRENTLY нельзя выполнять внутри транзакции
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+        else:
+            # В SQLite индекс строится одним проходом по таблице, это секунды даже на миллионах строк
+            with engine.begin() as conn:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+        print(f"   🗂️ {name} ({(time.perf_counter() - started) * 1000:.0f} мс)")
+
+
+def _catalog_version_row(engine, batch_size):
+    # Версия каталога - одна строка, импорт меню только увеличивает ее (menu_import.bump_catalog_version)
+    catalog_version.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        upsert(conn, catalog_version, [{'id': 1, 'version': 0, 'updated_at': datetime.utcnow()}], ['id'])
+
+
+MIGRATIONS = [
+    (1, 'create_missing_tables', _create_missing_tables),
+    (2, 'align_tables_with_models', _align_tables_with_models),
+    (3, 'backfill_referral_counters', _backfill_referral_counters),
+    (4, 'unique_referral_code_index', _unique_referral_code_index),
+    (5, 'points_ledger_opening_balances', _points_ledger_opening_balances),
+    (6, 'create_declared_indexes', _create_declared_indexes),
+    (7, 'catalog_version_row', _catalog_version_row),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_applied_versions(engine):
+    if not inspect(engine).has_table('schema_version'):
+        return set()
+    with engine.connect() as conn:
+        return set(conn.execute(select(schema_version.c.version)).scalars())
+
+
+def get_schema_version(engine):
+    """Последняя примененная версия схемы (0 - миграции еще не запускались)"""
+    return max(get_applied_versions(engine), default=0)
+
+
+def get_pending_migrations(engine):
+    applied = get_applied_versions(engine)
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in applied]
+
+
+@contextmanager
+def _cluster_lock(engine):
+    """Блокировка миграций между процессами и узлами (PostgreSQL); в SQLite - внутри процесса"""
+    with _migration_lock:
+        if engine.dialect.name != 'postgresql':
+            yield
+            return
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': PG_MIGRATION_LOCK_ID})
+            try:
+                yield
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': PG_MIGRATION_LOCK_ID})
+
+
+def migrate(engine, target=None, batch_size=BACKFILL_BATCH_SIZE):
+    """Применяет непримененные миграции по порядку (до target включительно). Возвращает их номера"""
+    with _cluster_lock(engine):
+        schema_version.create(engine, checkfirst=True)
+        applied = get_applied_versions(engine)
+
+        done = []
+        for version, name, migration in MIGRATIONS:
+            if version in applied:
+                continue
+            if target is not None and version > target:
+                break
+
+            print(f"⏳ {version:04d} {name}")
+            started = time.perf_counter()
+            migration(engine, batch_size)
+            duration_ms = int((time.perf_counter() - started) * 1000)
+
+            with engine.begin() as conn:
+                upsert(conn, schema_version, [{
+                    'version': version, 'name': name, 'applied_at': datetime.utcnow(), 'duration_ms': duration_ms
+                }], ['version'])
+            print(f"✅ {version:04d} {name} ({duration_ms} мс)")
+            done.append(version)
+
+        return done
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Миграции схемы БД')
+    parser.add_argument('--db', help='Путь к файлу SQLite (по умолчанию - БД из config.py / DATABASE_URL)')
+    parser.add_argument('--status', action='store_true', help='Показать примененные и ожидающие миграции')
+    parser.add_argument('--target', type=int, help='Применить миграции только до этой версии')
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='Размер пачки при заполнении данных')
+    args = parser.parse_args()
+
+    engine = create_db_engine(f'sqlite:///{args.db}') if args.db else get_engine()
+    if args.status:
+        applied = get_applied_versions(engine)
+        for version, name, _ in MIGRATIONS:
+            print(f"{'✅' if version in applied else '⏳'} {version:04d} {name}")
+    else:
+        applied_now = migrate(engine, target=args.target, batch_size=args.batch_size)
+        print(f"🎉 Схема версии {get_schema_version(engine)}, применено миграций: {len(applied_now)}")
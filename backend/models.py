@@ -1,8 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
-# Создаем экземпляр db для моделей
-db = SQLAlchemy()
+from db_routing import RoutingSession
+from serializers import SerializableModel, Alias, Nested, Computed
+
+# Создаем экземпляр db для моделей (сессия направляет чтение каталога и отчетов в реплику).
+# to_dict() у всех моделей строится по объявлению __serialize__ (см. serializers.py)
+db = SQLAlchemy(model_class=SerializableModel, session_options={'class_': RoutingSession})
 
 # Модель пользователя
 class User(db.Model):
@@ -18,6 +22,8 @@ class User(db.Model):
     bonus_points = db.Column(db.Integer, default=0)  # Бонусные баллы от рефералов
     referral_code = db.Column(db.String(20), unique=True, nullable=True)  # Уникальный реферальный код пользователя
     referred_by = db.Column(db.String(20), nullable=True)  # Код пользователя, который пригласил
+    referrals_count = db.Column(db.Integer, default=0)  # Счетчик приглашенных пользователей
+    referral_bonus_earned = db.Column(db.Integer, default=0)  # Всего баллов получено за приглашения
     favorites = db.Column(db.Text, nullable=True)  # JSON строка с избранными
     cart = db.Column(db.Text, nullable=True)  # JSON строка с корзиной
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -25,24 +31,11 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     is_admin = db.Column(db.Boolean, default=False)  # Права администратора
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'email': self.email,
-            'phone': self.phone,
-            'location': self.location,
-            'loyalty_points': self.loyalty_points,
-            'bonus_points': self.bonus_points,
-            'referral_code': self.referral_code,
-            'referred_by': self.referred_by,
-            'favorites': self.favorites,
-            'cart': self.cart,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login_at': self.last_login_at.isoformat() if self.last_login_at else None,
-            'is_active': self.is_active,
-            'is_admin': self.is_admin
-        }
+    __serialize__ = (
+        'id', 'name', 'email', 'phone', 'location', 'loyalty_points', 'bonus_points',
+        'referral_code', 'referred_by', 'referrals_count', 'referral_bonus_earned',
+        'favorites', 'cart', 'created_at', 'last_login_at', 'is_active', 'is_admin',
+    )
 
 # Модель ингредиентов
 class Ingredient(db.Model):
@@ -57,17 +50,9 @@ class Ingredient(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'cost_per_unit': self.cost_per_unit,
-            'price_per_unit': self.price_per_unit,
-            'stock_quantity': self.stock_quantity,
-            'unit': self.unit,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    __serialize__ = (
+        'id', 'name', 'cost_per_unit', 'price_per_unit', 'stock_quantity', 'unit', 'created_at', 'updated_at',
+    )
 
 # Модель роллов
 class Roll(db.Model):
@@ -87,43 +72,26 @@ class Roll(db.Model):
     # Связи
     ingredients = db.relationship('RollIngredient', back_populates='roll', cascade='all, delete-orphan')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'cost_price': self.cost_price,
-            'sale_price': self.sale_price,
-            'price': self.sale_price,  # Добавляем поле price для совместимости
-            'image_url': self.image_url,
-            'is_popular': self.is_popular,
-            'is_new': self.is_new,
-            'ingredients': [ing.to_dict() for ing in self.ingredients],
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    __serialize__ = (
+        'id', 'name', 'description', 'cost_price', 'sale_price',
+        Alias('price', 'sale_price'),  # Поле price для совместимости
+        'image_url', 'is_popular', 'is_new', Nested('ingredients'), 'created_at', 'updated_at',
+    )
 
 # Модель состава роллов (связь многие-ко-многим)
 class RollIngredient(db.Model):
     __tablename__ = 'roll_ingredients'
     
     id = db.Column(db.Integer, primary_key=True)
-    roll_id = db.Column(db.Integer, db.ForeignKey('rolls.id'), nullable=False)
-    ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredients.id'), nullable=False)
+    roll_id = db.Column(db.Integer, db.ForeignKey('rolls.id'), nullable=False, index=True)
+    ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredients.id'), nullable=False, index=True)
     amount_per_roll = db.Column(db.Float, nullable=False)  # Количество ингредиента на ролл
     
     # Связи
     roll = db.relationship('Roll', back_populates='ingredients')
     ingredient = db.relationship('Ingredient')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'roll_id': self.roll_id,
-            'ingredient_id': self.ingredient_id,
-            'amount_per_roll': self.amount_per_roll,
-            'ingredient': self.ingredient.to_dict() if self.ingredient else None
-        }
+    __serialize__ = ('id', 'roll_id', 'ingredient_id', 'amount_per_roll', Nested('ingredient'))
 
 # Модель сетов
 class Set(db.Model):
@@ -144,47 +112,32 @@ class Set(db.Model):
     # Связи
     rolls = db.relationship('SetRoll', back_populates='set', cascade='all, delete-orphan')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'cost_price': self.cost_price,
-            'set_price': self.set_price,
-            'discount_percent': self.discount_percent,
-            'image_url': self.image_url,
-            'is_popular': self.is_popular,
-            'is_new': self.is_new,
-            'rolls': [sr.to_dict() for sr in self.rolls],
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    __serialize__ = (
+        'id', 'name', 'description', 'cost_price', 'set_price', 'discount_percent', 'image_url',
+        'is_popular', 'is_new', Nested('rolls'), 'created_at', 'updated_at',
+    )
 
 # Модель состава сетов (связь многие-ко-многим)
 class SetRoll(db.Model):
     __tablename__ = 'set_rolls'
     
     id = db.Column(db.Integer, primary_key=True)
-    set_id = db.Column(db.Integer, db.ForeignKey('sets.id'), nullable=False)
-    roll_id = db.Column(db.Integer, db.ForeignKey('rolls.id'), nullable=False)
+    set_id = db.Column(db.Integer, db.ForeignKey('sets.id'), nullable=False, index=True)
+    roll_id = db.Column(db.Integer, db.ForeignKey('rolls.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, default=1)  # Количество роллов в сете
     
     # Связи
     set = db.relationship('Set', back_populates='rolls')
     roll = db.relationship('Roll')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'set_id': self.set_id,
-            'roll_id': self.roll_id,
-            'quantity': self.quantity,
-            'roll': self.roll.to_dict() if self.roll else None
-        }
+    __serialize__ = ('id', 'set_id', 'roll_id', 'quantity', Nested('roll'))
 
 # Модель заказов
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),  # История заказов пользователя
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -194,34 +147,38 @@ class Order(db.Model):
     status = db.Column(db.String(50), default='Принят')  # Статус заказа
     total_price = db.Column(db.Float, nullable=False)  # Общая стоимость
     comment = db.Column(db.Text, nullable=True)  # Комментарий к заказу
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Список всех заказов для админа
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Связи
     user = db.relationship('User')
     items = db.relationship('OrderItem', back_populates='order', cascade='all, delete-orphan')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'phone': self.phone,
-            'delivery_address': self.delivery_address,
-            'payment_method': self.payment_method,
-            'status': self.status,
-            'total_price': self.total_price,
-            'comment': self.comment,
-            'items': [item.to_dict() for item in self.items],
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    __serialize__ = (
+        'id', 'user_id', 'phone', 'delivery_address', 'payment_method', 'status', 'total_price',
+        'comment', Nested('items'), 'created_at', 'updated_at',
+    )
+
+def _order_item_products(items):
+    """Названия и картинки товаров для позиций заказов: один запрос на тип товара, а не на позицию"""
+    ids = {}
+    for item in items:
+        ids.setdefault(item.item_type, set()).add(item.item_id)
+
+    products = {}
+    for item_type, model in (('roll', Roll), ('set', Set), ('other_item', OtherItem)):
+        if ids.get(item_type):
+            rows = db.session.query(model.id, model.name, model.image_url).filter(model.id.in_(ids[item_type]))
+            for row in rows:
+                products[(item_type, row.id)] = (row.name, row.image_url or '')
+    return products
 
 # Модель элементов заказа
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     item_type = db.Column(db.String(20), nullable=False)  # 'roll' или 'set'
     item_id = db.Column(db.Integer, nullable=False)  # ID ролла или сета
     quantity = db.Column(db.Integer, nullable=False)  # Количество
@@ -231,38 +188,14 @@ class OrderItem(db.Model):
     # Связи
     order = db.relationship('Order', back_populates='items')
 
-    def to_dict(self):
-        # Получаем название товара
-        item_name = 'Товар'
-        item_image = ''
-        
-        if self.item_type == 'roll':
-            roll = Roll.query.get(self.item_id)
-            if roll:
-                item_name = roll.name
-                item_image = roll.image_url or ''
-        elif self.item_type == 'set':
-            set_item = Set.query.get(self.item_id)
-            if set_item:
-                item_name = set_item.name
-                item_image = set_item.image_url or ''
-        elif self.item_type == 'other_item':
-            other_item = OtherItem.query.get(self.item_id)
-            if other_item:
-                item_name = other_item.name
-                item_image = other_item.image_url or ''
-        
-        return {
-            'id': self.id,
-            'order_id': self.order_id,
-            'item_type': self.item_type,
-            'item_id': self.item_id,
-            'item_name': item_name,
-            'item_image': item_image,
-            'quantity': self.quantity,
-            'unit_price': self.unit_price,
-            'total_price': self.total_price
-        }
+    __serialize__ = (
+        'id', 'order_id', 'item_type', 'item_id',
+        Computed('item_name', lambda item, products: products.get((item.item_type, item.item_id), ('Товар', ''))[0],
+                 prefetch=_order_item_products),
+        Computed('item_image', lambda item, products: products.get((item.item_type, item.item_id), ('Товар', ''))[1],
+                 prefetch=_order_item_products),
+        'quantity', 'unit_price', 'total_price',
+    )
 
 # Модель дополнительных товаров (соусы, напитки, другое)
 class OtherItem(db.Model):
@@ -282,29 +215,17 @@ class OtherItem(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'cost_price': self.cost_price,
-            'sale_price': self.sale_price,
-            'category': self.category,
-            'image_url': self.image_url,
-            'stock_quantity': self.stock_quantity,
-            'unit': self.unit,
-            'is_popular': self.is_popular,
-            'is_new': self.is_new,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    __serialize__ = (
+        'id', 'name', 'description', 'cost_price', 'sale_price', 'category', 'image_url',
+        'stock_quantity', 'unit', 'is_popular', 'is_new', 'created_at', 'updated_at',
+    )
 
 # Модель накопительных карт лояльности
 class LoyaltyCard(db.Model):
     __tablename__ = 'loyalty_cards'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     card_number = db.Column(db.String(50), nullable=False)  # Номер карты (например, LC-001)
     filled_rolls = db.Column(db.Integer, default=0)  # Количество заполненных роллов (0-8)
     is_completed = db.Column(db.Boolean, default=False)  # Карта полностью заполнена
@@ -313,49 +234,38 @@ class LoyaltyCard(db.Model):
     
     # Связи
     user = db.relationship('User')
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'card_number': self.card_number,
-            'filled_rolls': self.filled_rolls,
-            'is_completed': self.is_completed,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'progress_percent': (self.filled_rolls / 8) * 100  # Процент заполнения
-        }
+
+    __serialize__ = (
+        'id', 'user_id', 'card_number', 'filled_rolls', 'is_completed', 'created_at', 'completed_at',
+        Computed('progress_percent', lambda card, _: (card.filled_rolls / 8) * 100),  # Процент заполнения
+    )
 
 # Модель роллов доступных для накопительной системы
 class LoyaltyRoll(db.Model):
     __tablename__ = 'loyalty_rolls'
     
     id = db.Column(db.Integer, primary_key=True)
-    roll_id = db.Column(db.Integer, db.ForeignKey('rolls.id'), nullable=False)
+    roll_id = db.Column(db.Integer, db.ForeignKey('rolls.id'), nullable=False, index=True)
     is_available = db.Column(db.Boolean, default=True)  # Доступен ли ролл для получения
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Связи
     roll = db.relationship('Roll')
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'roll_id': self.roll_id,
-            'is_available': self.is_available,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'roll': self.roll.to_dict() if self.roll else None
-        }
+
+    __serialize__ = ('id', 'roll_id', 'is_available', 'created_at', Nested('roll'))
 
 # Модель истории использования накопительных карт
 class LoyaltyCardUsage(db.Model):
     __tablename__ = 'loyalty_card_usage'
+    __table_args__ = (
+        db.Index('ix_loyalty_card_usage_user_id_used_at', 'user_id', 'used_at'),  # История по пользователю
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    loyalty_card_id = db.Column(db.Integer, db.ForeignKey('loyalty_cards.id'), nullable=False)
-    roll_id = db.Column(db.Integer, db.ForeignKey('rolls.id'), nullable=False)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True)  # Если получен через заказ
+    loyalty_card_id = db.Column(db.Integer, db.ForeignKey('loyalty_cards.id'), nullable=False, index=True)
+    roll_id = db.Column(db.Integer, db.ForeignKey('rolls.id'), nullable=False, index=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True, index=True)  # Если получен через заказ
     used_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Связи
@@ -363,48 +273,37 @@ class LoyaltyCardUsage(db.Model):
     loyalty_card = db.relationship('LoyaltyCard')
     roll = db.relationship('Roll')
     order = db.relationship('Order')
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'loyalty_card_id': self.loyalty_card_id,
-            'roll_id': self.roll_id,
-            'order_id': self.order_id,
-            'used_at': self.used_at.isoformat() if self.used_at else None,
-            'roll': self.roll.to_dict() if self.roll else None,
-            'card_number': self.loyalty_card.card_number if self.loyalty_card else None
-        }
+
+    __serialize__ = (
+        'id', 'user_id', 'loyalty_card_id', 'roll_id', 'order_id', 'used_at', Nested('roll'),
+        Computed('card_number', lambda usage, _: usage.loyalty_card.card_number if usage.loyalty_card else None),
+    )
 
 # Модель реферальных кодов
 class ReferralCode(db.Model):
     __tablename__ = 'referral_codes'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     code = db.Column(db.String(20), unique=True, nullable=False)  # Уникальный код
     is_active = db.Column(db.Boolean, default=True)  # Активен ли код
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Связи
     user = db.relationship('User', backref='referral_code_record')
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'code': self.code,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+
+    __serialize__ = ('id', 'user_id', 'code', 'is_active', 'created_at')
 
 # Модель использования реферальных кодов
 class ReferralUsage(db.Model):
     __tablename__ = 'referral_usage'
+    __table_args__ = (
+        db.Index('ix_referral_usage_referrer_id_created_at', 'referrer_id', 'created_at'),  # Приглашенные пользователем
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     referrer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # Кто пригласил
-    referred_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # Кого пригласили
+    referred_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False)  # Кого пригласили (один раз)
     referral_code = db.Column(db.String(20), nullable=False)  # Использованный код
     bonus_points_awarded = db.Column(db.Integer, default=200)  # Количество бонусных баллов
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -412,15 +311,37 @@ class ReferralUsage(db.Model):
     # Связи
     referrer = db.relationship('User', foreign_keys=[referrer_id], backref='referrals_made')
     referred = db.relationship('User', foreign_keys=[referred_id], backref='referrals_received')
+
+    __serialize__ = (
+        'id', 'referrer_id', 'referred_id', 'referral_code', 'bonus_points_awarded', 'created_at',
+        Computed('referrer_name', lambda usage, _: usage.referrer.name if usage.referrer else None),
+        Computed('referred_name', lambda usage, _: usage.referred.name if usage.referred else None),
+    )
+
+# Модель журнала движения баллов (только добавление записей, без изменения)
+class PointsTransaction(db.Model):
+    __tablename__ = 'points_ledger'
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'referrer_id': self.referrer_id,
-            'referred_id': self.referred_id,
-            'referral_code': self.referral_code,
-            'bonus_points_awarded': self.bonus_points_awarded,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'referrer_name': self.referrer.name if self.referrer else None,
-            'referred_name': self.referred.name if self.referred else None
-        }
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    points_type = db.Column(db.String(20), nullable=False, default='bonus')  # 'bonus' или 'loyalty'
+    amount = db.Column(db.Integer, nullable=False)  # Начисление (+) или списание (-)
+    balance_after = db.Column(db.Integer, nullable=True)  # Баланс после операции
+    reason = db.Column(db.String(50), nullable=False)  # 'referral', 'order', 'opening_balance' и т.д.
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True, index=True)  # Заказ, если списание при оформлении
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __serialize__ = (
+        'id', 'user_id', 'points_type', 'amount', 'balance_after', 'reason', 'order_id', 'created_at',
+    )
+
+# Модель версии каталога (одна строка): увеличивается в транзакции импорта меню,
+# по ней снимки меню всех процессов и узлов узнают, что каталог изменился
+class CatalogVersion(db.Model):
+    __tablename__ = 'catalog_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __serialize__ = ('version', 'updated_at')
@@ -0,0 +1,224 @@
+import argparse
+import atexit
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+from config import (PROFILE_ROUTES, PROFILE_SAMPLE_RATE, PROFILE_INTERVAL_MS, PROFILE_DIR, PROFILE_MIN_MS,
+                    PROFILE_MAX_CONCURRENT)
+
+# Сэмплирующий профилировщик запросов (по умолчанию выключен).
+# Пока выбранный запрос обрабатывается, фоновый поток каждые PROFILE_INTERVAL_MS
+# снимает стек потока этого запроса (sys._current_frames). Стеки копятся по
+# эндпоинтам и записываются в PROFILE_DIR/<эндпоинт>.<pid>.folded в формате
+# collapsed stacks ("файл:функция;...;файл:функция число_сэмплов") - его читают
+# flamegraph.pl, speedscope.app и inferno.
+# Какие запросы профилировать:
+#   PROFILE_ROUTES=get_cart,/api/orders   - эндпоинты (имя функции или маршрут)
+#   PROFILE_SAMPLE_RATE=0.01              - доля всех остальных запросов
+#   PROFILE_MIN_MS=200                    - сохранять только запросы медленнее 200 мс
+# Нагрузка ограничена: одновременно профилируется не больше PROFILE_MAX_CONCURRENT
+# запросов, а сам поток сэмплирования занимает не больше ~10% времени
+# (если снимок стеков дорогой, интервал увеличивается).
+#
+#   python profiler.py top profiles/get_cart.*.folded     - самые дорогие функции
+#   python profiler.py merge profiles/get_cart.*.folded > get_cart.folded
+
+MAX_STACKS_PER_ENDPOINT = 5000  # Больше разных стеков не храним - остальные сэмплы в "[other]"
+FLUSH_INTERVAL = 10  # Как часто записывать накопленное на диск, с
+SAMPLER_BUDGET = 0.1  # Доля времени, которую может занимать поток сэмплирования
+
+_lock = threading.Lock()
+_wake = threading.Event()  # Поток сэмплирования спит, пока нечего профилировать
+_active = {}  # id потока запроса -> Counter стеков этого запроса
+_profiles = {}  # эндпоинт -> {'stacks': Counter, 'requests': int}
+_labels = {}  # объект кода -> подпись в стеке
+_state = {'routes': set(), 'rate': 0.0, 'sampler_pid': None, 'flushed': 0.0, 'dirty': False}
+
+
+def configure(routes=None, rate=None):
+    """Какие запросы профилировать: эндпоинты (имя функции или маршрут) и доля остальных запросов"""
+    if routes is not None:
+        _state['routes'] = {route.strip() for route in routes if route.strip()}
+    if rate is not None:
+        _state['rate'] = max(0.0, min(float(rate), 1.0))
+
+
+def is_enabled():
+    return bool(_state['routes'] or _state['rate'])
+
+
+def _label(code):
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = f"{os.path.basename(code.co_filename)}:{code.co_qualname}".replace(';', ':')
+    return label
+
+
+def _stack(frame):
+    names = []
+    while frame is not None:
+        names.append(_label(frame.f_code))
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+def _sample_loop():
+    interval = PROFILE_INTERVAL_MS / 1000
+    pid = os.getpid()
+    while _state['sampler_pid'] == pid:
+        with _lock:
+            if not _active:
+                _wake.clear()
+        _wake.wait()
+        started = time.perf_counter()
+        frames = sys._current_frames()
+        with _lock:
+            for thread_id, stacks in _active.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stacks[_stack(frame)] += 1
+        del frames
+        spent = time.perf_counter() - started
+        time.sleep(max(interval, spent * (1 - SAMPLER_BUDGET) / SAMPLER_BUDGET))
+
+
+def _start_sampler():
+    # Поток запускается в каждом процессе отдельно: после fork (gunicorn) потоков нет
+    if _state['sampler_pid'] == os.getpid():
+        return
+    _state['sampler_pid'] = os.getpid()
+    threading.Thread(target=_sample_loop, name='profiler-sampler', daemon=True).start()
+
+
+def _should_profile():
+    if request.endpoint is None:
+        return False
+    rule = request.url_rule.rule if request.url_rule is not None else None
+    if request.endpoint in _state['routes'] or rule in _state['routes']:
+        return True
+    return _state['rate'] > 0 and random.random() < _state['rate']
+
+
+def _record(endpoint, stacks):
+    with _lock:
+        profile = _profiles.setdefault(endpoint, {'stacks': Counter(), 'requests': 0})
+        profile['requests'] += 1
+        for stack, count in stacks.items():
+            if stack in profile['stacks'] or len(profile['stacks']) < MAX_STACKS_PER_ENDPOINT:
+                profile['stacks'][stack] += count
+            else:
+                profile['stacks']['[other]'] += count
+        _state['dirty'] = True
+
+
+def flush():
+    """Записывает накопленные стеки по эндпоинтам в PROFILE_DIR"""
+    with _lock:
+        profiles = {endpoint: Counter(profile['stacks']) for endpoint, profile in _profiles.items()}
+        _state['dirty'] = False
+        _state['flushed'] = time.time()
+    if not profiles:
+        return []
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    paths = []
+    for endpoint, stacks in profiles.items():
+        path = os.path.join(PROFILE_DIR, f'{endpoint}.{os.getpid()}.folded')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        os.replace(path + '.tmp', path)
+        paths.append(path)
+    return paths
+
+
+def init_profiler(app):
+    """Профилирование запросов по настройкам PROFILE_* (без них обработчики ничего не делают)"""
+    configure(PROFILE_ROUTES.split(','), PROFILE_SAMPLE_RATE)
+    if is_enabled():
+        atexit.register(flush)  # Сэмплы последних запросов до следующей записи не теряются
+
+    @app.before_request
+    def _start_profile():
+        if not is_enabled() or not _should_profile():
+            return
+        thread_id = threading.get_ident()
+        with _lock:
+            if len(_active) >= PROFILE_MAX_CONCURRENT:
+                return  # Профилируется достаточно запросов - этот пропускаем
+            _active[thread_id] = Counter()
+            _wake.set()
+        _start_sampler()
+        g.profile_started = time.perf_counter()
+
+    @app.teardown_request
+    def _finish_profile(error=None):
+        started = g.pop('profile_started', None)
+        if started is None:
+            return
+        with _lock:
+            stacks = _active.pop(threading.get_ident(), None)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if stacks and elapsed_ms >= PROFILE_MIN_MS:
+            _record(request.endpoint, stacks)
+        if _state['dirty'] and time.time() - _state['flushed'] >= FLUSH_INTERVAL:
+            try:
+                flush()
+            except OSError as e:
+                print(f'❌ Ошибка записи профиля: {e}')
+
+
+# ===== Разбор профилей =====
+
+def read_folded(paths):
+    """Сумма нескольких файлов collapsed stacks (например, всех процессов одного эндпоинта)"""
+    stacks = Counter()
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack and count.isdigit():
+                    stacks[stack] += int(count)
+    return stacks
+
+
+def top_functions(stacks, limit=20):
+    """[(функция, собственные сэмплы, сэмплы со вложенными)] по убыванию собственного времени"""
+    own, total = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for name in set(frames):
+            total[name] += count
+    return [(name, count, total[name]) for name, count in own.most_common(limit)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Разбор профилей запросов (collapsed stacks)')
+    parser.add_argument('command', choices=['top', 'merge'], help='top - самые дорогие функции, merge - один файл')
+    parser.add_argument('paths', nargs='+', help='Файлы .folded')
+    parser.add_argument('--limit', type=int, default=20, help='Сколько функций показать (top)')
+    args = parser.parse_args()
+
+    stacks = read_folded(args.paths)
+    if args.command == 'merge':
+        for stack, count in stacks.most_common():
+            print(f'{stack} {count}')
+        return 0
+
+    samples = sum(stacks.values())
+    print(f'📊 Сэмплов: {samples}')
+    print(f"{'собств.':>8} {'всего':>8}  функция")
+    for name, own, total in top_functions(stacks, args.limit):
+        print(f'{own / samples:>7.1%} {total / samples:>8.1%}  {name}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
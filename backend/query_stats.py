@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import QUERY_BUDGET, SERVER_TIMING
+
+# Счетчик SQL-запросов и времени БД на каждый HTTP-запрос.
+# Слушатели событий всех движков SQLAlchemy (основной пул, пул реплики) считают
+# выполненные запросы и их время в рамках текущего запроса Flask.
+# - заголовок ответа Server-Timing: db;dur=12.3;desc="7 queries", app;dur=25.0
+#   (видно в DevTools браузера и в любом HTTP-клиенте);
+# - последние запросы с их счетчиками - GET /api/admin/debug/queries;
+# - запрос дороже QUERY_BUDGET SQL-запросов печатается с самыми частыми
+#   запросами (N+1 сразу видно: один и тот же SELECT десятки раз);
+# - assert_max_queries(n) - для проверок и check_query_budgets.py.
+
+RECENT_REQUESTS = 200  # Сколько последних запросов хранить для отладочного эндпоинта
+
+_recent = deque(maxlen=RECENT_REQUESTS)
+_collectors = []  # Активные assert_max_queries / collect_queries
+_collectors_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """SQL-запросов больше, чем разрешено assert_max_queries"""
+
+
+def _normalize(statement):
+    return ' '.join(statement.split())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_stats_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_stats_started', None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+
+    if has_request_context():
+        stats = g.get('query_stats')
+        if stats is not None:
+            stats['count'] += 1
+            stats['seconds'] += elapsed
+            stats['statements'][statement] += 1
+
+    if _collectors:
+        with _collectors_lock:
+            for collected in _collectors:
+                collected.append(_normalize(statement))
+
+
+def install_engine_listeners():
+    """Подключает подсчет запросов ко всем движкам, в том числе созданным позже (повторный вызов ничего не делает)"""
+    if not event.contains(Engine, 'after_cursor_execute', _after_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_query_stats(app):
+    """Подсчет запросов на каждый HTTP-запрос и заголовок Server-Timing"""
+    install_engine_listeners()
+
+    @app.before_request
+    def _start_query_stats():
+        g.query_stats = {'count': 0, 'seconds': 0.0, 'statements': Counter(), 'started': time.perf_counter()}
+
+    @app.after_request
+    def _finish_query_stats(response):
+        stats = g.get('query_stats')  # Остается в g до конца запроса - его читает журнал запросов
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats['started']
+        entry = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'queries': stats['count'],
+            'db_ms': round(stats['seconds'] * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'time': time.time(),
+        }
+        _recent.append(entry)
+
+        if SERVER_TIMING:
+            response.headers.add('Server-Timing', f'db;dur={entry["db_ms"]};desc="{stats["count"]} queries"')
+            response.headers.add('Server-Timing', f'app;dur={entry["total_ms"]}')
+
+        if QUERY_BUDGET and stats['count'] > QUERY_BUDGET:
+            print(f"⚠️ {request.method} {request.path}: {stats['count']} SQL-запросов "
+                  f"(бюджет {QUERY_BUDGET}), БД {entry['db_ms']} мс из {entry['total_ms']} мс")
+            for statement, count in stats['statements'].most_common(3):
+                print(f'   {count} x {_normalize(statement)[:200]}')
+        return response
+
+
+def get_recent_requests(limit=None, endpoint=None):
+    """Последние запросы (новые первыми), при необходимости только одного эндпоинта"""
+    entries = [entry for entry in reversed(_recent) if endpoint is None or entry['endpoint'] == endpoint]
+    return entries[:limit] if limit else entries
+
+
+def summarize_by_endpoint(entries):
+    """Сводка по эндпоинтам: число вызовов, максимум и среднее число запросов, время БД"""
+    summary = {}
+    for entry in entries:
+        row = summary.setdefault(entry['endpoint'], {'endpoint': entry['endpoint'], 'calls': 0,
+                                                     'max_queries': 0, 'total_queries': 0, 'db_ms': 0.0})
+        row['calls'] += 1
+        row['max_queries'] = max(row['max_queries'], entry['queries'])
+        row['total_queries'] += entry['queries']
+        row['db_ms'] += entry['db_ms']
+    for row in summary.values():
+        row['avg_queries'] = round(row.pop('total_queries') / row['calls'], 1)
+        row['db_ms'] = round(row['db_ms'], 2)
+    return sorted(summary.values(), key=lambda row: row['max_queries'], reverse=True)
+
+
+@contextmanager
+def collect_queries():
+    """Собирает SQL-запросы, выполненные внутри блока (в любом потоке), в список"""
+    collected = []
+    with _collectors_lock:
+        _collectors.append(collected)
+    try:
+        yield collected
+    finally:
+        with _collectors_lock:
+            _collectors.remove(collected)
+
+
+@contextmanager
+def assert_max_queries(limit, label=''):
+    """Внутри блока выполнено не больше limit SQL-запросов, иначе QueryBudgetExceeded.
+
+        with assert_max_queries(5, 'GET /api/orders'):
+            client.get('/api/orders', headers=headers)
+    """
+    with collect_queries() as collected:
+        yield collected
+    if len(collected) > limit:
+        repeated = Counter(collected).most_common(3)
+        details = '\n'.join(f'   {count} x {statement[:200]}' for statement, count in repeated)
+        raise QueryBudgetExceeded(f'{label or "Блок"}: {len(collected)} SQL-запросов, допустимо {limit}\n{details}')
@@ -1,8 +1,8 @@
-import sqlite3
+from database import connect
+
 
 def main():
-    db_path = 'instance/sushi_express.db'
-    conn = sqlite3.connect(db_path)
+    conn = connect()
     cursor = conn.cursor()
     
     print("🔍 ПРОВЕРКА БАЗЫ ДАННЫХ")
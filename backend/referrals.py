@@ -0,0 +1,205 @@
+import secrets
+import string
+import threading
+from collections import deque
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, ReferralUsage
+from wallet import credit_points
+
+# Реферальная система: применение кода при регистрации, начисление бонусов
+# и счетчики по пригласившему (users.referrals_count / users.referral_bonus_earned),
+# чтобы экрану рефералов не приходилось пересчитывать таблицу referral_usage.
+
+REFERRAL_BONUS_POINTS = 200  # Баллы пригласившему за каждого нового пользователя
+
+REFERRAL_CODE_LENGTH = 8
+REFERRAL_CODE_ALPHABET = string.ascii_uppercase + string.digits
+REFERRAL_CODE_POOL_SIZE = 500  # Сколько кодов генерируем за одно пополнение пула
+REFERRAL_CODE_POOL_LOW = 100  # При каком остатке запускаем фоновое пополнение
+
+class ReferralCodeUnavailable(Exception):
+    """Не удалось выдать пользователю свободный реферальный код"""
+
+
+# Пул заранее сгенерированных свободных кодов. deque.popleft() атомарен,
+# поэтому выдача кода не требует блокировки; блокировка нужна только пополнению.
+_code_pool = deque()
+_refill_lock = threading.Lock()
+
+
+def _generate_codes(count):
+    """Генерирует пачку уникальных кодов и отбрасывает уже занятые в БД"""
+    codes = set()
+    while len(codes) < count:
+        codes.add(''.join(secrets.choice(REFERRAL_CODE_ALPHABET) for _ in range(REFERRAL_CODE_LENGTH)))
+    codes = list(codes)
+
+    # Одна проверка занятости на пачку вместо проверки каждого кода
+    taken = set()
+    for i in range(0, len(codes), 500):
+        chunk = codes[i:i + 500]
+        taken.update(row[0] for row in db.session.query(User.referral_code).filter(User.referral_code.in_(chunk)))
+
+    return [code for code in codes if code not in taken]
+
+
+def refill_referral_code_pool(count=REFERRAL_CODE_POOL_SIZE):
+    """Пополняет пул кодов (если пополнение уже идет в другом потоке - ничего не делает)"""
+    if not _refill_lock.acquire(blocking=False):
+        return False
+    try:
+        _code_pool.extend(_generate_codes(count))
+        return True
+    finally:
+        _refill_lock.release()
+
+
+def _refill_in_background():
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                refill_referral_code_pool()
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def allocate_referral_code():
+    """Выдает свободный код из пула за O(1)"""
+    if len(_code_pool) < REFERRAL_CODE_POOL_LOW and not _refill_lock.locked():
+        _refill_in_background()
+
+    try:
+        return _code_pool.popleft()
+    except IndexError:
+        # Пул пуст (например, сразу после старта) - генерируем небольшую пачку синхронно
+        codes = _generate_codes(REFERRAL_CODE_POOL_LOW)
+        code = codes.pop()
+        _code_pool.extend(codes)
+        return code
+
+
+def assign_referral_code(user, attempts=3):
+    """Назначает пользователю реферальный код, если его еще нет.
+
+    Код берется из пула; уникальный индекс users.referral_code остается
+    последней защитой от коллизий между воркерами - в этом случае просто
+    берем следующий код из пула. Если за attempts попыток код так и не
+    записан - ReferralCodeUnavailable.
+    """
+    for _ in range(attempts):
+        if user.referral_code:
+            return user.referral_code
+
+        code = allocate_referral_code()
+        try:
+            # Условный UPDATE: параллельный запрос того же пользователя не перезапишет код
+            db.session.query(User).filter(
+                User.id == user.id, User.referral_code.is_(None)
+            ).update({User.referral_code: code}, synchronize_session=False)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        db.session.expire(user, ['referral_code'])
+
+    if not user.referral_code:
+        raise ReferralCodeUnavailable(f'Не удалось выдать реферальный код за {attempts} попыток')
+    return user.referral_code
+
+
+def normalize_referral_code(code):
+    """Приводит введенный код к виду, в котором он хранится в БД"""
+    if not code:
+        return None
+    code = str(code).strip().upper()
+    return code or None
+
+
+def find_referrer(code):
+    """Находит пользователя-владельца реферального кода (поиск по уникальному индексу)"""
+    code = normalize_referral_code(code)
+    if not code:
+        return None
+    return User.query.filter_by(referral_code=code).first()
+
+
+def apply_referral_code(new_user, referrer, code):
+    """Привязывает нового пользователя к пригласившему и начисляет бонус.
+
+    Работает в текущей транзакции: вызывающий код делает один commit вместе
+    с созданием пользователя. Баллы и счетчики пригласившего увеличиваются атомарным
+    UPDATE ... SET x = x + n, поэтому параллельные регистрации не теряют баллы.
+    """
+    code = normalize_referral_code(code)
+
+    new_user.referred_by = code
+
+    usage = ReferralUsage(
+        referrer_id=referrer.id,
+        referred_id=new_user.id,
+        referral_code=code,
+        bonus_points_awarded=REFERRAL_BONUS_POINTS,
+        created_at=datetime.utcnow()
+    )
+    db.session.add(usage)
+
+    # Баллы идут через кошелек (с записью в журнал), счетчики - отдельным атомарным UPDATE
+    credit_points(referrer.id, REFERRAL_BONUS_POINTS, 'referral')
+
+    db.session.query(User).filter(User.id == referrer.id).update({
+        User.referrals_count: db.func.coalesce(User.referrals_count, 0) + 1,
+        User.referral_bonus_earned: db.func.coalesce(User.referral_bonus_earned, 0) + REFERRAL_BONUS_POINTS,
+    }, synchronize_session=False)
+
+    return usage
+
+
+def get_referred_by_info(user):
+    """Информация о том, кто пригласил пользователя (или None).
+
+    Бонус за приглашение получает только пригласивший (apply_referral_code), приглашенный -
+    ничего: bonus_points_received всегда 0 и остается в ответе для экрана рефералов клиента.
+    """
+    if not user.referred_by:
+        return None
+
+    row = db.session.query(
+        ReferralUsage.referral_code, ReferralUsage.created_at, User.name
+    ).join(User, ReferralUsage.referrer_id == User.id).filter(
+        ReferralUsage.referred_id == user.id
+    ).first()
+
+    if not row:
+        return None
+
+    return {
+        'referrer_name': row.name,
+        'referral_code': row.referral_code,
+        'bonus_points_received': 0,  # Приглашенному бонус не начисляется
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+
+
+def get_referrals_made(user_id, limit=50):
+    """Последние приглашенные пользователем (одним запросом вместе с именами)"""
+    rows = db.session.query(
+        ReferralUsage.id, ReferralUsage.referred_id, ReferralUsage.bonus_points_awarded,
+        ReferralUsage.created_at, User.name
+    ).join(User, ReferralUsage.referred_id == User.id).filter(
+        ReferralUsage.referrer_id == user_id
+    ).order_by(ReferralUsage.created_at.desc()).limit(limit).all()
+
+    return [{
+        'id': row.id,
+        'referred_user_id': row.referred_id,
+        'referred_user_name': row.name,
+        'bonus_points_awarded': row.bonus_points_awarded,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    } for row in rows]
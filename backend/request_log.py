@@ -0,0 +1,182 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request, got_request_exception
+from flask_jwt_extended import get_jwt_identity
+
+from config import REQUEST_LOG, LOG_LEVEL, LOG_QUEUE_SIZE
+
+# Журнал запросов в JSON, по строке на запрос:
+#   {"ts": "...", "level": "INFO", "event": "request", "request_id": "...", "method": "POST",
+#    "route": "/api/orders", "status": 201, "latency_ms": 18.4, "queries": 15, "db_ms": 1.7, "user_id": 42}
+# request_id берется из заголовка X-Request-ID (прокси, клиент) или создается
+# и возвращается в ответе тем же заголовком - по нему ищутся все строки запроса.
+# Для ответов 4xx/5xx в строку попадает текст ошибки из тела ответа: эндпоинты
+# перехватывают исключения и возвращают {'error': ...}, иначе ошибка нигде не видна.
+# Необработанные исключения пишутся отдельной строкой со стеком вызовов.
+# Поток запроса только кладет запись в очередь (QueueHandler); форматирование
+# и запись делает отдельный поток. Если очередь переполнена (вывод не успевает),
+# запись отбрасывается, а не задерживает запрос; число потерянных - в следующей строке.
+#
+#   REQUEST_LOG=stdout (по умолчанию) | путь к файлу | off
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+logger = logging.getLogger('sushi.requests')
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+
+_listener = None
+_listener_pid = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Запись журнала -> одна строка JSON. Поля берутся из extra={'fields': {...}}"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'event': record.getMessage(),
+        }
+        data.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler, который не блокирует поток запроса: при полной очереди запись теряется"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Форматирование - в потоке записи; очередь внутри процесса, запись передается как есть
+        return record
+
+    def enqueue(self, record):
+        if self.dropped:
+            record.fields = dict(getattr(record, 'fields', {}), dropped_before=self.dropped)
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.dropped = 0
+
+
+def _create_handler():
+    if REQUEST_LOG == 'stdout':
+        return logging.StreamHandler(sys.stdout)
+    os.makedirs(os.path.dirname(os.path.abspath(REQUEST_LOG)), exist_ok=True)
+    return logging.FileHandler(REQUEST_LOG, encoding='utf-8')
+
+
+def _start_listener():
+    """Поток записи журнала - в каждом процессе свой (потоки не переживают fork gunicorn)"""
+    global _listener, _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    if _listener_pid is None:
+        atexit.register(_stop_listener)
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = _create_handler()
+    handler.setFormatter(JSONFormatter())
+    for old in list(logger.handlers):
+        logger.removeHandler(old)
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    _listener = QueueListener(log_queue, handler, respect_handler_level=False)
+    _listener.start()
+    _listener_pid = os.getpid()
+
+
+def _stop_listener():
+    # Дописываем очередь при завершении процесса
+    global _listener, _listener_pid
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+        _listener = _listener_pid = None
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """Отдельная строка журнала (не о запросе целиком), с request_id текущего запроса, если он есть"""
+    if REQUEST_LOG == 'off':
+        return
+    _start_listener()
+    if has_request_context() and g.get('request_id'):
+        fields = dict(fields, request_id=g.request_id)
+    logger.log(level, event, extra={'fields': fields})
+
+
+def _current_user_id():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None  # Эндпоинт без @jwt_required или токен не прошел проверку
+
+
+def _error_message(response):
+    if response.status_code < 400 or not response.is_json:
+        return None
+    payload = response.get_json(silent=True)
+    return payload.get('error') if isinstance(payload, dict) else None
+
+
+def init_request_log(app):
+    """Журнал запросов в JSON с идентификатором запроса (X-Request-ID)"""
+    if REQUEST_LOG == 'off':
+        return
+
+    @app.before_request
+    def _start_request_log():
+        _start_listener()
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+        g.request_log_started = time.perf_counter()
+
+    @app.after_request
+    def _write_request_log(response):
+        started = g.get('request_log_started')
+        if started is None:
+            return response
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+        stats = g.get('query_stats') or {}
+        fields = {
+            'request_id': g.request_id,
+            'method': request.method,
+            'path': request.path,
+            'route': request.url_rule.rule if request.url_rule is not None else None,
+            'status': response.status_code,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+            'queries': stats.get('count'),
+            'db_ms': round(stats['seconds'] * 1000, 2) if stats else None,
+            'user_id': _current_user_id(),
+            'remote_addr': request.headers.get('X-Forwarded-For', request.remote_addr),
+        }
+        error = _error_message(response)
+        if error:
+            fields['error'] = error
+        level = logging.ERROR if response.status_code >= 500 else logging.INFO
+        logger.log(level, 'request', extra={'fields': fields})
+        return response
+
+    @got_request_exception.connect_via(app)
+    def _log_exception(sender, exception, **extra):
+        logger.error('exception', exc_info=(type(exception), exception, exception.__traceback__), extra={'fields': {
+            'request_id': g.get('request_id'),
+            'method': request.method,
+            'path': request.path,
+        }})
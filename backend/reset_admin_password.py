@@ -1,9 +1,9 @@
-import sqlite3
 from werkzeug.security import generate_password_hash
+from database import connect
 
 def reset_admin_password():
     try:
-        conn = sqlite3.connect('sushi_express.db')
+        conn = connect()
         cursor = conn.cursor()
         
         print("🔐 Сбрасываю пароль админа...")
@@ -1,15 +1,16 @@
 import os
 from app_sqlite import app, db
+from config import DB_PATH
 
 # Удаляем старую базу данных
-if os.path.exists('sushi_express.db'):
-    os.remove('sushi_express.db')
+if os.path.exists(DB_PATH):
+    os.remove(DB_PATH)
     print("🗑️ Старая база данных удалена")
 
 # Создаем новую базу данных
 with app.app_context():
     db.create_all()
     print("✅ Новая база данных создана с полем location!")
-    print("📁 Файл: sushi_express.db")
+    print(f"📁 Файл: {DB_PATH}")
 
 print("🚀 Теперь запустите: python app_sqlite.py")
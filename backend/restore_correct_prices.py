@@ -1,10 +1,11 @@
+from database import connect
+
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import sqlite3
 
 def restore_correct_prices():
-    conn = sqlite3.connect('instance/sushi_express.db')
+    conn = connect()
     cursor = conn.cursor()
     
     print('💰 ВОССТАНОВЛЕНИЕ ПРАВИЛЬНЫХ ЦЕН РОЛЛОВ')
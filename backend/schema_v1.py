@@ -0,0 +1,191 @@
+from sqlalchemy import MetaData, Table, Column, ForeignKey, Integer, String, Text, Float, Boolean, DateTime
+
+# Схема версии 1 миграций (migrations.py) - снимок models.py на момент их появления.
+# Миграции 1 и 2 создают и выравнивают таблицы по этому снимку, а не по текущим
+# моделям: новая и обновленная БД проходят одинаковые шаги, и правка models.py
+# не меняет того, что делает уже выпущенная миграция.
+# Этот файл не меняется. Новые таблицы, колонки и индексы - только новыми миграциями.
+# Значения по умолчанию - только те, что попадают в DDL (datetime.utcnow задает приложение).
+
+metadata = MetaData()
+
+users = Table(
+    'users', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('phone', String(20), nullable=False),
+    Column('location', String(200), nullable=True),
+    Column('password_hash', String(255), nullable=False),
+    Column('loyalty_points', Integer, default=0),
+    Column('bonus_points', Integer, default=0),
+    Column('referral_code', String(20), unique=True, nullable=True),
+    Column('referred_by', String(20), nullable=True),
+    Column('referrals_count', Integer, default=0),
+    Column('referral_bonus_earned', Integer, default=0),
+    Column('favorites', Text, nullable=True),
+    Column('cart', Text, nullable=True),
+    Column('created_at', DateTime),
+    Column('last_login_at', DateTime),
+    Column('is_active', Boolean, default=True),
+    Column('is_admin', Boolean, default=False),
+)
+
+ingredients = Table(
+    'ingredients', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('cost_per_unit', Float, nullable=False),
+    Column('price_per_unit', Float, nullable=False),
+    Column('stock_quantity', Float, default=0),
+    Column('unit', String(20), nullable=False),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+)
+
+rolls = Table(
+    'rolls', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('description', Text, nullable=True),
+    Column('cost_price', Float, nullable=False),
+    Column('sale_price', Float, nullable=False),
+    Column('image_url', String(255), nullable=True),
+    Column('is_popular', Boolean, default=False),
+    Column('is_new', Boolean, default=False),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+)
+
+roll_ingredients = Table(
+    'roll_ingredients', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('roll_id', Integer, ForeignKey('rolls.id'), nullable=False),
+    Column('ingredient_id', Integer, ForeignKey('ingredients.id'), nullable=False),
+    Column('amount_per_roll', Float, nullable=False),
+)
+
+sets = Table(
+    'sets', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('description', Text, nullable=True),
+    Column('cost_price', Float, nullable=False),
+    Column('set_price', Float, nullable=False),
+    Column('discount_percent', Float, default=0),
+    Column('image_url', String(255), nullable=True),
+    Column('is_popular', Boolean, default=False),
+    Column('is_new', Boolean, default=False),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+)
+
+set_rolls = Table(
+    'set_rolls', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('set_id', Integer, ForeignKey('sets.id'), nullable=False),
+    Column('roll_id', Integer, ForeignKey('rolls.id'), nullable=False),
+    Column('quantity', Integer, default=1),
+)
+
+orders = Table(
+    'orders', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+    Column('phone', String(20), nullable=False),
+    Column('delivery_address', Text, nullable=False),
+    Column('payment_method', String(50), nullable=False),
+    Column('status', String(50), default='Принят'),
+    Column('total_price', Float, nullable=False),
+    Column('comment', Text, nullable=True),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+)
+
+order_items = Table(
+    'order_items', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('order_id', Integer, ForeignKey('orders.id'), nullable=False),
+    Column('item_type', String(20), nullable=False),
+    Column('item_id', Integer, nullable=False),
+    Column('quantity', Integer, nullable=False),
+    Column('unit_price', Float, nullable=False),
+    Column('total_price', Float, nullable=False),
+)
+
+other_items = Table(
+    'other_items', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('description', Text, nullable=True),
+    Column('cost_price', Float, nullable=False),
+    Column('sale_price', Float, nullable=False),
+    Column('category', String(50), nullable=False),
+    Column('image_url', String(255), nullable=True),
+    Column('stock_quantity', Float, default=0),
+    Column('unit', String(20), default='шт'),
+    Column('is_popular', Boolean, default=False),
+    Column('is_new', Boolean, default=False),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+)
+
+loyalty_cards = Table(
+    'loyalty_cards', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+    Column('card_number', String(50), nullable=False),
+    Column('filled_rolls', Integer, default=0),
+    Column('is_completed', Boolean, default=False),
+    Column('created_at', DateTime),
+    Column('completed_at', DateTime, nullable=True),
+)
+
+loyalty_rolls = Table(
+    'loyalty_rolls', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('roll_id', Integer, ForeignKey('rolls.id'), nullable=False),
+    Column('is_available', Boolean, default=True),
+    Column('created_at', DateTime),
+)
+
+loyalty_card_usage = Table(
+    'loyalty_card_usage', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+    Column('loyalty_card_id', Integer, ForeignKey('loyalty_cards.id'), nullable=False),
+    Column('roll_id', Integer, ForeignKey('rolls.id'), nullable=False),
+    Column('order_id', Integer, ForeignKey('orders.id'), nullable=True),
+    Column('used_at', DateTime),
+)
+
+referral_codes = Table(
+    'referral_codes', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+    Column('code', String(20), unique=True, nullable=False),
+    Column('is_active', Boolean, default=True),
+    Column('created_at', DateTime),
+)
+
+referral_usage = Table(
+    'referral_usage', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('referrer_id', Integer, ForeignKey('users.id'), nullable=False),
+    Column('referred_id', Integer, ForeignKey('users.id'), unique=True, nullable=False),
+    Column('referral_code', String(20), nullable=False),
+    Column('bonus_points_awarded', Integer, default=200),
+    Column('created_at', DateTime),
+)
+
+points_ledger = Table(
+    'points_ledger', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id'), nullable=False, index=True),
+    Column('points_type', String(20), nullable=False, default='bonus'),
+    Column('amount', Integer, nullable=False),
+    Column('balance_after', Integer, nullable=True),
+    Column('reason', String(50), nullable=False),
+    Column('order_id', Integer, ForeignKey('orders.id'), nullable=True),
+    Column('created_at', DateTime),
+)
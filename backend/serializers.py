@@ -0,0 +1,249 @@
+import datetime
+import functools
+import json
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from flask_sqlalchemy.model import Model
+from sqlalchemy import DateTime, inspect
+
+try:
+    import orjson
+except ImportError:  # Без orjson работает стандартный json, только медленнее
+    orjson = None
+
+# Сериализация моделей в JSON.
+# Поля модели объявляются в __serialize__ (колонки, Alias, Nested, Computed).
+# Для каждой комбинации (модель, выбранные поля, глубина) один раз генерируется
+# функция-кодировщик - один литерал dict без циклов по описанию полей, она
+# кэшируется и дальше вызывается для каждого объекта.
+# Computed-поля с prefetch получают данные одним запросом на весь ответ
+# (например, названия товаров всех позиций всех заказов), а не запросом на объект.
+#
+# Клиент может сократить ответ:
+#   ?fields=id,status,items.item_name  - только перечисленные поля (вложенные через точку)
+#   ?depth=1                           - вложенные объекты не глубже 1 уровня
+#
+# Ответы Flask кодирует FastJSONProvider: orjson, если установлен, даты - ISO 8601.
+
+MAX_DEPTH = 5  # Наибольшая глубина вложенности, которую можно запросить через ?depth=
+
+
+class FieldSelectionError(ValueError):
+    """Неверный параметр fields или depth"""
+
+
+class Alias:
+    """Поле ответа с другим именем атрибута: Alias('price', 'sale_price')"""
+
+    def __init__(self, name, attribute):
+        self.name = name
+        self.attribute = attribute
+
+
+class Nested:
+    """Связанный объект или список объектов (по relationship модели)"""
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Computed:
+    """Вычисляемое поле: func(obj, prefetched).
+
+    prefetch(objects) вызывается один раз на ответ со всеми объектами модели,
+    которые попадут в ответ, его результат передается в func как prefetched.
+    """
+
+    def __init__(self, name, func, prefetch=None):
+        self.name = name
+        self.func = func
+        self.prefetch = prefetch
+
+
+class _Encoder:
+    def __init__(self, encode, prefetches):
+        self.encode = encode
+        self.prefetches = prefetches  # [(путь по связям, prefetch)]
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _one(encode, value, ctx):
+    return encode(value, ctx) if value is not None else None
+
+
+def _declared_fields(model):
+    fields = getattr(model, '__serialize__', None)
+    if fields is None:
+        fields = [column.key for column in inspect(model).column_attrs]
+    declared = {}
+    for field in fields:
+        name = field if isinstance(field, str) else field.name
+        declared[name] = field
+    return declared
+
+
+@functools.lru_cache(maxsize=512)
+def _compile(model, selection, depth, iso_datetimes):
+    """Кодировщик модели для выбранных полей (None - все) и оставшейся глубины (None - без ограничения)"""
+    declared = _declared_fields(model)
+    selected = dict(selection) if selection is not None else None
+    if selected is not None:
+        unknown = sorted(set(selected) - set(declared))
+        if unknown:
+            raise FieldSelectionError(f"Неизвестные поля {model.__name__}: {', '.join(unknown)}")
+
+    mapper = inspect(model)
+    namespace = {'_iso': _iso, '_one': _one}
+    items, prefetches = [], []
+
+    for index, (name, field) in enumerate(declared.items()):
+        if selected is not None and name not in selected:
+            continue
+        subselection = selected.get(name) if selected is not None else None
+
+        if isinstance(field, Nested):
+            if depth == 0:
+                continue  # Глубже не идем
+            relationship = mapper.relationships[field.name]
+            nested = _compile(relationship.mapper.class_, subselection, None if depth is None else depth - 1,
+                              iso_datetimes)
+            namespace[f'_enc{index}'] = nested.encode
+            if relationship.uselist:
+                expression = f'[_enc{index}(item, ctx) for item in obj.{field.name}]'
+            else:
+                expression = f'_one(_enc{index}, obj.{field.name}, ctx)'
+            prefetches += [((field.name,) + path, prefetch) for path, prefetch in nested.prefetches]
+        elif subselection is not None:
+            raise FieldSelectionError(f'Поле {model.__name__}.{name} не вложенный объект')
+        elif isinstance(field, Computed):
+            namespace[f'_fn{index}'] = field.func
+            if field.prefetch is not None:
+                namespace[f'_pf{index}'] = field.prefetch
+                expression = f'_fn{index}(obj, ctx.get(_pf{index}))'
+                prefetches.append(((), field.prefetch))
+            else:
+                expression = f'_fn{index}(obj, None)'
+        else:
+            attribute = field.attribute if isinstance(field, Alias) else field
+            expression = f'obj.{attribute}'
+            column = mapper.columns.get(attribute)
+            if iso_datetimes and column is not None and isinstance(column.type, DateTime):
+                expression = f'_iso({expression})'
+        items.append(f'        {name!r}: {expression},')
+
+    source = 'def encode(obj, ctx):\n    return {\n' + '\n'.join(items) + '\n    }\n'
+    exec(compile(source, f'<encoder {model.__name__}>', 'exec'), namespace)
+    return _Encoder(namespace['encode'], prefetches)
+
+
+def _collect(objects, path):
+    """Объекты, до которых можно дойти от objects по цепочке связей path"""
+    for name in path:
+        found = []
+        for obj in objects:
+            value = getattr(obj, name)
+            if isinstance(value, list):
+                found.extend(value)
+            elif value is not None:
+                found.append(value)
+        objects = found
+    return objects
+
+
+def parse_fields(value):
+    """'id,items.item_name' -> (('id', None), ('items', (('item_name', None),))); пустое значение - None"""
+    if not value:
+        return None
+    tree = {}
+    for path in value.split(','):
+        parts = [part.strip() for part in path.strip().split('.')]
+        if not all(parts):
+            raise FieldSelectionError(f'Неверное поле в fields: "{path}"')
+        node = tree
+        for part in parts[:-1]:
+            child = node.get(part, {})
+            if child is None:
+                break  # Поле уже выбрано целиком
+            node = node.setdefault(part, child)
+        else:
+            node[parts[-1]] = None
+
+    def freeze(node):
+        return tuple(sorted((name, None if child is None else freeze(child)) for name, child in node.items()))
+    return freeze(tree)
+
+
+def request_fields():
+    """(selection, depth) из параметров запроса ?fields= и ?depth="""
+    selection = parse_fields(request.args.get('fields'))
+    depth = request.args.get('depth')
+    if depth is not None:
+        if not depth.isdigit():
+            raise FieldSelectionError('depth должен быть целым числом')
+        depth = min(int(depth), MAX_DEPTH)
+    return selection, depth
+
+
+def serialize(objects, selection=None, depth=None, iso_datetimes=False):
+    """Модель или список моделей -> dict / list.
+
+    Даты по умолчанию остаются datetime - их кодирует FastJSONProvider,
+    iso_datetimes=True - сразу строки ISO 8601 (как в to_dict()).
+    """
+    many = isinstance(objects, (list, tuple))
+    items = list(objects) if many else [objects]
+    if not items:
+        return []
+    encoder = _compile(type(items[0]), selection, depth, iso_datetimes)
+
+    ctx = {}
+    if encoder.prefetches:
+        targets = {}
+        for path, prefetch in encoder.prefetches:
+            targets.setdefault(prefetch, []).extend(_collect(items, path))
+        ctx = {prefetch: prefetch(found) for prefetch, found in targets.items()}
+
+    result = [encoder.encode(item, ctx) for item in items]
+    return result if many else result[0]
+
+
+class SerializableModel(Model):
+    """Базовая модель: to_dict() по объявлению __serialize__"""
+
+    def to_dict(self, selection=None, depth=None):
+        return serialize(self, selection, depth, iso_datetimes=True)
+
+
+def _default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON для ответов Flask: orjson (если установлен), даты в ISO 8601"""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+        kwargs.setdefault('ensure_ascii', False)
+        kwargs.setdefault('default', _default)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is not None:
+            body = orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            body = json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode()
+        # Кодировка указана явно: без charset http-клиент Flutter декодирует тело как latin1
+        return self._app.response_class(body, content_type=f'{self.mimetype}; charset=utf-8')
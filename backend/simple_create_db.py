@@ -1,13 +1,14 @@
-import sqlite3
 import os
+from database import connect
+from config import DB_PATH
 
 # Удаляем старую БД если существует
-if os.path.exists('sushi_express.db'):
-    os.remove('sushi_express.db')
+if os.path.exists(DB_PATH):
+    os.remove(DB_PATH)
     print("🗑️ Старая база данных удалена")
 
 # Создаем новую БД
-conn = sqlite3.connect('sushi_express.db')
+conn = connect()
 cursor = conn.cursor()
 
 print("🔨 Создаем таблицы...")
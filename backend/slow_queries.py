@@ -0,0 +1,166 @@
+import datetime
+import hashlib
+import logging
+import queue
+import re
+import threading
+import time
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN
+from request_log import log_event
+
+# Журнал медленных SQL-запросов.
+# Запрос дольше SLOW_QUERY_MS (любой, через любой движок SQLAlchemy) пишется
+# в журнал (request_log.py, событие slow_query) с эндпоинтом, временем и
+# параметрами: строки скрыты (остаются длина и тип), числа и даты видны.
+# Запросы группируются по отпечатку - тексту без значений параметров
+# (IN (?, ?, ?) -> IN (...)), так что одинаковый filter_by с разными id - одна строка сводки.
+# Для каждого нового отпечатка план запроса (EXPLAIN QUERY PLAN в SQLite,
+# EXPLAIN в PostgreSQL) снимается в фоновом потоке, а не в потоке запроса,
+# и пишется событием slow_query_plan. Полный проход таблицы с условием - full_scan:
+# кандидат на индекс.
+# Сводка этого процесса - GET /api/admin/debug/slow-queries.
+
+MAX_FINGERPRINTS = 500  # Больше разных запросов в сводке не держим
+EXPLAIN_QUEUE_SIZE = 100
+
+_lock = threading.Lock()
+_stats = {}  # отпечаток -> сводка
+_explain_queue = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+_state = {'worker': None}
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAM_RE = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+|\?')  # psycopg2, именованные, sqlite; не ::type
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_POSTGRES_SCAN_RE = re.compile(r'Seq Scan on (\w+)')
+
+
+def fingerprint(statement):
+    """(отпечаток, нормализованный текст) - значения и списки параметров заменены на ?"""
+    normalized = ' '.join(statement.split())
+    normalized = _STRING_RE.sub('?', normalized)
+    normalized = _PARAM_RE.sub('?', normalized)
+    normalized = _NUMBER_RE.sub('?', normalized)
+    normalized = _IN_LIST_RE.sub('(...)', normalized)
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+def _redact_value(value):
+    if value is None or isinstance(value, (bool, int, float, datetime.date, datetime.datetime)):
+        return value
+    if isinstance(value, (str, bytes)):
+        return f'<{type(value).__name__} len={len(value)}>'
+    return f'<{type(value).__name__}>'
+
+
+def redact(parameters):
+    """Параметры запроса без значений строк (пароли, телефоны, адреса, токены)"""
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+def _explain(engine, statement, parameters):
+    """(план построчно, полные проходы таблиц с условием)"""
+    # Сам EXPLAIN в журнал медленных запросов не попадает
+    with engine.connect().execution_options(slow_query_log=False) as conn:
+        if engine.dialect.name == 'sqlite':
+            from explain_queries import analyze
+            plan, scans, _ = analyze(conn, statement, parameters)
+            return plan, scans
+        plan = [row[0] for row in conn.exec_driver_sql(f'EXPLAIN {statement}', parameters)]
+        filtered = ' WHERE ' in statement.upper()
+        scans = [line.strip() for line in plan if filtered and _POSTGRES_SCAN_RE.search(line)]
+        return plan, scans
+
+
+def _explain_worker():
+    while True:
+        key, engine, statement, parameters = _explain_queue.get()
+        try:
+            plan, scans = _explain(engine, statement, parameters)
+        except Exception as e:
+            plan, scans = [f'EXPLAIN не выполнен: {str(e).splitlines()[0]}'], []
+        with _lock:
+            entry = _stats.get(key)
+            if entry is not None:
+                entry['plan'] = plan
+                entry['full_scan'] = scans
+        log_event('slow_query_plan', logging.WARNING if scans else logging.INFO,
+                  fingerprint=key, plan=plan, full_scan=scans)
+
+
+def _queue_explain(key, engine, statement, parameters):
+    if _state['worker'] is None or not _state['worker'].is_alive():
+        _state['worker'] = threading.Thread(target=_explain_worker, name='slow-query-explain', daemon=True)
+        _state['worker'].start()
+    try:
+        _explain_queue.put_nowait((key, engine, statement, parameters))
+    except queue.Full:
+        pass  # Фоновый поток не успевает - план этого отпечатка не снимаем
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_slow_query_started', None)
+    if started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms < SLOW_QUERY_MS or not conn.get_execution_options().get('slow_query_log', True):
+        return
+
+    if executemany and parameters:
+        parameters = parameters[0]
+    key, normalized = fingerprint(statement)
+    endpoint = request.endpoint if has_request_context() else None
+    redacted = redact(parameters)
+
+    new = False
+    with _lock:
+        entry = _stats.get(key)
+        if entry is None and len(_stats) < MAX_FINGERPRINTS:
+            new = True
+            entry = _stats[key] = {'fingerprint': key, 'statement': normalized, 'count': 0, 'total_ms': 0.0,
+                                   'max_ms': 0.0, 'endpoints': {}, 'plan': None, 'full_scan': []}
+        if entry is not None:
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['endpoints'][endpoint or '-'] = entry['endpoints'].get(endpoint or '-', 0) + 1
+            entry['last_parameters'] = redacted
+
+    log_event('slow_query', logging.WARNING, fingerprint=key, duration_ms=round(elapsed_ms, 2),
+              endpoint=endpoint, statement=normalized[:1000], parameters=redacted)
+
+    verb = normalized.lstrip('( ').split(' ', 1)[0].upper()
+    if new and SLOW_QUERY_EXPLAIN and verb in ('SELECT', 'UPDATE', 'DELETE', 'WITH'):
+        _queue_explain(key, conn.engine, statement, parameters)
+
+
+def install_slow_query_log():
+    """Подключает журнал медленных запросов ко всем движкам (SLOW_QUERY_MS=0 - выключен)"""
+    if SLOW_QUERY_MS <= 0 or event.contains(Engine, 'after_cursor_execute', _after_cursor_execute):
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def get_slow_queries(limit=None):
+    """Сводка медленных запросов этого процесса, самые затратные (по суммарному времени) первыми"""
+    with _lock:
+        entries = [dict(entry, total_ms=round(entry['total_ms'], 2), max_ms=round(entry['max_ms'], 2),
+                        avg_ms=round(entry['total_ms'] / entry['count'], 2), endpoints=dict(entry['endpoints']))
+                   for entry in _stats.values()]
+    entries.sort(key=lambda entry: entry['total_ms'], reverse=True)
+    return entries[:limit] if limit else entries
@@ -3,8 +3,8 @@
 
 import requests
 import json
-import sqlite3
 from datetime import datetime
+from database import connect
 
 def test_order_flow():
     print("🧪 ТЕСТ ЦЕПОЧКИ ЗАКАЗОВ")
@@ -83,7 +83,7 @@ def test_order_flow():
     
     # Шаг 4: Проверяем заказ в базе данных
     print("\n📝 Шаг 4: Проверка заказа в базе данных")
-    conn = sqlite3.connect('sushi_express.db')
+    conn = connect()
     cursor = conn.cursor()
     
     # Проверяем заказ
@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from sqlalchemy.orm.util import identity_key
+
+from models import db, User, PointsTransaction
+
+# Кошелек баллов. Баланс хранится в users.bonus_points / users.loyalty_points
+# (чтение за O(1)), а каждое изменение пишется в журнал points_ledger.
+# Баланс меняется только атомарным UPDATE ... SET x = x + n, поэтому
+# параллельные начисления и списания не теряют друг друга.
+
+BONUS_POINT_VALUE = 1.0  # Сколько сом скидки дает один бонусный балл
+
+
+class InsufficientPointsError(Exception):
+    """Недостаточно баллов для списания"""
+
+
+def _balance_column(points_type):
+    if points_type == 'bonus':
+        return User.bonus_points
+    if points_type == 'loyalty':
+        return User.loyalty_points
+    raise ValueError(f'Неизвестный тип баллов: {points_type}')
+
+
+def _change_balance(user_id, amount, reason, points_type, order_id, require_funds):
+    column = _balance_column(points_type)
+
+    query = db.session.query(User).filter(User.id == user_id)
+    if require_funds:
+        # Списание проходит только если баллов хватает - проверка и изменение в одном UPDATE
+        query = query.filter(db.func.coalesce(column, 0) >= -amount)
+
+    updated = query.update({column: db.func.coalesce(column, 0) + amount}, synchronize_session=False)
+    if not updated:
+        raise InsufficientPointsError('Недостаточно баллов')
+
+    # Строка пользователя уже заблокирована нашей транзакцией, баланс читаем без гонок
+    balance_after = db.session.query(column).filter(User.id == user_id).scalar()
+
+    # Загруженный в сессию объект пользователя должен увидеть новый баланс
+    user = db.session.identity_map.get(identity_key(User, user_id))
+    if user is not None:
+        db.session.expire(user, [column.key])
+
+    transaction = PointsTransaction(
+        user_id=user_id,
+        points_type=points_type,
+        amount=amount,
+        balance_after=balance_after,
+        reason=reason,
+        order_id=order_id,
+        created_at=datetime.utcnow()
+    )
+    db.session.add(transaction)
+    return transaction
+
+
+def credit_points(user_id, amount, reason, points_type='bonus', order_id=None):
+    """Начисляет баллы в текущей транзакции (commit делает вызывающий код)"""
+    if amount <= 0:
+        raise ValueError('Количество баллов должно быть положительным')
+    return _change_balance(user_id, amount, reason, points_type, order_id, require_funds=False)
+
+
+def debit_points(user_id, amount, reason, points_type='bonus', order_id=None):
+    """Списывает баллы в текущей транзакции; InsufficientPointsError если баллов не хватает"""
+    if amount <= 0:
+        raise ValueError('Количество баллов должно быть положительным')
+    return _change_balance(user_id, -amount, reason, points_type, order_id, require_funds=True)
+
+
+def get_points_history(user_id, limit=50):
+    """Последние операции по баллам пользователя"""
+    transactions = PointsTransaction.query.filter_by(user_id=user_id).order_by(
+        PointsTransaction.id.desc()
+    ).limit(limit).all()
+    return [transaction.to_dict() for transaction in transactions]